@@ -19,11 +19,13 @@ fi
 mkdir -p "${MODEL_DIR}"
 
 poetry run python src/spectral_library/construct_annotated_library.py -IT=N -IP="${TRAIN_DIR}"
-poetry run python src/spectral_library/parse_msp_to_csv.py -IT=N -TN=1 -IP="${TRAIN_DIR}"
-poetry run python src/spectral_library/parse_csv_to_pkl.py -IT=N -TN=1 -IP="${TRAIN_DIR}"
+poetry run python src/spectral_library/parse_msp_to_csv.py -IT=N -TN=1 -IP="${TRAIN_DIR}" -OF=shard
 poetry run python src/spectral_library/parse_msp_to_stat.py -IT=N -TN=1 -IP="${TRAIN_DIR}"
+# The testing folder is prepared the same way, the files are skipped by the manifests if it is the training folder.
+poetry run python src/spectral_library/construct_annotated_library.py -IT=N -IP="${TEST_DIR}"
+poetry run python src/spectral_library/parse_msp_to_csv.py -IT=N -TN=1 -IP="${TEST_DIR}" -OF=shard
 poetry run python -u src/deep_learning/train_model_cyno.py \
-  -TA="${TRAIN_DIR}/N-GP-PKL-TOP-1" \
+  -TA="${TRAIN_DIR}/N-GP-SHARD-TOP-1" \
   -SM="${MODEL_DIR}"
 poetry run python -u src/deep_learning/predict_different_models_background.py \
   -MP="${MODEL_DIR}" \
@@ -1,19 +1,10 @@
 import math
 import os
 import sys
+from collections import Counter
 from tkinter import filedialog
 
-
-### export list of column in txt file
-### input (txt file, column header)
-### output (column data)
-def Func_read_txt_column(txt_filename, column_name):
-    txt_file = [line.strip() for line in open(txt_filename).read().splitlines()]
-    txt_data = [line.split("\t") for line in txt_file]
-    for i in range(len(txt_data[0])):
-        if txt_data[0][i] == column_name:
-            column_target = i
-    return [txt_data[i][column_target] for i in range(1, len(txt_data))]
+from D_Va_common import Func_iter_txt_columns, Func_open_file
 
 
 ### nonredundant list
@@ -37,14 +28,12 @@ Input_filename = filedialog.askopenfilename(
 )
 print(Input_filename)
 
-List_file = Func_read_txt_column(Input_filename, "File")
-List_file_nonredundant = Func_delete_redundant(List_file)
+# count the scans of each file, in the order of the files, the scan info is streamed in chunks
+Count_file = Counter()
+for Chunk_column in Func_iter_txt_columns(Input_filename, ["File"]):
+    Count_file.update(Chunk_column["File"])
 
 # output_mzML scan info count
 with open(Input_filename.split(".")[0] + "-count.txt", "w") as output_result:
-    for i in range(len(List_file_nonredundant)):
-        Current_count = 0
-        for j in range(len(List_file)):
-            if List_file_nonredundant[i] == List_file[j]:
-                Current_count += 1
-        output_result.write(List_file_nonredundant[i] + "\t" + str(Current_count) + "\n")
+    for File_each, Current_count in Count_file.items():
+        output_result.write(File_each + "\t" + str(Current_count) + "\n")
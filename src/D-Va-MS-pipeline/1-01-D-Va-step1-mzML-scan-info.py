@@ -1,117 +1,157 @@
-import math
+import argparse
+import html
 import os
-import sys
-from tkinter import filedialog
+import re
+from concurrent.futures import ProcessPoolExecutor
 
-from pyteomics import mzml
-from pyteomics.auxiliary import cvquery
+from D_Va_common import Func_compression_suffix, Func_file_list, Func_open_file
 
+### scan info files, and the keyword of header for each partition
+List_output_partition = [
+    ("mzML-scan-info-MS1.txt", "p NSI"),
+    ("mzML-scan-info-MS2-HCD45.txt", "hcd45"),
+    ("mzML-scan-info-MS2-HCD29.txt", "hcd29"),
+    ("mzML-scan-info-MS2-HCD30.txt", "hcd30"),
+]
+### cvParam of spectrum title, filter string (header), and scan start time (RT)
+List_accession = ["MS:1000796", "MS:1000512", "MS:1000016"]
+Pattern_cvParam = re.compile(r"<cvParam\b[^>]*>")
+Pattern_attribute = re.compile(r'([\w:]+)="([^"]*)"')
+Pattern_index_list_offset = re.compile(rb"<indexListOffset>\s*(\d+)\s*</indexListOffset>")
+Pattern_offset = re.compile(rb"<offset\b[^>]*>\s*(\d+)\s*</offset>")
+Block_size = 1 << 22
 
-### get file list from a directory
-### input (directory)
-### output (file list)
-def Func_file_list(dir, appendix="ms1"):
-    import os
 
-    file_num = 0
+### scan info from the text of a spectrum before its binary data arrays
+### input (spectrum text)
+### output (scan, header, RT)
+def Func_scan_header(spectrum_text):
+    cvParam_value = {}
+    for cvParam in Pattern_cvParam.findall(spectrum_text):
+        attribute = dict(Pattern_attribute.findall(cvParam))
+        accession = attribute.get("accession")
+        if accession in List_accession and accession not in cvParam_value:
+            cvParam_value[accession] = html.unescape(attribute.get("value", ""))
+    scan = cvParam_value["MS:1000796"].split("scan=")[1].replace('"', "")
+    return scan, cvParam_value["MS:1000512"], str(float(cvParam_value["MS:1000016"]))
+
+
+### byte offsets of spectra from the index of an indexed mzML file
+### input (mzML file opened in binary mode)
+### output (offset list, or None without index)
+def Func_spectrum_offsets(mzML_input):
+    mzML_input.seek(0, os.SEEK_END)
+    file_size = mzML_input.tell()
+    mzML_input.seek(max(0, file_size - 4096))
+    index_list_offset = Pattern_index_list_offset.search(mzML_input.read())
+    if index_list_offset is None:
+        return None
+    mzML_input.seek(int(index_list_offset.group(1)))
+    index_list = mzML_input.read()
+    spectrum_index_start = index_list.find(b'<index name="spectrum"')
+    if spectrum_index_start < 0:
+        return None
+    spectrum_index_end = index_list.find(b"</index>", spectrum_index_start)
+    return [
+        int(offset)
+        for offset in Pattern_offset.findall(index_list[spectrum_index_start:spectrum_index_end])
+    ]
+
+
+### scan info by seeking each spectrum of the index, the binary data arrays are not read
+### input (mzML file opened in binary mode, offset list)
+### output (scan info list)
+def Func_scan_info_indexed(mzML_input, List_offset):
     output_list = []
-    file_all = os.listdir(dir)
-    for line in file_all:
-        filepath = os.path.join(dir, line)
-        if filepath.split(".")[-1] == appendix:
-            output_list.append(filepath.split("\\")[-1])
-            print(filepath.split("\\")[-1])
+    for offset in List_offset:
+        mzML_input.seek(offset)
+        spectrum_text = b""
+        while True:
+            block = mzML_input.read(4096)
+            spectrum_text += block
+            spectrum_end = spectrum_text.find(b"<binaryDataArrayList")
+            if spectrum_end < 0:
+                spectrum_end = spectrum_text.find(b"</spectrum>")
+            if spectrum_end >= 0:
+                break
+            if not block:
+                spectrum_end = len(spectrum_text)
+                break
+        output_list.append(Func_scan_header(spectrum_text[:spectrum_end].decode("utf-8")))
     return output_list
 
 
+### scan info by streaming the spectra, for the mzML files without index or compressed
+### input (mzML file opened in binary mode)
+### output (scan info list)
+def Func_scan_info_stream(mzML_input):
+    output_list = []
+    text_rest = ""
+    while True:
+        block = mzML_input.read(Block_size)
+        text = text_rest + block.decode("utf-8", errors="ignore")
+        List_spectrum = text.split("</spectrum>")
+        text_rest = List_spectrum.pop()
+        for spectrum_text in List_spectrum:
+            spectrum_start = spectrum_text.find("<spectrum ")
+            if spectrum_start >= 0:
+                spectrum_end = spectrum_text.find("<binaryDataArrayList", spectrum_start)
+                if spectrum_end < 0:
+                    spectrum_end = len(spectrum_text)
+                output_list.append(Func_scan_header(spectrum_text[spectrum_start:spectrum_end]))
+        if not block:
+            break
+    return output_list
+
+
+### scan info of all the scans in a mzML file, only the metadata of scans are parsed
+### input (mzML file)
+### output (mzML file, scan info list of (scan, header, RT))
+def Func_scan_info(mzML_filename):
+    with Func_open_file(mzML_filename, "rb") as mzML_input:
+        if Func_compression_suffix(mzML_filename) == "":
+            List_offset = Func_spectrum_offsets(mzML_input)
+            if List_offset is not None:
+                return mzML_filename, Func_scan_info_indexed(mzML_input, List_offset)
+            mzML_input.seek(0)
+        return mzML_filename, Func_scan_info_stream(mzML_input)
+
+
 ## program
 ## program
 
-# input-directory, mzML files
-dir = filedialog.askdirectory(initialdir=(os.getcwd()))
-os.chdir(dir)
-File_list = Func_file_list(dir, "mzML")
-
-# output-info of each scan
-with open("mzML-scan-info.txt", "w") as output_result1:
-    with open("mzML-scan-info-MS1.txt", "w") as output_result2:
-        with open("mzML-scan-info-MS2-HCD45.txt", "w") as output_result3:
-            with open("mzML-scan-info-MS2-HCD29.txt", "w") as output_result4:
-                with open("mzML-scan-info-MS2-HCD30.txt", "w") as output_result5:
-                    output_result1.write("File\tScan\tFile-Scan\tHeader\tRT\n")
-                    output_result2.write("File\tScan\tFile-Scan\tHeader\tRT\n")
-                    output_result3.write("File\tScan\tFile-Scan\tHeader\tRT\n")
-                    output_result4.write("File\tScan\tFile-Scan\tHeader\tRT\n")
-                    output_result5.write("File\tScan\tFile-Scan\tHeader\tRT\n")
-                    for File_each in File_list:
-                        print("processing   ", File_each)
-                        for scan in mzml.read(File_each):
-                            output_result1.write(File_each.split(".")[0] + "\t")
-                            output_result1.write(
-                                cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                + "\t"
-                            )
-                            output_result1.write(
-                                File_each.split(".")[0]
-                                + "-"
-                                + cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                + "\t"
-                            )
-                            output_result1.write(cvquery(scan, "MS:1000512") + "\t")
-                            output_result1.write(str(cvquery(scan, "MS:1000016")) + "\n")
-                            if "p NSI" in cvquery(scan, "MS:1000512"):
-                                output_result2.write(File_each.split(".")[0] + "\t")
-                                output_result2.write(
-                                    cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result2.write(
-                                    File_each.split(".")[0]
-                                    + "-"
-                                    + cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result2.write(cvquery(scan, "MS:1000512") + "\t")
-                                output_result2.write(str(cvquery(scan, "MS:1000016")) + "\n")
-                            if "hcd45" in cvquery(scan, "MS:1000512"):
-                                output_result3.write(File_each.split(".")[0] + "\t")
-                                output_result3.write(
-                                    cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result3.write(
-                                    File_each.split(".")[0]
-                                    + "-"
-                                    + cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result3.write(cvquery(scan, "MS:1000512") + "\t")
-                                output_result3.write(str(cvquery(scan, "MS:1000016")) + "\n")
-                            if "hcd29" in cvquery(scan, "MS:1000512"):
-                                output_result4.write(File_each.split(".")[0] + "\t")
-                                output_result4.write(
-                                    cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result4.write(
-                                    File_each.split(".")[0]
-                                    + "-"
-                                    + cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result4.write(cvquery(scan, "MS:1000512") + "\t")
-                                output_result4.write(str(cvquery(scan, "MS:1000016")) + "\n")
-                            if "hcd30" in cvquery(scan, "MS:1000512"):
-                                output_result5.write(File_each.split(".")[0] + "\t")
-                                output_result5.write(
-                                    cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result5.write(
-                                    File_each.split(".")[0]
-                                    + "-"
-                                    + cvquery(scan, "MS:1000796").split("scan=")[1].replace('"', "")
-                                    + "\t"
-                                )
-                                output_result5.write(cvquery(scan, "MS:1000512") + "\t")
-                                output_result5.write(str(cvquery(scan, "MS:1000016")) + "\n")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan info of mzML files, split by HCD energy")
+    parser.add_argument("-d", "--dir", help="directory of mzML files, selected by a dialog if not given")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(), help="number of processes for the files"
+    )
+    args = parser.parse_args()
+
+    # input-directory, mzML files
+    dir = args.dir
+    if dir is None:
+        from tkinter import filedialog
+
+        dir = filedialog.askdirectory(initialdir=(os.getcwd()))
+    os.chdir(dir)
+    File_list = Func_file_list(dir, "mzML")
+
+    # output-info of each scan, each file is read once for all the partitions
+    with open("mzML-scan-info.txt", "w") as output_result:
+        List_output = [open(filename, "w") for filename, keyword in List_output_partition]
+        for output in [output_result] + List_output:
+            output.write("File\tScan\tFile-Scan\tHeader\tRT\n")
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            for File_each, List_scan_info in executor.map(Func_scan_info, File_list):
+                print("processing   ", File_each)
+                File_name = File_each.split(".")[0]
+                for scan, header, RT in List_scan_info:
+                    line = File_name + "\t" + scan + "\t" + File_name + "-" + scan + "\t"
+                    line += header + "\t" + RT + "\n"
+                    output_result.write(line)
+                    for (filename, keyword), output in zip(List_output_partition, List_output):
+                        if keyword in header:
+                            output.write(line)
+        for output in List_output:
+            output.close()
@@ -5,22 +5,7 @@ import os
 import sys
 from tkinter import filedialog
 
-
-### get file list from a directory
-### input (directory)
-### ouput (file list)
-def Func_file_list(dir, appendix="mgf"):
-    import os
-
-    file_num = 0
-    output_list = []
-    file_all = os.listdir(dir)
-    for line in file_all:
-        filepath = os.path.join(dir, line)
-        if filepath.split(".")[-1] == appendix:
-            output_list.append(filepath.split("\\")[-1])
-            print(filepath.split("\\")[-1])
-    return output_list
+from D_Va_common import Func_open_file, Func_compression_suffix, Func_file_list
 
 
 ## program
@@ -40,11 +25,13 @@ for i in range(len(list_mgf_initial)):
 # output reformated MGF files from Rawconvert to pParse
 for eachfile in list_mgf:
     mgf_filename = eachfile
-    mgf_file = open(mgf_filename)
+    mgf_file = Func_open_file(mgf_filename)
     print("processing now  " + mgf_filename)
 
     for line in mgf_file:
-        with open(mgf_filename.split(".")[0] + "_formatted.mgf", "w") as output:
+        with Func_open_file(
+            mgf_filename.split(".")[0] + "_formatted.mgf" + Func_compression_suffix(mgf_filename), "w"
+        ) as output:
             list_peak = []
             list_intensity = []
             for line in mgf_file:
@@ -22,22 +22,7 @@ import os
 import sys
 from tkinter import filedialog
 
-
-### get file list from a directory
-### input (directory)
-### ouput (file list)
-def Func_file_list(dir, appendix="mgf"):
-    import os
-
-    file_num = 0
-    output_list = []
-    file_all = os.listdir(dir)
-    for line in file_all:
-        filepath = os.path.join(dir, line)
-        if filepath.split(".")[-1] == appendix:
-            output_list.append(filepath.split("\\")[-1])
-            print(filepath.split("\\")[-1])
-    return output_list
+from D_Va_common import Func_open_file, Func_file_list
 
 
 ### check mass accuracy
@@ -107,7 +92,7 @@ with open("MGF-info.txt", "w") as output:
         output.write("\n")
         for eachfile in list_mgf:
             mgf_filename = eachfile
-            mgf_file = open(mgf_filename)
+            mgf_file = Func_open_file(mgf_filename)
             print("processing now  " + mgf_filename)
             MS2_TIC_total = 0
             MS2_TIC_138 = 0
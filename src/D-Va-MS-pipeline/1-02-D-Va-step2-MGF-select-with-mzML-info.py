@@ -1,87 +1,56 @@
-import math
+import argparse
 import os
-import sys
-from tkinter import filedialog
+from concurrent.futures import ProcessPoolExecutor
 
-
-### get file list from a directory
-### input (directory)
-### ouput (file list)
-def Func_file_list(dir, appendix="mgf"):
-    import os
-
-    file_num = 0
-    output_list = []
-    file_all = os.listdir(dir)
-    for line in file_all:
-        filepath = os.path.join(dir, line)
-        if filepath.split(".")[-1] == appendix:
-            output_list.append(filepath.split("\\")[-1])
-            print(filepath.split("\\")[-1])
-    return output_list
-
-
-### check current scan is HCD29
-### input (all scan & current scan)
-### output (true or false)
-def Func_check_HCD29(info_raw, info_scan, list_raw, list_scan):
-    return any(info_raw == list_raw[i] and info_scan == list_scan[i] for i in range(len(list_raw)))
-
-
-### export list of column in txt file
-### input (txt file, column header)
-### output (column data)
-def Func_read_txt_column(txt_filename, column_name):
-    txt_file = [line.strip() for line in open(txt_filename).read().splitlines()]
-    txt_data = [line.split("\t") for line in txt_file]
-    for i in range(len(txt_data[0])):
-        if txt_data[0][i] == column_name:
-            column_target = i
-    return [txt_data[i][column_target] for i in range(1, len(txt_data))]
+from D_Va_common import (
+    Func_compression_suffix,
+    Func_file_list,
+    Func_open_file,
+    Func_read_txt_columns,
+)
 
 
-## program
-## program
+### scans of each raw file, loaded once for all the mgf files
+### input (scan info file)
+### output (dict of raw file to the set of scans)
+def Func_raw_scan_set(mzML_scan):
+    scan_column = Func_read_txt_columns(mzML_scan, ["File", "Scan"])
+    raw_scan_set = {}
+    for info_raw, info_scan in zip(scan_column["File"], scan_column["Scan"]):
+        raw_scan_set.setdefault(info_raw, set()).add(info_scan)
+    return raw_scan_set
 
-# input-directory, mgf files
-dir = filedialog.askdirectory(initialdir=(os.getcwd()))
-os.chdir(dir)
-list_mgf = Func_file_list(dir, "mgf")
 
-mzML_scan = filedialog.askopenfilename(
-    initialdir=(os.getcwd()), filetypes=[("input data", ".txt")], title=("input data")
-)
-print(mzML_scan)
-list_raw = Func_read_txt_column(mzML_scan, "File")
-list_scan = Func_read_txt_column(mzML_scan, "Scan")
+### (raw, scan) keys of the raw files matching a mgf file
+### input (mgf file, dict of raw file to the set of scans)
+### output (set of (raw, scan))
+def Func_mgf_key_set(mgf_filename, raw_scan_set):
+    mgf_name_HCDFT = mgf_filename.split(".")[0].replace("_HCDFT", "")
+    mgf_name_formatted = mgf_filename.split(".")[0].replace("_formatted", "")
+    return {
+        (info_raw, info_scan)
+        for info_raw, set_scan in raw_scan_set.items()
+        if mgf_name_HCDFT in info_raw or mgf_name_formatted in info_raw
+        for info_scan in set_scan
+    }
 
-# output new mgf file with targetd scan
-for eachfile in list_mgf:
-    mgf_filename = eachfile
-    mgf_file = open(mgf_filename)
 
-    with open(mgf_filename.split(".")[0] + "_selected.mgf", "w") as output:
+### output new mgf file with targeted scan, the spectra are streamed from the input to the output
+### input (mgf file, set of (raw, scan))
+### output (mgf file)
+def Func_select_mgf(mgf_filename, key_set):
+    with Func_open_file(mgf_filename) as mgf_file, Func_open_file(
+        mgf_filename.split(".")[0] + "_selected.mgf" + Func_compression_suffix(mgf_filename), "w"
+    ) as output:
         list_peak = []
-        list_intensity = []
-        list_raw_current = []
-        list_scan_current = []
-        for i in range(len(list_raw)):
-            if (
-                mgf_filename.split(".")[0].replace("_HCDFT", "") in list_raw[i]
-                or mgf_filename.split(".")[0].replace("_formatted", "") in list_raw[i]
-            ):
-                list_raw_current.append(list_raw[i])
-                list_scan_current.append(list_scan[i])
-        print("processing   ", eachfile)
         for line in mgf_file:
             line = line.strip()
             if "BEGIN" in line:
                 list_peak = []
-                list_intensity = []
             elif "TITLE" in line:
                 info_title = line.split(" ")[0].split("=")[1]
-                info_raw = line.split(" ")[0].split("=")[1].split(".")[0]
-                info_scan = line.split(" ")[0].split("=")[1].split(".")[1]
+                info_raw = info_title.split(".")[0]
+                info_scan = info_title.split(".")[1]
             elif "RTINSECONDS" in line:
                 info_RT_sec = "%.4f" % (float(line.split("=")[1]))
             elif "CHARGE" in line:
@@ -89,16 +58,50 @@ for eachfile in list_mgf:
             elif "PEPMASS" in line:
                 info_MZ = line.split(" ")[0].split("=")[1]
             elif " " in line and "END" not in line:
-                list_peak.append("%.3f" % (float(line.split(" ")[0])))
-                list_intensity.append("%.1f" % (float(line.split(" ")[1])))
+                peak = line.split(" ")
+                list_peak.append("%.3f %.1f\n" % (float(peak[0]), float(peak[1])))
             elif "END" in line:
-                if Func_check_HCD29(info_raw, info_scan, list_raw_current, list_scan_current):
-                    output.write("BEGIN IONS\n")
-                    output.write("TITLE=" + info_title + "\n")
-                    output.write("CHARGE=" + info_Z + "+\n")
-                    output.write("RTINSECONDS=" + info_RT_sec + "\n")
-                    output.write("PEPMASS=" + info_MZ + "\n")
-                    for i in range(len(list_peak)):
-                        output.write(str(list_peak[i]) + " " + str(list_intensity[i]) + "\n")
-                    output.write("2500.000 1.0\n")
-                    output.write("END IONS\n")
+                if (info_raw, info_scan) in key_set:
+                    output.write(
+                        "BEGIN IONS\nTITLE=" + info_title + "\nCHARGE=" + info_Z + "+\n"
+                        "RTINSECONDS=" + info_RT_sec + "\nPEPMASS=" + info_MZ + "\n"
+                    )
+                    output.writelines(list_peak)
+                    output.write("2500.000 1.0\nEND IONS\n")
+    return mgf_filename
+
+
+## program
+## program
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select the mgf spectra with the scans of mzML info")
+    parser.add_argument("-d", "--dir", help="directory of mgf files, selected by a dialog if not given")
+    parser.add_argument("-s", "--scan", help="mzML scan info file, selected by a dialog if not given")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(), help="number of processes for the files"
+    )
+    args = parser.parse_args()
+
+    # input-directory, mgf files
+    dir = args.dir
+    mzML_scan = args.scan
+    if dir is None or mzML_scan is None:
+        from tkinter import filedialog
+    if dir is None:
+        dir = filedialog.askdirectory(initialdir=(os.getcwd()))
+    os.chdir(dir)
+    list_mgf = Func_file_list(dir, "mgf")
+
+    if mzML_scan is None:
+        mzML_scan = filedialog.askopenfilename(
+            initialdir=(os.getcwd()), filetypes=[("input data", ".txt")], title=("input data")
+        )
+    print(mzML_scan)
+    raw_scan_set = Func_raw_scan_set(mzML_scan)
+
+    # output new mgf file with targetd scan, each file in a process
+    list_key_set = [Func_mgf_key_set(eachfile, raw_scan_set) for eachfile in list_mgf]
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        for eachfile in executor.map(Func_select_mgf, list_mgf, list_key_set):
+            print("processing   ", eachfile)
@@ -8,6 +8,8 @@ from tkinter import filedialog
 
 from openpyxl import Workbook, load_workbook
 
+from D_Va_common import Func_open_file, Func_read_txt_column
+
 warnings.filterwarnings("ignore")
 
 ### export list of column in excel file
@@ -31,18 +33,6 @@ def Func_read_excel_column(excel_filename, column_name):
     return [txt_data[i][column_target] for i in range(1, len(txt_data))]
 
 
-### export list of column in txt file
-### input (txt file, column header)
-### output (column data)
-def Func_read_txt_column(txt_filename, column_name):
-    txt_file = [line.strip() for line in open(txt_filename).read().splitlines()]
-    txt_data = [line.split("\t") for line in txt_file]
-    for i in range(len(txt_data[0])):
-        if txt_data[0][i] == column_name:
-            column_target = i
-    return [txt_data[i][column_target] for i in range(1, len(txt_data))]
-
-
 ## program
 ## program
 
@@ -59,7 +49,7 @@ List_pro_ID.insert(0, "Proteins")
 
 with open(Input_result.split(".")[0] + "_pro_filter.txt", "w") as output:
     line_count = 0
-    for line in open(Input_result):
+    for line in Func_open_file(Input_result):
         output_check = False
         if line_count == 0:
             output_check = True
@@ -1,8 +1,11 @@
+import argparse
 import os
-from tkinter import filedialog
 
+import numpy as np
 from brainpy import isotopic_variants
 
+from D_Va_common import Func_open_file, Func_read_txt_columns
+
 
 ### peptide composition
 ### input (peptide sequence)
@@ -51,22 +54,10 @@ def Func_calculate_MW(Composition):
     return sum(Composition[i] * MW_element[i] for i in range(len(Composition)))
 
 
-### export list of column in txt file
-### input (txt file, column header)
-### output (column data)
-def Func_read_txt_column(Txt_filename, Column_name):
-    Txt_file = [line.strip() for line in open(Txt_filename).read().splitlines()]
-    Txt_data = [line.split("\t") for line in Txt_file]
-    for i in range(len(Txt_data[0])):
-        if Txt_data[0][i] == Column_name:
-            Column_target = i
-    return [Txt_data[i][Column_target] for i in range(1, len(Txt_data))]
-
-
-### calculate isotope M0
+### calculate isotope M0 and M1
 ### input (composition)
-### output (M0%)
-def Func_isotope_M0(Element_list):
+### output (M0%, M1%)
+def Func_isotope_M0_M1(Element_list):
     glycopeptide = {
         "C": Element_list[0],
         "H": Element_list[1],
@@ -75,27 +66,75 @@ def Func_isotope_M0(Element_list):
         "S": Element_list[4],
     }
     theoretical_isotopic_cluster = isotopic_variants(glycopeptide, npeaks=20, charge=1)
-    return float(theoretical_isotopic_cluster[0].intensity)
+    return (
+        float(theoretical_isotopic_cluster[0].intensity),
+        float(theoretical_isotopic_cluster[1].intensity),
+    )
 
 
-### calculate isotope M1
-### input (composition)
-### output (M1%)
-def Func_isotope_M1(Element_list):
-    glycopeptide = {
-        "C": Element_list[0],
-        "H": Element_list[1],
-        "O": Element_list[2],
-        "N": Element_list[3],
-        "S": Element_list[4],
+### calculate isotope M0 and M1 of many compositions at once, from the abundance of the isotopes
+### M0 is the product of the lightest isotopes, M1 has one heavier isotope by 1 Da
+### input (composition array of C, H, O, N, S)
+### output (M0% array, M1% array)
+def Func_isotope_M0_M1_fast(Element_array):
+    Element_array = np.asarray(Element_array, dtype=np.float64).reshape(-1, 5)
+    Isotope_M0 = np.array(Isotope_abundance_M0)
+    Isotope_M1 = np.array(Isotope_abundance_M1)
+    M0 = np.exp(Element_array @ np.log(Isotope_M0))
+    M1 = M0 * (Element_array @ (Isotope_M1 / Isotope_M0))
+    return M0, M1
+
+
+### read the isotope M0 and M1 computed in the previous runs
+### input (cache file)
+### output (dict of composition to (M0%, M1%))
+def Func_read_isotope_cache(cache_filename):
+    if not os.path.exists(cache_filename):
+        return {}
+    Cache_column = Func_read_txt_columns(
+        cache_filename, ["Composition", "M0%", "M1%"], {"M0%": float, "M1%": float}
+    )
+    return {
+        Composition: (M0, M1)
+        for Composition, M0, M1 in zip(Cache_column["Composition"], Cache_column["M0%"], Cache_column["M1%"])
     }
-    theoretical_isotopic_cluster = isotopic_variants(glycopeptide, npeaks=20, charge=1)
-    return float(theoretical_isotopic_cluster[1].intensity)
+
+
+### write the isotope M0 and M1 for the next runs, the file is replaced after writing
+### input (cache file, dict of composition to (M0%, M1%))
+### output (cache file)
+def Func_write_isotope_cache(cache_filename, Isotope_cache):
+    with open(cache_filename + ".tmp", "w") as Output:
+        Output.write("Composition\tM0%\tM1%\n")
+        for Composition, (M0, M1) in Isotope_cache.items():
+            Output.write(Composition + "\t" + repr(M0) + "\t" + repr(M1) + "\n")
+    os.replace(cache_filename + ".tmp", cache_filename)
 
 
 ## program
 ## program
 
+parser = argparse.ArgumentParser(description="Isotope check of glycopeptides")
+parser.add_argument("-i", "--input", help="input txt file, selected by a dialog if not given")
+parser.add_argument(
+    "-m",
+    "--mode",
+    default="brainpy",
+    choices=["brainpy", "fast"],
+    help="brainpy for the new compositions, or fast by the abundance of the isotopes",
+)
+parser.add_argument(
+    "-c",
+    "--cache",
+    default=None,
+    help="isotope M0 and M1 of the compositions kept across runs, next to the input file by default",
+)
+args = parser.parse_args()
+
+# Abundance of the lightest isotope, and the isotope heavier by 1 Da (C, H, O, N, S)
+Isotope_abundance_M0 = [0.9893, 0.999885, 0.99757, 0.99636, 0.9499]
+Isotope_abundance_M1 = [0.0107, 0.000115, 0.00038, 0.00364, 0.0075]
+
 # Composition of each AA (A to Z, 26 total) (Element number of C, H, O, N, S)
 Composition_AA = []
 for i in range(26):
@@ -171,16 +210,26 @@ Composition_Glycan[7] = [6, 8, 6, 0, 0]  # HexA
 Composition_Glycan[8] = [6, 13, 5, 1, 0]  # aH
 
 # input-txt files
-Input_filename = filedialog.askopenfilename(
-    initialdir=(os.getcwd()), filetypes=[("input data", ".txt")], title=("input data")
-)
+Input_filename = args.input
+if Input_filename is None:
+    from tkinter import filedialog
+
+    Input_filename = filedialog.askopenfilename(
+        initialdir=(os.getcwd()), filetypes=[("input data", ".txt")], title=("input data")
+    )
 print(Input_filename)
+Cache_filename = args.cache
+if Cache_filename is None:
+    Cache_filename = os.path.join(os.path.dirname(os.path.abspath(Input_filename)), "D-Va-step5-isotope-cache.txt")
 
-Spectra_name = Func_read_txt_column(Input_filename, "GlySpec")
-Sequence_peptide = Func_read_txt_column(Input_filename, "Peptide")
-Sequence_glycan = Func_read_txt_column(Input_filename, "GlycanComposition")
-TIC_mono = Func_read_txt_column(Input_filename, "MonoArea")
-TIC_all = Func_read_txt_column(Input_filename, "IsotopeArea")
+Input_column = Func_read_txt_columns(
+    Input_filename, ["GlySpec", "Peptide", "GlycanComposition", "MonoArea", "IsotopeArea"]
+)
+Spectra_name = Input_column["GlySpec"]
+Sequence_peptide = Input_column["Peptide"]
+Sequence_glycan = Input_column["GlycanComposition"]
+TIC_mono = Input_column["MonoArea"]
+TIC_all = Input_column["IsotopeArea"]
 
 Element_peptide = []
 Element_glycan = []
@@ -197,18 +246,39 @@ for i in range(len(Sequence_peptide)):
     Element_glycan.append(Element_glycan_current)
     Element_glypep.append(Element_glypep_current)
 
-# check the isotope pass threshold for each glycopeptide
+# isotope M0 and M1 of each unique composition, from the cache or computed once
+Composition_glypep = [Func_format_composition(Element) for Element in Element_glypep]
+Composition_element = dict(zip(Composition_glypep, Element_glypep))
+Composition_unique = list(Composition_element)
+Composition_ID = {Composition: i for i, Composition in enumerate(Composition_unique)}
+Isotope_cache = Func_read_isotope_cache(Cache_filename)
+Composition_new = [Composition for Composition in Composition_unique if Composition not in Isotope_cache]
+Isotope_current = dict(Isotope_cache)
+if args.mode == "fast":
+    M0_new, M1_new = Func_isotope_M0_M1_fast([Composition_element[c] for c in Composition_new])
+    for i in range(len(Composition_new)):
+        Isotope_current[Composition_new[i]] = (float(M0_new[i]), float(M1_new[i]))
+elif Composition_new:
+    for Composition in Composition_new:
+        Isotope_cache[Composition] = Func_isotope_M0_M1(Composition_element[Composition])
+    Func_write_isotope_cache(Cache_filename, Isotope_cache)
+    Isotope_current = Isotope_cache
+print("compositions   ", len(Composition_unique), "   new   ", len(Composition_new))
+
+# check the isotope pass threshold for each glycopeptide, by the composition ID of each row
+Row_ID = np.array([Composition_ID[Composition] for Composition in Composition_glypep], dtype=np.int64)
+M0_unique = np.array([Isotope_current[Composition][0] for Composition in Composition_unique])
+M1_unique = np.array([Isotope_current[Composition][1] for Composition in Composition_unique])
+M0 = M0_unique[Row_ID]
+M1 = M1_unique[Row_ID]
+Ratio_mono = np.array(TIC_mono, dtype=np.float64) / (np.array(TIC_all, dtype=np.float64) + 1)
+Result_check = np.where(((M1 - M0) > 0.05) & (Ratio_mono > ((M1 + M0) / 2)), 0, 1)
+
 with open(Input_filename.split(".")[0] + "-step5-output.txt", "w") as Output:
     Output.write(
         "GlySpec\tPeptide\tGlycan\tGlyPep_Composition\tGlyPep_MW\tPep_Composition\tPep_MW\tGly_Composition\tGly_MW\tMonoArea\tIsotopeArea\tM0%\tM1%\tD-Va-Step5-check\n"
     )
     for i in range(len(Sequence_peptide)):
-        current_mono_check = 1
-        if (Func_isotope_M1(Element_glypep[i]) - Func_isotope_M0(Element_glypep[i])) > 0.05:
-            if (float(TIC_mono[i]) / (float(TIC_all[i]) + 1)) > (
-                (Func_isotope_M1(Element_glypep[i]) + (Func_isotope_M0(Element_glypep[i]))) / 2
-            ):
-                current_mono_check = 0
         Output.write(
             Spectra_name[i]
             + "\t"
@@ -216,7 +286,7 @@ with open(Input_filename.split(".")[0] + "-step5-output.txt", "w") as Output:
             + "\t"
             + Sequence_glycan[i]
             + "\t"
-            + str(Func_format_composition(Element_glypep[i]))
+            + str(Composition_glypep[i])
             + "\t"
             + str(Func_calculate_MW(Element_glypep[i]))
             + "\t"
@@ -232,21 +302,18 @@ with open(Input_filename.split(".")[0] + "-step5-output.txt", "w") as Output:
             + "\t"
             + str(TIC_all[i])
             + "\t"
-            + str(Func_isotope_M0(Element_glypep[i]))
+            + str(float(M0[i]))
             + "\t"
-            + str(Func_isotope_M1(Element_glypep[i]))
+            + str(float(M1[i]))
             + "\t"
-            + str(current_mono_check)
+            + str(Result_check[i])
             + "\n"
         )
 
-Result_check = Func_read_txt_column(
-    Input_filename.split(".")[0] + "-step5-output.txt", "D-Va-Step5-check"
-)
-Result_check.insert(0, "1")
+Result_check = ["1"] + [str(check) for check in Result_check]
 # output psm pass threshold for each glycopeptide
 with open(Input_filename.split(".")[0] + "-step5-psm.txt", "w") as Output:
-    Extract_file = [line.strip() for line in open(Input_filename).read().splitlines()]
+    Extract_file = [line.strip() for line in Func_open_file(Input_filename).read().splitlines()]
     for i in range(len(Extract_file)):
         if Result_check[i] == "1":
             Output.write(Extract_file[i])
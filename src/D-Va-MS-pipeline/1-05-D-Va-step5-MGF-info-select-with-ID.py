@@ -8,17 +8,14 @@ from tkinter import filedialog
 
 from openpyxl import Workbook, load_workbook
 
+from D_Va_common import Func_open_file, Func_read_txt_column
 
-### export list of column in txt file
-### input (txt file, column header)
-### output (column data)
-def Func_read_txt_column(txt_filename, column_name):
-    txt_file = [line.strip() for line in open(txt_filename).read().splitlines()]
-    txt_data = [line.split("\t") for line in txt_file]
-    for i in range(len(txt_data[0])):
-        if txt_data[0][i] == column_name:
-            column_target = i
-    return [txt_data[i][column_target] for i in range(1, len(txt_data))]
+
+### GlySpec or Spectra ID of raw file and scan, such as "raw-3200" for "raw.3200.3200.5.0.dta"
+### input (spectra ID)
+### output (raw-scan ID)
+def Func_spectra_ID(spectra):
+    return spectra.split(".")[0] + "-" + spectra.split(".")[1]
 
 
 ## program
@@ -34,47 +31,26 @@ Input_info = filedialog.askopenfilename(
 print(Input_result)
 print(Input_info)
 
-List_result = Func_read_txt_column(Input_result, "GlySpec")
-List_info = Func_read_txt_column(Input_info, "Spectra")
-
-for i in range(len(List_result)):
-    List_result[i] = List_result[i].split(".")[0] + "-" + List_result[i].split(".")[1]
-
-for i in range(len(List_info)):
-    List_info[i] = List_info[i].split(".")[0] + "-" + List_info[i].split(".")[1]
-List_info.insert(0, "Spectra.Spectra")
-
-with open(Input_info.split(".")[0] + "_select.txt", "w") as output:
-    line_count = 0
-    for line in open(Input_info):
-        output_check = False
-        if line_count == 0:
-            output_check = True
-        if List_info[line_count] in List_result:
-            output_check = True
-        if output_check:
+List_result = [Func_spectra_ID(GlySpec) for GlySpec in Func_read_txt_column(Input_result, "GlySpec")]
+Set_result = set(List_result)
+
+# output-info of the spectra in result, in the order of info file, and the lines of each ID
+Dict_info_selected = {}
+with Func_open_file(Input_info) as info_input, open(
+    Input_info.split(".")[0] + "_select.txt", "w"
+) as output:
+    header = info_input.readline()
+    output.write(header)
+    List_header = header.strip().split("\t")
+    column_spectra = max(i for i in range(len(List_header)) if List_header[i] == "Spectra")
+    for line in info_input:
+        info_ID = Func_spectra_ID(line.strip().split("\t")[column_spectra])
+        if info_ID in Set_result:
             output.write(line)
-        line_count += 1
-
-List_info_selected = Func_read_txt_column(Input_info.split(".")[0] + "_select.txt", "Spectra")
-for i in range(len(List_info_selected)):
-    List_info_selected[i] = (
-        List_info_selected[i].split(".")[0] + "-" + List_info_selected[i].split(".")[1]
-    )
-List_info_selected.insert(0, "Spectra.Spectra")
+            Dict_info_selected.setdefault(info_ID, []).append(line)
 
+# output-info of the spectra in the order of result
 with open(Input_info.split(".")[0] + "_select_final.txt", "w") as output:
-    line_count = 0
-    for line in open(Input_info.split(".")[0] + "_select.txt"):
-        output_check = False
-        if line_count == 0:
-            output_check = True
-        if output_check:
-            output.write(line)
-        line_count += 1
-    for i in range(len(List_result)):
-        line_count = 0
-        for line in open(Input_info.split(".")[0] + "_select.txt"):
-            if List_result[i] == List_info_selected[line_count]:
-                output.write(line)
-            line_count += 1
+    output.write(header)
+    for result_ID in List_result:
+        output.writelines(Dict_info_selected.get(result_ID, []))
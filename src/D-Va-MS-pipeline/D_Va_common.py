@@ -0,0 +1,105 @@
+### Shared reading and writing for the D-Va pipeline scripts
+### Files ending with ".gz", ".xz" or ".bz2" are read and written as compressed streams, by the suffix
+
+import bz2
+import gzip
+import lzma
+import os
+
+List_compression = {".gz": gzip, ".xz": lzma, ".bz2": bz2}
+
+
+### compression suffix of a file
+### input (file name)
+### output (".gz", ".xz", ".bz2", or "" for a plain file)
+def Func_compression_suffix(filename):
+    suffix = os.path.splitext(str(filename))[1].lower()
+    return suffix if suffix in List_compression else ""
+
+
+### open a file for reading or writing, the compressed files are handled by the suffix
+### input (file name, mode such as "r", "w", "rb")
+### output (file object)
+def Func_open_file(filename, mode="r"):
+    compression = List_compression.get(Func_compression_suffix(filename))
+    if compression is None:
+        return open(filename, mode)
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+    return compression.open(filename, mode)
+
+
+### get file list from a directory, the compressed files such as "a.mgf.gz" are included
+### input (directory)
+### ouput (file list)
+def Func_file_list(dir, appendix="mgf"):
+    output_list = []
+    file_all = os.listdir(dir)
+    for line in file_all:
+        filepath = os.path.join(dir, line)
+        filepath_plain = filepath[: len(filepath) - len(Func_compression_suffix(filepath))]
+        if filepath_plain.split(".")[-1] == appendix:
+            output_list.append(filepath.split("\\")[-1])
+            print(filepath.split("\\")[-1])
+    return output_list
+
+
+### read columns of a txt file in chunks of rows, the file is read once for all the columns
+### input (txt file, column headers or None for all, dict of column header to type such as float,
+###        number of rows in a chunk or None for all the rows)
+### output (generator of dict of column header to column data)
+def Func_iter_txt_columns(txt_filename, column_names=None, column_types=None, chunk_size=100000):
+    column_types = column_types or {}
+    with Func_open_file(txt_filename) as txt_input:
+        List_header = txt_input.readline().strip().split("\t")
+        # the last column is used for a repeated header
+        column_target = {List_header[i]: i for i in range(len(List_header))}
+        if column_names is None:
+            column_names = list(column_target)
+        List_target = [column_target[column_name] for column_name in column_names]
+        List_type = [column_types.get(column_name) for column_name in column_names]
+        column_data = [[] for column_name in column_names]
+        row_count = 0
+        for line in txt_input:
+            txt_data = line.strip().split("\t")
+            for column, target in zip(column_data, List_target):
+                column.append(txt_data[target])
+            row_count += 1
+            if chunk_size and row_count == chunk_size:
+                yield Func_typed_columns(column_names, column_data, List_type)
+                column_data = [[] for column_name in column_names]
+                row_count = 0
+        if row_count or not chunk_size:
+            yield Func_typed_columns(column_names, column_data, List_type)
+
+
+### convert the column data by the types
+### input (column headers, column data, types or None to keep the text)
+### output (dict of column header to column data)
+def Func_typed_columns(column_names, column_data, List_type):
+    return {
+        column_name: column if column_type is None else [column_type(value) for value in column]
+        for column_name, column, column_type in zip(column_names, column_data, List_type)
+    }
+
+
+### read columns of a txt file at once
+### input (txt file, column headers or None for all, dict of column header to type such as float)
+### output (dict of column header to column data)
+def Func_read_txt_columns(txt_filename, column_names=None, column_types=None):
+    return next(Func_iter_txt_columns(txt_filename, column_names, column_types, chunk_size=None))
+
+
+### export list of column in txt file
+### input (txt file, column header)
+### output (column data)
+def Func_read_txt_column(txt_filename, column_name):
+    return Func_read_txt_columns(txt_filename, [column_name])[column_name]
+
+
+### column headers of a txt file, only the first line is read
+### input (txt file)
+### output (column headers)
+def Func_read_txt_header(txt_filename):
+    with Func_open_file(txt_filename) as txt_input:
+        return txt_input.readline().strip().split("\t")
@@ -6,6 +6,7 @@
 This script create models based on Pytorch.
 
 Created on 8 November 2021.
+Modified on 18 October 2026, look up the embedding directly for the sequence of tokens.
 ################################################################################
 """
 __author__ = 'ZLiang'
@@ -91,13 +92,18 @@ class TestModel(nn.Module):
     def forward(self, sequence, metas, batch_size=1):
         """
         sequence: torch Tensor
-            input batch of shape seq_len * batch_size * input_dim
+            input batch of shape seq_len * batch_size * input_dim for the one hot encoding,
+            or seq_len * batch_size for the tokens (long)
         metas: precursor charge information for the encoding
         batch_size: int, optional
             batch size
         """
         # sequence of shape: seq_len * batch_size
-        embedded_inputs = t.matmul(sequence, self.embedding_module.weight)
+        if sequence.dim() == 2:
+            # The tokens are looked up by the embedding, the same as the one hot encoding times the weight.
+            embedded_inputs = self.embedding_module(sequence)
+        else:
+            embedded_inputs = t.matmul(sequence, self.embedding_module.weight)
         seq_len = embedded_inputs.shape[0]
         # *metas.shape equals to metas.shape[0]
         #metas = metas.view(1, *metas.shape).repeat(seq_len, 1, 1)
@@ -114,7 +120,7 @@ class TestModel(nn.Module):
     def predict(self, sequence, metas, batch_size=1, gpu=True):
         """
         sequence: torch Tensor
-            input batch of shape seq_len * batch_size * input_dim
+            input batch of shape seq_len * batch_size * input_dim, or seq_len * batch_size for the tokens
         batch_size: int, optional
             batch size
         gpu: bool, optional
@@ -8,6 +8,7 @@ The output is a msp file similar to the glycopeptide spectral library.
 
 Created on 01 June 2022.
 Modified on 27 Aug 2022, to support 9 different types ions with maximum charge of 6.
+Modified on 18 October 2026, encode the glycopeptide as the uint8 tokens for the embedding lookup of the model.
 ########################################################################################################################
 """
 __author__ = 'ZLiang'
@@ -22,6 +23,7 @@ import time
 import numpy as np
 import pandas as pd
 import spectral_library.parse_msp_to_csv as msp_to_csv
+import spectral_library.training_data as training_data
 import spectral_library.calculate_fragment_mz as calculate_mz
 
 os.environ['CUDA_VISIBLE_DEVICES'] = '1'
@@ -138,11 +140,11 @@ def predict_by_sequence(input_path, saved_model, output_path):
                     monosaccharides = monosaccharides.replace(monosaccharide, monosaccharide_code)
                 glycan_pad_name = monosaccharides + 'Z' * left_glycan_length
                 glycopeptide_name = peptide_pad_name + glycan_pad_name
-                glycopeptide_one_hot_encoded = msp_to_csv.one_hot_encode(glycopeptide_name,
-                                                  msp_to_csv.amino_acid_monosaccharide_zero_codes)
+                # The tokens (50,) are looked up by the embedding of the model, without the one hot encoding.
+                glycopeptide_tokens = training_data.encode_tokens(glycopeptide_name)
                 ion_charge = int(df_sequence.iloc[index]['charge'])
 
-                Xs.append(np.array(glycopeptide_one_hot_encoded))
+                Xs.append(glycopeptide_tokens)
                 X_metas.append(ion_charge)
 
             # Construct data frame for the deep learning model
@@ -150,9 +152,9 @@ def predict_by_sequence(input_path, saved_model, output_path):
             sample_pred = trainer.predict(sample_input)
 
             for i, pred in enumerate(sample_pred):
-                glycopeptide_seq = [list(X) for X in sample_input[i][0]]
+                glycopeptide_seq = sample_input[i][0]
                 charge = sample_input[i][1]
-                glycopeptide_name = calculate_mz.CalculateFragmentMZ.reverse_one_hot_encode(
+                glycopeptide_name = calculate_mz.CalculateFragmentMZ.reverse_token_encode(
                     glycopeptide_seq, msp_to_csv.amino_acid_monosaccharide_zero_codes)
 
                 # Get the peptide length and glycan length
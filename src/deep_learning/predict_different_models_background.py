@@ -10,6 +10,8 @@ Modified on 14 April 2022, for the command line interface and batch processing.
 Modified on 27 April 2022, for the batch processing of testing and outputting the prediction for each spectrum.
 Modified on 29 April 2022, for the batch processing of testing based on different models.
 Modified on 10 May 2022, for the background running, to solve the permission issue.
+Modified on 18 October 2026, densify the sparse y of the testing pkl files for the evaluation.
+Modified on 18 October 2026, test the npz shards from "parse_msp_to_csv.py -OF=shard" if they exist.
 ########################################################################################################################
 """
 __author__ = 'ZLiang'
@@ -20,9 +22,10 @@ import numpy as np
 import pandas as pd
 from biLSTM import BiLSTM, MultiheadAttention
 from models import TestModel
-from trainer import Trainer
+from trainer import Trainer, densify_y, load_shard
 from sklearn.metrics import precision_score, recall_score
 import os
+import sys
 import pickle
 import torch as t
 import argparse
@@ -66,7 +69,7 @@ def evaluate(inputs, preds, thr=0.01):
     cos_sims = []
 
     for inp, pred in zip(inputs, preds):
-        label = inp[2]
+        label = densify_y(inp[2])
         _label = label > thr
         _pred = pred > thr
         precisions.append(precision_score(_label.flatten(), _pred.flatten()))
@@ -116,13 +119,18 @@ def predict_models(model_path, input_type, top_number, test_path):
 
     if input_type == 'N':
         pkl_name = 'N-GP-PKL-TOP-' + str(top_number)
-        pkl_path = path_name / pkl_name
+        shard_name = 'N-GP-SHARD-TOP-' + str(top_number)
     elif input_type == 'O':
         pkl_name = 'O-GP-PKL-TOP-' + str(top_number)
-        pkl_path = path_name / pkl_name
+        shard_name = 'O-GP-SHARD-TOP-' + str(top_number)
     else:
         print("Error Input Type!")
         return
+    # Test the npz shards if they exist, otherwise the pkl files from "parse_csv_to_pkl.py".
+    pkl_path = path_name / shard_name
+    if not pkl_path.is_dir():
+        pkl_path = path_name / pkl_name
+    assert pkl_path.is_dir(), f"No testing folder of {shard_name} or {pkl_name}!"
 
     print(f"The pkl path is: {pkl_path.absolute()}")
 
@@ -157,8 +165,11 @@ def predict_models(model_path, input_type, top_number, test_path):
         # Iterate all the pickle files in the testing folder
         j: int
         for j, test_file in enumerate(pkl_path.iterdir()):
-            test_pickle = pickle.load(open(test_file, 'rb'))
-            test_file_lists[j] = test_pickle
+            if test_file.suffix == '.npz':
+                test_file_lists[j] = load_shard(test_file)
+            else:
+                test_pickle = pickle.load(open(test_file, 'rb'))
+                test_file_lists[j] = test_pickle
             test_name_lists[j] = test_file.stem
 
         precisions_total = []
@@ -252,4 +263,6 @@ if __name__ == "__main__":
     try:
         user_interface(args.ModelPath, args.InputType, args.TopNumber, args.TestingPath)
     except Exception as e:
-        print(e)
\ No newline at end of file
+        print(e)
+        # Exit with an error, so that the evaluation is not skipped silently by run_train_test.sh.
+        sys.exit(1)
\ No newline at end of file
@@ -11,12 +11,13 @@ Modified on 14 April 2022, for the command line interface and batch processing.
 Modified on 21 April 2022, lock down for the batch process, by reading all the training files into memory.
 Modified on 22 April 2022, focus on the training dataset of Training-01-Human-285 for top one de novo candidate.
 Modified on 18 May 2022, output information for each epoch, and the maximum number of epochs is 50, for cyno and mouse.
+Modified on 18 October 2026, read the npz shards of (X, X_meta, y) from "parse_msp_to_csv.py -OF=shard".
 ########################################################################################################################
 """
 __author__ = 'ZLiang'
 
 from models import TestModel
-from trainer import Trainer
+from trainer import Trainer, load_shard
 import os
 import pickle
 import torch as t
@@ -74,7 +75,7 @@ trainer = Trainer(net, opt)
 # Training the model from the train_path, save the trained models in saved_model_path.
 def train_model_cyno(train_path, saved_model_path):
     """
-    :param train_path: the pkl files for the training;
+    :param train_path: the pkl files, or the npz shards, for the training;
     :param saved_model_path: saved models after training.
     :return:
     """
@@ -91,9 +92,13 @@ def train_model_cyno(train_path, saved_model_path):
     train_input = []
 
     num_train_files = 0
-    # Iterate all the pickle files in the training folder
-    for train_file in train_folder.iterdir():
+    # Iterate all the pickle files (or npz shards) in the training folder, sorted to keep the order of the shards.
+    for train_file in sorted(train_folder.iterdir()):
         num_train_files += 1
+        if train_file.suffix == '.npz':
+            # A shard is split into samples as in a pickle file, y is densified by the trainer.
+            train_input.extend(load_shard(train_file))
+            continue
         train_pickle = pickle.load(open(train_file, 'rb'))
         # add each pickle file into the list, should use "extend", not "append".
         train_input.extend(train_pickle)
@@ -150,7 +155,7 @@ Input parameters for the user interface:
 parser = argparse.ArgumentParser(description='Input parameters to run the script.')
 parser.add_argument('--TrainingPath', '-TA',
                     help='Input Training Path parameter，required, no default. such as '
-                         '/data/Training-01-Human-285/N-GP-PKL.',
+                         '/data/Training-01-Human-285/N-GP-PKL, or /data/Training-01-Human-285/N-GP-SHARD-TOP-1.',
                     required=False)
 parser.add_argument('--SavedModelPath', '-SM',
                     help='Output Saved Model Path parameter，required，no default. Such as '
@@ -6,6 +6,9 @@
 This script create trainer based on Pytorch.
 
 Created on 5 November 2021.
+Modified on 18 October 2026, densify the sparse y lazily for each batch.
+Modified on 18 October 2026, keep the tokens of X as long for the embedding lookup of the model.
+Modified on 18 October 2026, load the npz shards for the training and the testing.
 ################################################################################
 """
 __author__ = 'ZLiang'
@@ -22,6 +25,62 @@ from torch.utils.data import Dataset, DataLoader
 import os
 
 
+# The same formats as training_data.densify_y and training_data.load_shard in spectral_library, which is not
+# importable when the scripts of deep_learning are run directly.
+def densify_y(y):
+    """ Densify a sparse y into an array
+
+    y: tuple or np.ndarray
+        a sparse y of (shape, flat indices, values), or a dense y which is returned as it is
+    """
+    if isinstance(y, tuple):
+        shape, indices, values = y
+        dense_y = np.zeros(shape)
+        dense_y.flat[indices] = values
+        return dense_y
+    return y
+
+
+def load_shard(shard_file):
+    """ Load an npz shard into samples as in a pickle file
+
+    shard_file: Path
+        a shard with the tokens of X, the dense X_meta, and the sparse y of (shape, flat indices, values) with
+        the offsets for the samples, y is kept sparse and densified for each batch
+    """
+    with np.load(shard_file) as shard:
+        y_shape = tuple(shard['y_shape'].tolist())
+        y_offsets = shard['y_offsets']
+        y_indices = shard['y_indices']
+        y_values = shard['y_values']
+        ys = [(y_shape, y_indices[y_offsets[i]:y_offsets[i + 1]], y_values[y_offsets[i]:y_offsets[i + 1]])
+              for i in range(len(y_offsets) - 1)]
+        return list(zip(shard['X'], shard['X_meta'], ys))
+
+
+def stack_y(batch_y):
+    """ Stack the y of a batch, the sparse y are densified and padded here
+
+    batch_y: list
+        list of (y, pad_length) from assemble_batch with lazy_y
+    """
+    return np.stack([np.pad(densify_y(y), ((0, pad_length), (0, 0)), 'constant') for y, pad_length in batch_y],
+                    axis=1)
+
+
+def sequence_tensor(X):
+    """ Convert the X of a batch into a tensor for the network
+
+    X: np.ndarray or torch Tensor
+        the tokens of shape seq_len * batch_size, which are kept as long for the embedding lookup,
+        or the one hot encoding of shape seq_len * batch_size * input_dim, which is converted to float
+    """
+    X = t.as_tensor(X)
+    if X.dim() == 2:
+        return Variable(X.long())
+    return Variable(X.float())
+
+
 class Trainer(object):
     """ Default trainer for the network """
     def __init__(self,
@@ -45,7 +104,7 @@ class Trainer(object):
         if self.opt.gpu:
             self.net = self.net.cuda()
 
-    def assemble_batch(self, data, batch_size=None, sort=True):
+    def assemble_batch(self, data, batch_size=None, sort=True, lazy_y=False):
         """ Assemble data into batches
 
         data: list
@@ -56,11 +115,14 @@ class Trainer(object):
             specify batch size if given
         sort: bool, optional
             if to reorder samples in the data to ease training
+        lazy_y: bool, optional
+            if to keep y as a list of (y, pad_length) for each batch, which is densified by stack_y,
+            so that the sparse y are only densified for the running batch
         """
         if batch_size is None:
             batch_size = self.opt.batch_size
 
-        # Sort by length
+        # Sort by length, X is the tokens (seq_len,) or the one hot encoding (seq_len, input_dim)
         if sort:
             lengths = [x[0].shape[0] for x in data]
             order = np.argsort(lengths)
@@ -77,10 +139,14 @@ class Trainer(object):
             for sample in batch:
                 sample_length = sample[0].shape[0]
                 X = deepcopy(sample[0][:])
-                y = deepcopy(sample[2][:])
-                out_batch_X.append(np.pad(X, ((0, batch_length - sample_length), (0, 0)), 'constant'))
+                out_batch_X.append(np.pad(X, ((0, batch_length - sample_length),) + ((0, 0),) * (X.ndim - 1),
+                                          'constant'))
                 out_batch_X_metas.append(sample[1])
-                out_batch_y.append(np.pad(y, ((0, batch_length - sample_length), (0, 0)), 'constant'))
+                if lazy_y:
+                    out_batch_y.append((sample[2], batch_length - sample_length))
+                else:
+                    y = deepcopy(densify_y(sample[2])[:])
+                    out_batch_y.append(np.pad(y, ((0, batch_length - sample_length), (0, 0)), 'constant'))
                 #assert X.shape[0] - y.shape[0] == 1
                 # Consider glycopeptide for M ions.
                 #assert X.shape[0] - y.shape[0] == 0
@@ -93,7 +159,7 @@ class Trainer(object):
 
             data_batches.append((np.stack(out_batch_X, axis=1),
                                  np.stack(out_batch_X_metas, axis=0),
-                                 np.stack(out_batch_y, axis=1)))
+                                 out_batch_y if lazy_y else np.stack(out_batch_y, axis=1)))
         return data_batches
 
     def save(self, path):
@@ -133,16 +199,16 @@ class Trainer(object):
             epochs = n_epochs
         n_points = len(data)
 
-        data_batches = self.assemble_batch(data)
+        data_batches = self.assemble_batch(data, lazy_y=True)
 
         for epoch in range(epochs):
             np.random.shuffle(data_batches)
             loss = 0
             print('start epoch {epoch}'.format(epoch=epoch))
             for batch in data_batches:
-                X = Variable(t.from_numpy(batch[0])).float()
+                X = sequence_tensor(batch[0])
                 X_metas = Variable(t.from_numpy(batch[1])).float()
-                y = Variable(t.from_numpy(batch[2])).float()
+                y = Variable(t.from_numpy(stack_y(batch[2]))).float()
                 if self.opt.gpu:
                     X = X.cuda()
                     X_metas = X_metas.cuda()
@@ -166,7 +232,7 @@ class Trainer(object):
         test_batches = self.assemble_batch(test_data, batch_size=1, sort=False)
         preds = []
         for sample in test_batches:
-            X = Variable(t.from_numpy(sample[0])).float()
+            X = sequence_tensor(sample[0])
             X_metas = Variable(t.from_numpy(sample[1])).float()
             y = Variable(t.from_numpy(sample[2])).float()
             if self.opt.gpu:
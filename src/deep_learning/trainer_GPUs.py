@@ -6,6 +6,8 @@
 This script create trainer based on Pytorch.
 
 Created on 4 April 2022.
+Modified on 18 October 2026, densify the sparse y lazily for each batch.
+Modified on 18 October 2026, keep the tokens of X as long for the embedding lookup of the model.
 ################################################################################
 """
 __author__ = 'ZLiang'
@@ -22,6 +24,44 @@ from torch.utils.data import Dataset, DataLoader
 import os
 
 
+# A copy of densify_y in trainer.py.
+def densify_y(y):
+    """ Densify a sparse y into an array
+
+    y: tuple or np.ndarray
+        a sparse y of (shape, flat indices, values), or a dense y which is returned as it is
+    """
+    if isinstance(y, tuple):
+        shape, indices, values = y
+        dense_y = np.zeros(shape)
+        dense_y.flat[indices] = values
+        return dense_y
+    return y
+
+
+def stack_y(batch_y):
+    """ Stack the y of a batch, the sparse y are densified and padded here
+
+    batch_y: list
+        list of (y, pad_length) from assemble_batch with lazy_y
+    """
+    return np.stack([np.pad(densify_y(y), ((0, pad_length), (0, 0)), 'constant') for y, pad_length in batch_y],
+                    axis=1)
+
+
+def sequence_tensor(X):
+    """ Convert the X of a batch into a tensor for the network
+
+    X: np.ndarray or torch Tensor
+        the tokens of shape seq_len * batch_size, which are kept as long for the embedding lookup,
+        or the one hot encoding of shape seq_len * batch_size * input_dim, which is converted to float
+    """
+    X = t.as_tensor(X)
+    if X.dim() == 2:
+        return Variable(X.long())
+    return Variable(X.float())
+
+
 class BatchSpectraDataset(Dataset):
     """ Dataset object for the data loading """
 
@@ -49,8 +89,13 @@ class BatchSpectraDataset(Dataset):
         if index >= self.length:
             raise IndexError
         out_batch = []
-        # items are X, X_meta, and y.
-        for item in self.batches[index]:
+        # items are X, X_meta, and y, y is a list of (y, pad_length) to densify for this batch.
+        for i, item in enumerate(self.batches[index]):
+            if i == 2 and isinstance(item, list):
+                item = stack_y(item)
+            if i == 0:
+                out_batch.append(sequence_tensor(item))
+                continue
             out_item = Variable(t.as_tensor(np.array(item).astype(np.float32)))
             out_batch.append(out_item)
             #out_batch.extend(out_item)
@@ -81,7 +126,7 @@ class Trainer_GPUs(object):
         if self.opt.gpu:
             self.net = self.net.cuda()
 
-    def assemble_batch(self, data, batch_size=None, sort=True):
+    def assemble_batch(self, data, batch_size=None, sort=True, lazy_y=False):
         """ Assemble data into batches
 
         data: list
@@ -92,11 +137,14 @@ class Trainer_GPUs(object):
             specify batch size if given
         sort: bool, optional
             if to reorder samples in the data to ease training
+        lazy_y: bool, optional
+            if to keep y as a list of (y, pad_length) for each batch, which is densified by stack_y,
+            so that the sparse y are only densified for the running batch
         """
         if batch_size is None:
             batch_size = self.opt.batch_size
 
-        # Sort by length
+        # Sort by length, X is the tokens (seq_len,) or the one hot encoding (seq_len, input_dim)
         if sort:
             lengths = [x[0].shape[0] for x in data]
             order = np.argsort(lengths)
@@ -113,10 +161,14 @@ class Trainer_GPUs(object):
             for sample in batch:
                 sample_length = sample[0].shape[0]
                 X = deepcopy(sample[0][:])
-                y = deepcopy(sample[2][:])
-                out_batch_X.append(np.pad(X, ((0, batch_length - sample_length), (0, 0)), 'constant'))
+                out_batch_X.append(np.pad(X, ((0, batch_length - sample_length),) + ((0, 0),) * (X.ndim - 1),
+                                          'constant'))
                 out_batch_X_metas.append(sample[1])
-                out_batch_y.append(np.pad(y, ((0, batch_length - sample_length), (0, 0)), 'constant'))
+                if lazy_y:
+                    out_batch_y.append((sample[2], batch_length - sample_length))
+                else:
+                    y = deepcopy(densify_y(sample[2])[:])
+                    out_batch_y.append(np.pad(y, ((0, batch_length - sample_length), (0, 0)), 'constant'))
                 #assert X.shape[0] - y.shape[0] == 1
                 # Consider glycopeptide for M ions.
                 #assert X.shape[0] - y.shape[0] == 0
@@ -129,7 +181,7 @@ class Trainer_GPUs(object):
 
             data_batches.append((np.stack(out_batch_X, axis=1),
                                  np.stack(out_batch_X_metas, axis=0),
-                                 np.stack(out_batch_y, axis=1)))
+                                 out_batch_y if lazy_y else np.stack(out_batch_y, axis=1)))
         return data_batches
 
     def save(self, path):
@@ -169,7 +221,7 @@ class Trainer_GPUs(object):
             epochs = n_epochs
         n_points = len(data)
 
-        data_batches = self.assemble_batch(data)
+        data_batches = self.assemble_batch(data, lazy_y=True)
         dataset = BatchSpectraDataset(data_batches)
         data_loader = DataLoader(dataset, batch_size=1, shuffle=True, num_workers=4)
 
@@ -179,7 +231,7 @@ class Trainer_GPUs(object):
             print('start epoch {epoch}'.format(epoch=epoch))
             for batch in data_loader:
                 # Should squeeze the dimension for 0
-                X = Variable(t.squeeze(t.as_tensor(np.array(batch[0]).astype(np.float32)), 0))
+                X = sequence_tensor(t.squeeze(batch[0], 0))
                 X_metas = Variable(t.squeeze(t.as_tensor(np.array(batch[1]).astype(np.float32)), 0))
                 y = Variable(t.squeeze(t.as_tensor(np.array(batch[2]).astype(np.float32)), 0))
                 if self.opt.gpu:
@@ -205,7 +257,7 @@ class Trainer_GPUs(object):
         test_batches = self.assemble_batch(test_data, batch_size=1, sort=False)
         preds = []
         for sample in test_batches:
-            X = Variable(t.from_numpy(sample[0])).float()
+            X = sequence_tensor(sample[0])
             X_metas = Variable(t.from_numpy(sample[1])).float()
             y = Variable(t.from_numpy(sample[2])).float()
             if self.opt.gpu:
@@ -14,11 +14,13 @@ Modified on 24 February 2022 for combining amino acid 'I' and 'L' into 'X', to s
 Modified on 28 February 2022 for handling the fixed modification for amino acid 'C', such as Carbamidomethyl[C].
 Modified on 04 June 2022 for calculating precursor ion mass, and annotations.
 Modified on 27 August 2022 for handling nine fragmented ions.
+Modified on 18 October 2026 for decoding the one hot encoding and the uint8 tokens by the look-up of the code.
 ################################################################################
 """
 __author__ = 'ZLiang'
 
 from pyteomics import mass
+import numpy as np
 
 # Using special characters to represent five monosaccharides
 monosaccharide_component_replacements = {
@@ -138,17 +140,37 @@ class CalculateFragmentMZ(object):
         if not isinstance(code, (str, )):
             raise ValueError("code must be a string")
 
-        letters = []
-        for vector in vectors:
-            i = vector.index(1)  # get the index of the item which is 1
-            letters.append(code[i])
-        return "".join(letters)
+        if len(vectors) == 0:
+            return ""
+        # get the index of the item which is 1 for all the vectors at once
+        hits = np.asarray(vectors) == 1
+        if not hits.any(axis=1).all():
+            raise ValueError("1 is not in list")
+        return CalculateFragmentMZ.reverse_token_encode(hits.argmax(axis=1), code)
+
+    # Transfer the tokens back into the sequence
+    @staticmethod
+    def reverse_token_encode(tokens, code):
+        """
+        read the tokens, and convert them into a sequence
+        :param tokens: the indices of the letters in the code, a NumPy array or a list, such as [8, 18, 18, ..., 25];
+        :param code: rule for the encoding, such as "ACDEFGHJKMNPQRSTVWXY!@#$%Z"
+        :return: the corresponding sequence, such as "YKJNSDXSSTRZZZZZZZZZZZZZZZZZZZZZ@@!!!!!!ZZZZZZZZZZ"
+        """
+        # Check the input types
+        if not isinstance(tokens, (list, np.ndarray)):
+            raise ValueError("tokens must be a list or a NumPy array")
+        if not isinstance(code, (str, )):
+            raise ValueError("code must be a string")
+
+        return "".join(np.array(list(code))[np.asarray(tokens, dtype=np.intp)].tolist())
 
 
     # Get fragmented ion mass from one hot encoding
     def get_frag_mz(self, one_hot, ion_position, ion_number, ion_charge):
         """
         :param one_hot: one hot encoding, lists, such as [[0,0,1,...,0],...,[0,1,0,...,0]];
+                        or the tokens, a NumPy array, such as np.array([2, ..., 1], dtype=np.uint8);
         :param ion_position: integer, ion position, such as 4;
         :param ion_number: ion type of number, b, b$, b-N(1), y, u$, b-N(1), Y0, Y$, Y ions, such as 0, 1, 2, ..., 7, 8;
         :param ion_charge: ion charge, integer, such as 1, 2, 3;
@@ -156,8 +178,8 @@ class CalculateFragmentMZ(object):
         """
 
         # Check the input types
-        if not isinstance(one_hot, (list, )):
-            raise ValueError("one_hot must be a list")
+        if not isinstance(one_hot, (list, np.ndarray)):
+            raise ValueError("one_hot must be a list or a NumPy array")
         if not isinstance(ion_position, (int, )):
             raise ValueError("ion_position must be an integer")
         if not isinstance(ion_number, (int,)):
@@ -165,7 +187,10 @@ class CalculateFragmentMZ(object):
         if not isinstance(ion_charge, (int,)):
             raise ValueError("ion_charge must be an integer")
 
-        pep_seq = self.reverse_one_hot_encode(one_hot, amino_acid_monosaccharide_zero_codes)
+        if isinstance(one_hot, np.ndarray) and one_hot.ndim == 1:
+            pep_seq = self.reverse_token_encode(one_hot, amino_acid_monosaccharide_zero_codes)
+        else:
+            pep_seq = self.reverse_one_hot_encode(list(one_hot), amino_acid_monosaccharide_zero_codes)
         #print(pep_seq)
         """
         For b ion, the position is the length of b ion, the length is from left to right;
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script opens the files of the stages by the suffix of the name, the files ending with ".gz", ".xz" or ".bz2"
+are decompressed on reading, and compressed on writing, as streams, so the archives need not be decompressed to
+the disk first. The other files are opened as they are by "open".
+Such as "sample.msp.gz" is read as "sample.msp", and the outputs for it keep the compression, like
+"sample.csv.gz" and "denovo_sample.msp.gz".
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+
+
+# The suffixes of the compressed files, and the modules to open them.
+compressions = {
+    '.gz': gzip,
+    '.xz': lzma,
+    '.bz2': bz2,
+}
+
+
+def compression_suffix(file):
+    """
+    :param file: a file name or a Path, such as "sample.msp.gz";
+    :return: the suffix of the compression, such as ".gz", or "" for a file which is not compressed.
+    """
+    suffix = Path(file).suffix.lower()
+    return suffix if suffix in compressions else ''
+
+
+def is_compressed(file):
+    """
+    :param file: a file name or a Path;
+    :return: True if the file is compressed by the suffix.
+    """
+    return compression_suffix(file) != ''
+
+
+def split_compression(file):
+    """
+    :param file: a file name or a Path, such as "/data/N-GP-MSP/sample.msp.gz";
+    :return: the Path without the suffix of the compression, such as "/data/N-GP-MSP/sample.msp", and the suffix,
+             such as ".gz", so that the suffix and the stem of the file could be checked as a plain file.
+    """
+    file = Path(file)
+    suffix = compression_suffix(file)
+    if suffix:
+        return file.with_name(file.name[:-len(suffix)]), suffix
+    return file, ''
+
+
+def find_file(file):
+    """
+    :param file: a plain file name or a Path, such as "sample.mgf-glabel.txt";
+    :return: the file if it exists, otherwise the compressed file which exists, such as "sample.mgf-glabel.txt.gz",
+             or the file itself if neither exists.
+    """
+    file = Path(file)
+    if file.exists():
+        return file
+    for suffix in compressions:
+        compressed_file = file.with_name(file.name + suffix)
+        if compressed_file.exists():
+            return compressed_file
+    return file
+
+
+def open_file(file, mode='r', **kwargs):
+    """
+    Open a file the same as "open", the compressed files are opened as streams by the suffix.
+    :param file: a file name or a Path, such as "sample.msp" or "sample.msp.gz";
+    :param mode: the mode, such as "r", "w", "rb", the text mode is used for the compressed files without "b";
+    :param kwargs: the other arguments of "open" for the text mode, such as "newline" and "encoding";
+    :return: a file object.
+    """
+    compression = compressions.get(compression_suffix(file))
+    if compression is None:
+        return open(file, mode, **kwargs)
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    return compression.open(file, mode, **kwargs)
@@ -9,6 +9,10 @@ ignore the unannotated ones.
 
 For the purpose of machine learning and deep learning.
 Created on 10 August 2021, modified on 17 September 2021.
+Modified on 18 October 2026, join the spectra with gLabel by an index from titles to rows.
+Modified on 18 October 2026, read the compressed mgf and gLabel files, such as "sample.mgf.gz".
+Modified on 18 October 2026, read the mgf files with the shared mgf reader instead of the pyteomics.
+Modified on 18 October 2026, match the peaks with the ions from gLabel within a tolerance.
 
 TBD: Need to modified for keeping all the information.
 ################################################################################
@@ -16,29 +20,30 @@ TBD: Need to modified for keeping all the information.
 __author__ = 'ZLiang'
 
 
-from pyteomics import mgf, auxiliary
-import pandas as pd
+from mgf_reader import read_mgf
+from glabel_index import GLabelIndex, match_peaks
+from compressed_io import open_file, split_compression, find_file
 import numpy as np
+import argparse
 import decimal
 import os
 
-# define binary search for the glabel['spec']
-def binary_search(spectra, target):
-    if len(spectra) == 0:
-        return -1
-    left = mid = 0
-    right = len(spectra) - 1
-    while left <= right:
-        # should use int here
-        mid = int(left + (right - left) / 2)
-        if spectra.iloc[mid] == target:
-            return mid
-        elif spectra.iloc[mid] < target:
-            left = mid + 1
-        else:
-            right = mid - 1
-    # End condition: left > right
-    return -1
+"""
+Input parameters:
+    1   Tolerance to match the peaks with the ions from gLabel
+    2   Unit of the tolerance
+"""
+parser = argparse.ArgumentParser(description='Input parameters to run the script.')
+parser.add_argument('--Tolerance', '-TL',
+                    help='Tolerance parameter, not required, has default. Such as 0.001 for Da or 10 for ppm.',
+                    required=False, default='0.001')
+parser.add_argument('--ToleranceUnit', '-TU',
+                    help='Tolerance unit parameter, not required, has default. Da or ppm.',
+                    required=False, default='Da')
+args = parser.parse_args()
+tolerance = float(args.Tolerance)
+unit = args.ToleranceUnit
+assert unit in ('Da', 'ppm'), "Wrong Unit of Tolerance!"
 
 # define file path, and mgf, msp, pglyco, glabel files.
 # Should consider all the folds in file_path, to generate the library automatically. And there is a raw file folder,
@@ -66,65 +71,48 @@ if os.path.exists(mgf_path):
     for mgf_file in mgf_files:
         # Judge whether mgf is a folder, only open it as a mgf file
         if not os.path.isdir(mgf_file):
-            # get the filename without the extension using 'rsplit',
-            mgf_name = mgf_file.rsplit('.', 1)[0]
+            # get the filename without the extension (and the compression, such as '.gz') using 'rsplit',
+            mgf_plain_file = split_compression(mgf_file)[0].name
+            mgf_name = mgf_plain_file.rsplit('.', 1)[0]
             # remove 'formatted' by '_'
             file_name = mgf_name.split('_')[0]
             # add 'N-' at the start for pGlyco
             pGlyco_name = 'N-' + file_name
             # add '.msp' to generate the msp file
-            glabel_file = glabel_path + mgf_file + '-glabel.txt'
+            glabel_file = find_file(glabel_path + mgf_plain_file + '-glabel.txt')
             # Load gLabel
-            glabel = pd.read_csv(glabel_file, sep='\t', header=0, encoding='utf8', engine='python',
-                                 error_bad_lines=False)
-            glabel_sort = glabel.sort_values(by=["spec"])
+            glabel_index = GLabelIndex(glabel_file, glycan_column='glycan(H,N,F,A)')
             # create msp file
-            msp_name = pGlyco_name + '.msp'
+            msp_name = pGlyco_name + '.msp' + split_compression(mgf_file)[1]
             msp_file = msp_path + msp_name
             mgf_path_file = mgf_path + mgf_file
-            with open(msp_file, 'w') as writer:
-                with mgf.read(mgf_path_file) as reader:
-                    for spectrum in reader:
-                        index = binary_search(glabel_sort['spec'], spectrum['params']['title'])
-                        if index != -1:
-                            anno_array = ['' for i in range(len(spectrum['m/z array']))]
-                            matched_ions = glabel_sort.iloc[index]['matched_ion'].split(';')
-                            ion_dic = {}
-                            for ion in matched_ions:
-                                # ion format is 'Y-H(3)N(3)+1=1996.916,4248.5', ion_anno[0] is Y-H(3)N(3)+1, ion_mass[0] is 1996.916
-                                ion_anno = ion.split('=')
-                                ion_mass = ion_anno[1].split(',')
-                                ion_dic[ion_mass[0]] = ion_anno[0]
-                            # for each MS2, find the annotation information，
-                            for i in range(len(spectrum['m/z array'])):
-                                mz = spectrum['m/z array'][i]
-                                mz_str = str(mz)
-                                if mz_str in ion_dic:
-                                    anno_array[i] = ion_dic.get(mz_str)
-                            # For the MS2 spectra,
-                            # if annotated, keep it for the new MS2 information, otherwise remove it now
-                            spectrum_mz = []
-                            spectrum_intensity = []
-                            spectrum_annotation = []
-                            for i in range(len(spectrum['m/z array'])):
-                                if anno_array[i] != '':
-                                    spectrum_mz.append(spectrum['m/z array'][i])
-                                    spectrum_intensity.append(spectrum['intensity array'][i])
-                                    spectrum_annotation.append(anno_array[i])
-                            writer.write('Name: ' + spectrum['params']['title'] + '\n')
-                            writer.write('MW: ' + str(spectrum['params']['pepmass'][0]) + '\n')
-                            writer.write('Comment: ' + 'CHARGE=' + str(spectrum['params']['charge']) + '\t' + \
-                                         'RTINSECONDS=' + str(spectrum['params']['rtinseconds']) + '\t' + \
-                                         'PEPTIDE=' + glabel_sort.iloc[index]['peptide'] + '\t' + \
-                                         'MODIFICATIONS=' + str(glabel_sort.iloc[index]['modinfo']) + '\t' + \
-                                         'GLYCAN(H,N,F,A)=' + str(glabel_sort.iloc[index]['glycan(H,N,F,A)']) + '\t' + \
-                                         'GLYCANS=' + str(glabel_sort.iloc[index]['formula']) + '\n')
-                            writer.write('Num Peaks: ' + str(len(spectrum_mz)) + '\n')
-                            for i in range(len(spectrum_mz)):
-                                writer.write(
-                                    str(spectrum_mz[i]) + '\t' + str(spectrum_intensity[i]) + '\t' \
-                                    + str(spectrum_annotation[i]) + '\n')
-                            writer.write('\n')
+            with open_file(msp_file, 'w') as writer:
+                for spectrum in read_mgf(mgf_path_file):
+                    # Only keep the first identification of a spectrum
+                    rows = glabel_index.rows(spectrum.title)
+                    if len(rows) > 0:
+                        index = rows[0]
+                        ion_mz, ion_annotations = glabel_index.matched_ion_arrays(index)
+                        # for each MS2, find the annotation information within the tolerance,
+                        # if annotated, keep it for the new MS2 information, otherwise remove it now
+                        peak_indices, ion_indices = match_peaks(spectrum.mz, ion_mz, tolerance, unit)
+                        spectrum_mz = spectrum.mz[peak_indices]
+                        spectrum_intensity = spectrum.intensity[peak_indices]
+                        spectrum_annotation = [ion_annotations[i] for i in ion_indices]
+                        writer.write('Name: ' + spectrum.title + '\n')
+                        writer.write('MW: ' + str(spectrum.precursor_mz) + '\n')
+                        writer.write('Comment: ' + 'CHARGE=' + spectrum.charge + '\t' + \
+                                     'RTINSECONDS=' + str(spectrum.retention_time) + '\t' + \
+                                     'PEPTIDE=' + glabel_index.value('peptide', index) + '\t' + \
+                                     'MODIFICATIONS=' + str(glabel_index.value('modinfo', index)) + '\t' + \
+                                     'GLYCAN(H,N,F,A)=' + str(glabel_index.glycan(index)) + '\t' + \
+                                     'GLYCANS=' + str(glabel_index.value('formula', index)) + '\n')
+                        writer.write('Num Peaks: ' + str(len(spectrum_mz)) + '\n')
+                        for i in range(len(spectrum_mz)):
+                            writer.write(
+                                str(spectrum_mz[i]) + '\t' + str(spectrum_intensity[i]) + '\t' \
+                                + str(spectrum_annotation[i]) + '\n')
+                        writer.write('\n')
                 writer.close()
         else:
             print('The mgf file you specified is a folder. \n')
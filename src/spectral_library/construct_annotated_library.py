@@ -15,127 +15,97 @@ Add Command Line Interface (CLI) On 16 Feb 2022 for the user input.
 Modified On 27 Mar 2022: add Glycopeptide for "N" or "O" in the CLI.
 Modified on 13 April 2022, for the handling of N and O linked glycopeptides.
 Modified on 22 Aug 2022, for the handling of duplicated IDs from gLabel that matched a spectrum from mgf file.
+Modified on 18 October 2026, join the spectra with gLabel by an index from titles to rows.
+Modified on 18 October 2026, match the peaks with the ions from gLabel within a tolerance.
+Modified on 18 October 2026, read the compressed mgf and gLabel files, and compress the msp files the same way.
+Modified on 18 October 2026, skip the mgf files whose msp files are current by the manifest, and resume the runs.
+Modified on 18 October 2026, read the mgf files with the shared mgf reader instead of the pyteomics.
 ################################################################################
 """
 __author__ = 'Zhewei Liang: zliang@venn.bio'
 
 
-from pyteomics import mgf
-import pandas as pd
+from mgf_reader import read_mgf
+from glabel_index import GLabelIndex, match_peaks
+from compressed_io import open_file, split_compression, find_file
+from run_manifest import RunManifest, code_version, manifest_file
 import argparse
 from pathlib import Path
 import time
 
 
-# Binary search for the glabel['spec']
-def binary_search(spectra, target):
-    """
-    using binary search to find the target from the spectra
-    :param spectra:
-    :param target:
-    :return:
-    """
-    if len(spectra) == 0:
-        return -1
-    left = mid = 0
-    right = len(spectra) - 1
-    while left <= right:
-        # should use int here
-        mid = int(left + (right - left) / 2)
-        if spectra.iloc[mid] == target:
-            return mid
-        elif spectra.iloc[mid] < target:
-            left = mid + 1
-        else:
-            right = mid - 1
-    # End condition: left > right
-    return -1
+# The source files for the version of the code in the manifest, the msp files are written again if any is changed.
+source_files = ('construct_annotated_library.py', 'mgf_reader.py', 'glabel_index.py', 'compressed_io.py')
 
 
 # Read the information from a mgf and gLabel file, then write the spectral library into a msp file.
-def mgf_glabel_to_msp(mgf_file, glabel_file, msp_file):
+def mgf_glabel_to_msp(mgf_file, glabel_file, msp_file, tolerance=0.001, unit='Da'):
     """
     Write the spectral library data from mgf and glabel, into a msp file;
-    :param mgf_file: the mgf file to read;
+    :param mgf_file: the mgf file to read, or a compressed mgf file, such as "sample.mgf.gz";
     :param glabel_file: the glabel file to read;
-    :param msp_file: the msp file to write.
+    :param msp_file: the msp file to write, it is compressed by the suffix, such as "sample.msp.gz";
+    :param tolerance: the tolerance to match the peaks with the ions from gLabel, such as 0.001;
+    :param unit: the unit of the tolerance, "Da" or "ppm".
     :return: the total number of samples for a mgf file.
     """
     num_samples = 0
-    with open(msp_file, 'w') as msp_writer:
-        # Load gLabel file
-        glabel = pd.read_csv(glabel_file, sep='\t', header=0, encoding='utf8', engine='python', on_bad_lines='skip')
-        glabel_sort = glabel.sort_values(by=["spec"])
-        # Need to reset index after sorting
-        glabel_sort = glabel_sort.reset_index(drop=True)
-        # mgf is a Path Object, should use "str" to convert it for the pyteomics.
-        with mgf.read(str(mgf_file.absolute())) as mgf_reader:
-            for spectrum in mgf_reader:
-                index = binary_search(glabel_sort['spec'], spectrum['params']['title'])
-                # Could not find it
-                if index == -1:
-                    continue
-                # One spectrum from MGF might have several identifications in gLabel.
-                # After find the first matching, we could continue to search the others in the following orders.
-                first = True
-                while spectrum['params']['title'] == glabel_sort['spec'][index]:
-                    # Generate an entry for the spectral library
-                    anno_array = ['' for _ in range(len(spectrum['m/z array']))]
-                    matched_ions = glabel_sort.iloc[index]['matched_ion'].split(';')
-                    ion_dic = {}
-                    for ion in matched_ions:
-                        # ion format is 'Y-H(3)N(3)+1=1996.916,4248.5', ion_anno[0] is Y-H(3)N(3)+1, ion_mass[0] is 1996.916
-                        ion_anno = ion.split('=')
-                        ion_mass = ion_anno[1].split(',')
-                        ion_dic[ion_mass[0]] = ion_anno[0]
-                    # for each MS2, find the annotation information，
-                    for i in range(len(spectrum['m/z array'])):
-                        mz = spectrum['m/z array'][i]
-                        mz_str = str(mz)
-                        if mz_str in ion_dic:
-                            anno_array[i] = ion_dic.get(mz_str)
-                    # For the MS2 spectra,
-                    # if annotated, keep it for the new MS2 information, otherwise remove it now
-                    spectrum_mz = []
-                    spectrum_intensity = []
-                    spectrum_annotation = []
-                    for i in range(len(spectrum['m/z array'])):
-                        if anno_array[i] != '':
-                            spectrum_mz.append(spectrum['m/z array'][i])
-                            spectrum_intensity.append(spectrum['intensity array'][i])
-                            spectrum_annotation.append(anno_array[i])
-                    msp_writer.write('Name: ' + spectrum['params']['title'] + '\n')
-                    msp_writer.write('MW: ' + str(spectrum['params']['pepmass'][0]) + '\n')
-                    msp_writer.write('Comment: ' + 'CHARGE=' + str(spectrum['params']['charge']) + '\t' +
-                                     'RTINSECONDS=' + str(spectrum['params']['rtinseconds']) + '\t' +
-                                     'PEPTIDE=' + glabel_sort.iloc[index]['peptide'] + '\t' +
-                                     'MODIFICATIONS=' + str(glabel_sort.iloc[index]['modinfo']) + '\t' +
-                                     'GLYCAN(H,N,F,A,G)=' + str(glabel_sort.iloc[index]['glycan(H,N,F,A,G)']) + '\t' +
-                                     'GLYCANS=' + str(glabel_sort.iloc[index]['formula']) + '\n')
-                    msp_writer.write(f'Num Peaks: {len(spectrum_mz)}' + '\n')
-                    for i in range(len(spectrum_mz)):
-                        msp_writer.write(str(spectrum_mz[i]) + '\t' + str(spectrum_intensity[i]) + '\t'
-                                         + str(spectrum_annotation[i]) + '\n')
-                    msp_writer.write('\n')
-                    num_samples += 1
-                    if glabel_sort['spec'][index] == glabel_sort['spec'][index + 1]:
-                        print("Found duplicates:", glabel_sort['spec'][index])
-                    index += 1
+    with open_file(msp_file, 'w') as msp_writer:
+        # Load gLabel file, and index the rows by the titles of spectra.
+        glabel_index = GLabelIndex(glabel_file)
+        # The peaks of a spectrum are read as NumPy arrays, a compressed mgf file is decompressed on reading.
+        for spectrum in read_mgf(mgf_file):
+            title = spectrum.title
+            # One spectrum from MGF might have several identifications in gLabel.
+            # Could not find it if the range of rows is empty.
+            rows = glabel_index.rows(title)
+            spectrum_mz_array = spectrum.mz
+            spectrum_intensity_array = spectrum.intensity
+            for index in rows:
+                # Generate an entry for the spectral library
+                ion_mz, ion_annotations = glabel_index.matched_ion_arrays(index)
+                # for each MS2, find the annotation information within the tolerance,
+                # if annotated, keep it for the new MS2 information, otherwise remove it now
+                peak_indices, ion_indices = match_peaks(spectrum_mz_array, ion_mz, tolerance, unit)
+                spectrum_mz = spectrum_mz_array[peak_indices]
+                spectrum_intensity = spectrum_intensity_array[peak_indices]
+                spectrum_annotation = [ion_annotations[i] for i in ion_indices]
+                msp_writer.write('Name: ' + title + '\n')
+                msp_writer.write('MW: ' + str(spectrum.precursor_mz) + '\n')
+                msp_writer.write('Comment: ' + 'CHARGE=' + spectrum.charge + '\t' +
+                                 'RTINSECONDS=' + str(spectrum.retention_time) + '\t' +
+                                 'PEPTIDE=' + glabel_index.value('peptide', index) + '\t' +
+                                 'MODIFICATIONS=' + str(glabel_index.value('modinfo', index)) + '\t' +
+                                 'GLYCAN(H,N,F,A,G)=' + str(glabel_index.glycan(index)) + '\t' +
+                                 'GLYCANS=' + str(glabel_index.value('formula', index)) + '\n')
+                msp_writer.write(f'Num Peaks: {len(spectrum_mz)}' + '\n')
+                for i in range(len(spectrum_mz)):
+                    msp_writer.write(str(spectrum_mz[i]) + '\t' + str(spectrum_intensity[i]) + '\t'
+                                     + str(spectrum_annotation[i]) + '\n')
+                msp_writer.write('\n')
+                num_samples += 1
+                if index + 1 < rows.stop:
+                    print("Found duplicates:", title)
         print(f"Constructed a msp file: {msp_file}")
     return num_samples
 
 
 # Read the path for input folders (MGF, and gLabel), then write the msp files into MSP folder.
-def parse_mgf_files(input_type, input_path):
+def parse_mgf_files(input_type, input_path, tolerance=0.001, unit='Da', resume='yes'):
     """
     Write the MSP files to the folder of "input_path"
     :param input_type: A type for the input folder, such as "N" or "O"
-    :param input_path: A string for the input folder, such as "/data/Training-01-Human-285".
+    :param input_path: A string for the input folder, such as "/data/Training-01-Human-285";
+    :param tolerance: A float for the tolerance to match the peaks, such as 0.001;
+    :param unit: A string for the unit of the tolerance, "Da" or "ppm";
+    :param resume: A string, "yes" to skip the mgf files whose msp files are current by the manifest, "no" to parse
+                   all of them.
     :return: write all the MSP files to the "/data/Training-01-Human-285/N-GP-MSP".
     """
     path_name = Path(input_path)
     # Check whether path name is a folder
     assert path_name.is_dir(), "Input path is wrong!"
+    assert resume in ('yes', 'no'), "Wrong Resume!"
 
     mgf_path = path_name / 'MGF'
     if input_type == 'N':
@@ -169,6 +139,11 @@ def parse_mgf_files(input_type, input_path):
         print("The gLabel folder does not exist!")
         return
 
+    # The manifest of the msp files, keyed by the names of the mgf files, for the contents of mgf and gLabel files.
+    manifest = RunManifest(manifest_file(path_name, msp_path.name),
+                           {'input_type': input_type, 'tolerance': tolerance, 'unit': unit},
+                           code_version(*source_files), resume == 'yes')
+
     # Load mgf and gLabel files, then generate msp files for the corresponding names.
     # Iterate all the files in the MGF folder
     for mgf_file in mgf_path.iterdir():
@@ -176,23 +151,33 @@ def parse_mgf_files(input_type, input_path):
         if not mgf_file.is_file():
             print("There is a folder in the MGF folder!")
             continue
-        if mgf_file.suffix != '.mgf':
+        # A compressed mgf file, such as "sample.mgf.gz", is checked by its name without the compression.
+        mgf_plain_file, compression = split_compression(mgf_file)
+        if mgf_plain_file.suffix != '.mgf':
            print("There is a file whose type is not mgf!")
            continue
         time_read_mgf = time.time()
         # Get the filename without the extension, mgf_file is the full "path/name" for the mgf file.
-        mgf_stem = mgf_file.stem
-        mgf_name = mgf_file.name
+        mgf_stem = mgf_plain_file.stem
+        mgf_name = mgf_plain_file.name
         # Generate the name for a glabel file, and the whole path/file for it.
         # add '-glabel' at the end for mgf_file to generate gLabel files
         # Example: 202110_Palleon_Cyno_In_vitro-20211027_Palleon_A_HILIC_HCDFT.mgf-glabel.txt
         glabel_name = f'{mgf_name}-glabel.txt'
-        glabel_path_file = glabel_path / glabel_name
-        # Generate the name for a msp file, and the whole path/file for it.
-        msp_name = f'{mgf_stem}.msp'
+        # The gLabel file could also be compressed, such as "sample.mgf-glabel.txt.gz".
+        glabel_path_file = find_file(glabel_path / glabel_name)
+        # Generate the name for a msp file, and the whole path/file for it, compressed the same as the mgf file.
+        msp_name = f'{mgf_stem}.msp{compression}'
         msp_path_file = msp_path / msp_name
 
-        num_samples_one_file = mgf_glabel_to_msp(mgf_file, glabel_path_file, msp_path_file)
+        if manifest.is_current(mgf_file.name, [mgf_file, glabel_path_file], [msp_path_file]):
+            print(f"The msp file is current: {msp_name}")
+            total_num_files += 1
+            total_num_samples += manifest.result(mgf_file.name)
+            continue
+        num_samples_one_file = mgf_glabel_to_msp(mgf_file, glabel_path_file, msp_path_file,
+                                                 tolerance, unit)
+        manifest.record(mgf_file.name, [mgf_file, glabel_path_file], [msp_path_file], num_samples_one_file)
 
         total_num_files += 1
         total_num_samples += num_samples_one_file
@@ -212,20 +197,26 @@ def parse_mgf_files(input_type, input_path):
 
 
 #  CLI (command line interface) for the input and output
-def user_interface(input_type, input_path):
+def user_interface(input_type, input_path, tolerance, unit, resume):
     """
     Get the folder by the input type and input path for the MSP files
     :param input_type: A string for the folder of input type;
-    :param input_path: A string for the folder of input path.
+    :param input_path: A string for the folder of input path;
+    :param tolerance: A string for the tolerance to match the peaks;
+    :param unit: A string for the unit of the tolerance;
+    :param resume: A string, "yes" to skip the mgf files whose msp files are current, "no" to parse all of them.
     :return: The output of MSP files.
     """
-    #  python construct_annotated_library.py -IT=N -IP=/data/Training-01-Human-285
-    parse_mgf_files(input_type, input_path)
+    #  python construct_annotated_library.py -IT=N -IP=/data/Training-01-Human-285 -TL=0.001 -TU=Da
+    parse_mgf_files(input_type, input_path, float(tolerance), unit, resume)
 
 """
 Input parameters for the user interface:
     1   Input Glyco Peptide Type
     2   Input File Path Name
+    3   Tolerance to match the peaks with the ions from gLabel
+    4   Unit of the tolerance
+    5   Resume the run by the manifest
 """
 parser = argparse.ArgumentParser(description='Input parameters to run the script.')
 parser.add_argument('--InputType', '-IT',
@@ -234,6 +225,16 @@ parser.add_argument('--InputType', '-IT',
 parser.add_argument('--InputPath', '-IP',
                     help='Input Path parameter，required，no default. Such as /data/Training-01-Human-285.',
                     required=False)
+parser.add_argument('--Tolerance', '-TL',
+                    help='Tolerance parameter, not required, has default. Such as 0.001 for Da or 10 for ppm.',
+                    required=False, default='0.001')
+parser.add_argument('--ToleranceUnit', '-TU',
+                    help='Tolerance unit parameter, not required, has default. Da or ppm.',
+                    required=False, default='Da')
+parser.add_argument('--Resume', '-RS',
+                    help='Resume parameter，not required, has default. yes-skip the mgf files whose msp files are '
+                         'current by the manifest in the MANIFEST folder; no-parse all the mgf files again.',
+                    required=False, default='yes')
 
 args = parser.parse_args()
 
@@ -247,7 +248,7 @@ if __name__ == '__main__':
     # nohup python -u construct_annotated_library.py -IT=N -IP=/data/Training-2021-D-Va--Human > D-Va–Human_out.out 2>&1 &
 
     try:
-        user_interface(args.InputType, args.InputPath)
+        user_interface(args.InputType, args.InputPath, args.Tolerance, args.ToleranceUnit, args.Resume)
     except Exception as e:
         print(e)
 
@@ -9,22 +9,355 @@ By using glycan de novo sequencing, a set of linearized glycan will output as ca
 Created on 1 October 2021.
 Modified on 18 February 2022 for five monosaccharides.
 Modified on 21 February 2022 for double-digit monosaccharides.
+Modified on 18 October 2026, compute the glycan compositions as integers, instead of parsing the strings in each step.
+Modified on 18 October 2026, keep the best partial ladders of each composition by a beam, as an option of de novo.
+Modified on 18 October 2026, memoize the de novo results and the ladders across the spectra by the LRU caches.
+Modified on 18 October 2026, extend the ladders by the parents in a containment DAG of the compositions.
+Modified on 18 October 2026, bridge the missing Y-ion levels by a maximum gap, instead of de_novo_gap and de_novo_dic.
+Modified on 18 October 2026, search the spectra in batches of the packed arrays, with the vectorized containment.
 #####################################################################################################
 """
 __author__ = 'ZLiang'
 
 
-monosaccharide_number_replacement = {
-    "0100000000": "H",
-    "0001000000": "N",
-    "0000010000": "F",
-    "0000000100": "A",
-    "0000000001": "G"
-}
+from collections import OrderedDict
+import numpy as np
+from parallel_workers import run_tasks
+
+# The monosaccharides in the order of the two digits in a glycan string, such as "0504000002" for "HHHHHNNNNGG".
+glycan_monosaccharides = "HNFAG"
+# Each monosaccharide is a bit field of 8 bits in a packed integer, and a guard bit above each field is borrowed by
+# the subtraction if a field of the current glycan is smaller than the former one.
+field_bits = 9
+max_fields = 16
+guard_bits = sum(1 << (field_bits * i + field_bits - 1) for i in range(max_fields))
+field_mask = (1 << (field_bits - 1)) - 1
+
+
+def glycan_str_to_vector(glycan_str):
+    """
+    :param glycan_str: A string of glycan numbers with two digits for each monosaccharide, such as "0504000002";
+    :return: A tuple of the numbers, such as (5, 4, 0, 0, 2).
+    """
+    return tuple(int(glycan_str[i:i + 2]) for i in range(0, len(glycan_str), 2))
+
+
+def glycan_vector_to_str(glycan_vector):
+    """
+    :param glycan_vector: A tuple of the numbers for the monosaccharides, such as (5, 4, 0, 0, 2);
+    :return: A string with two digits for each monosaccharide, such as "0504000002".
+    """
+    return "".join(f"{number:02d}" for number in glycan_vector)
+
+
+def glycan_vector_to_list(glycan_vector):
+    """
+    :param glycan_vector: A tuple of the numbers for the monosaccharides, such as (2, 1, 0, 0, 0);
+    :return: A list of the monosaccharides, such as "HHN".
+    """
+    return "".join(glycan_monosaccharides[i] * number for i, number in enumerate(glycan_vector))
+
+
+def pack_glycan(glycan_vector):
+    """
+    :param glycan_vector: A tuple of the numbers for the monosaccharides, each number is less than 256;
+    :return: A packed integer with a bit field for each monosaccharide, so that the containment and the subtraction of
+             two glycans are the arithmetic of two integers.
+    """
+    assert len(glycan_vector) <= max_fields, "Wrong Input Monosaccharides for pack_glycan!"
+    packed = 0
+    for i, number in enumerate(glycan_vector):
+        assert 0 <= number <= field_mask, "Wrong Input Monosaccharides for pack_glycan!"
+        packed |= number << (field_bits * i)
+    return packed
+
+
+def unpack_glycan(packed, number_fields=len(glycan_monosaccharides)):
+    """
+    :param packed: A packed integer from pack_glycan();
+    :param number_fields: the number of monosaccharides, such as 5 for "HNFAG";
+    :return: A tuple of the numbers for the monosaccharides, such as (5, 4, 0, 0, 2).
+    """
+    return tuple((packed >> (field_bits * i)) & field_mask for i in range(number_fields))
+
+
+def packed_contain(packed_former, packed_current):
+    """
+    :param packed_former: A packed former glycan;
+    :param packed_current: A packed current glycan;
+    :return: True if every monosaccharide of the current glycan is no less than the former one, where no guard bit is
+             borrowed by the subtraction.
+    """
+    return ((packed_current | guard_bits) - packed_former) & guard_bits == guard_bits
+
+
+def containment_parents(level_compositions, max_gap=0):
+    """
+    Build the containment DAG of the compositions in a spectrum, where the compositions are sorted into the levels by
+    their total numbers of monosaccharides. The parents of a composition are the compositions contained in it, in the
+    nearest former level which has any of them, so that the ladders are extended along the edges to the parents,
+    instead of checking all the ladders of the former levels.
+    With a maximum gap, the parents are also in the former levels up to max_gap missing levels below the former level,
+    so a ladder could bridge the Y-ions missing in a spectrum, besides the nearest ones.
+    :param level_compositions: A list of the levels, each is a list of the packed compositions with the total number of
+                               the level, and the level 0 is [0] for the empty glycan, which is contained in all of them;
+    :param max_gap: the number of missing levels to bridge, such as 1, 0 for only the nearest former level;
+    :return: A list of the levels, each is a list of the parents for the compositions in the level, the parents are a
+             list of (parent level, parent compositions) from the nearest level, the parent compositions are in the
+             same order as the parent level, and [] for the level 0.
+    """
+    assert max_gap >= 0, "Wrong Maximum Gap for containment_parents!"
+    composition_parents = [[[] for _ in level_compositions[0]]]
+    for i in range(1, len(level_compositions)):
+        level_parents = []
+        for packed_key in level_compositions[i]:
+            parents = []
+            for former_level in range(i - 1, -1, -1):
+                contained = [packed for packed in level_compositions[former_level]
+                             if packed_contain(packed, packed_key)]
+                if contained:
+                    parents.append((former_level, contained))
+                # The nearest former level is always a parent, even if it is beyond the gap.
+                if parents and former_level <= i - 1 - max_gap:
+                    break
+            level_parents.append(parents)
+        composition_parents.append(level_parents)
+    return composition_parents
+
+
+def batch_containment_parents(compositions, totals, valid, max_gap=0):
+    """
+    Build the containment DAGs of a batch of spectra at once, the same as containment_parents() for each spectrum,
+    by comparing all the pairs of the compositions in a spectrum as the arrays.
+    :param compositions: An integer array of (spectra, ions, monosaccharides) for the compositions of each spectrum,
+                         padded to the same number of ions;
+    :param totals: An integer array of (spectra, ions) for the total numbers of the compositions;
+    :param valid: A boolean array of (spectra, ions), False for the padded ions;
+    :param max_gap: the number of missing levels to bridge, such as 1, 0 for only the nearest former level;
+    :return: A boolean array of (spectra, ions, ions), True at [s, a, b] if the composition a is a parent of b.
+    """
+    assert max_gap >= 0, "Wrong Maximum Gap for batch_containment_parents!"
+    contained = (compositions[:, :, None, :] <= compositions[:, None, :, :]).all(axis=3)
+    candidates = contained & (totals[:, :, None] < totals[:, None, :]) & valid[:, :, None] & valid[:, None, :]
+    # The parents in the levels of the gap, or only in the nearest former level if there is none in the gap.
+    gap_parents = candidates & (totals[:, :, None] >= totals[:, None, :] - 1 - max_gap)
+    nearest_levels = np.where(candidates, totals[:, :, None], -1).max(axis=1)
+    nearest_parents = candidates & (totals[:, :, None] == nearest_levels[:, None, :])
+    return np.where(gap_parents.any(axis=1)[:, None, :], gap_parents, nearest_parents)
+
+
+def pack_spectra(glycan_precursors, glycan_intensity_dics):
+    """
+    Pack the glycan precursors and the Y-ions of the spectra into the arrays for de_novo_batch().
+    :param glycan_precursors: A list of the glycan precursors, such as ["0504000002", "0403000001"];
+    :param glycan_intensity_dics: A list of the dictionaries of the compositions and intensities for the spectra,
+                                  such as [{'0001000000': 178721.8, '0002000000': 24745.4}, {'0001000000': 6672.6}];
+    :return: A tuple of the arrays (precursors, compositions, intensities, offsets), a row of the precursors has the
+             numbers of the monosaccharides for a spectrum, the compositions and the intensities of the ions are
+             joined for all the spectra, and the ions of the spectrum i are in offsets[i]:offsets[i + 1].
+    """
+    number_fields = len(glycan_monosaccharides)
+    keys = [key for glycan_intensity_dic in glycan_intensity_dics for key in glycan_intensity_dic]
+    for key in list(glycan_precursors) + keys:
+        assert len(key) == 2 * number_fields, "Wrong Input Monosaccharides for pack_spectra!"
+    precursors = np.array([glycan_str_to_vector(key) for key in glycan_precursors], dtype=np.int64)
+    compositions = np.array([glycan_str_to_vector(key) for key in keys], dtype=np.int64)
+    intensities = np.array([value for glycan_intensity_dic in glycan_intensity_dics
+                            for value in glycan_intensity_dic.values()], dtype=np.float64)
+    offsets = np.zeros(len(glycan_intensity_dics) + 1, dtype=np.int64)
+    np.cumsum([len(glycan_intensity_dic) for glycan_intensity_dic in glycan_intensity_dics], out=offsets[1:])
+    return precursors.reshape(-1, number_fields), compositions.reshape(-1, number_fields), intensities, offsets
+
+
+def beam_ladders(glycan_ladders, beam_width):
+    """
+    Keep the best partial ladders for each composition in a ladder level, ranked by the accumulated intensity.
+    The partial ladders with the same composition contain the same ions and are extended by the same monosaccharides,
+    so the extensions of a partial ladder could not be ranked above the extensions of the beam_width ladders better than
+    it, and the top beam_width results of the exhaustive search are kept.
+    For a linear glycan repeated in a level, only the last one is kept, which overwrites the former ones in the results.
+    :param glycan_ladders: A list of (linear glycan, intensity, packed composition, ...) in a ladder level;
+    :param beam_width: the number of partial ladders to keep for each composition, such as the top number;
+    :return: A list of the partial ladders kept, in the same order as glycan_ladders.
+    """
+    last_positions = {}
+    for position, ladder in enumerate(glycan_ladders):
+        last_positions[ladder[0]] = position
+    composition_positions = {}
+    for position in sorted(last_positions.values()):
+        composition_positions.setdefault(glycan_ladders[position][2], []).append(position)
+    kept_positions = []
+    for positions in composition_positions.values():
+        positions.sort(key=lambda p: (glycan_ladders[p][1], glycan_ladders[p][0]), reverse=True)
+        kept_positions.extend(positions[:beam_width])
+    return [glycan_ladders[position] for position in sorted(kept_positions)]
+
+
+def best_ladders(glycan_ladders):
+    """
+    Keep the ladder with the highest intensity for each linear glycan in a ladder level, which is reached by several
+    paths when the missing levels are bridged, so the intensity of a linear glycan is the best path to it.
+    :param glycan_ladders: A list of (linear glycan, intensity, packed composition, ...) in a ladder level;
+    :return: A list of the best ladders, in the order of the first ladder of each linear glycan.
+    """
+    best_positions = {}
+    kept_ladders = []
+    for ladder in glycan_ladders:
+        position = best_positions.get(ladder[0])
+        if position is None:
+            best_positions[ladder[0]] = len(kept_ladders)
+            kept_ladders.append(ladder)
+        elif ladder[1] > kept_ladders[position][1]:
+            kept_ladders[position] = ladder
+    return kept_ladders
+
+
+def build_ladders(level_ions, level_compositions, composition_parents, beam_width=None, max_gap=0):
+    """
+    Generate the glycan linear ladders level by level, by the dynamic programming from Y-ions to B-ions, where the
+    ladders of a composition only extend the ladders of its parents in the containment DAG.
+    Each ladder is a tuple of the linear glycan, the intensity, and the packed composition of the glycan, so the
+    compositions are compared and subtracted as integers, instead of parsing the strings for each pair.
+    The former ladder (level and index) and the key of the ion are kept as the topology for the cache.
+    :param level_ions: A list of the levels, each is a list of (key, intensity) for the ions with the total number of
+                       the level, the level 0 is empty, and the last level has the precursor at least;
+    :param level_compositions: A list of the levels, each is a list of the packed compositions of the ions, the level
+                               0 is [0] for the empty glycan;
+    :param composition_parents: the parents of the compositions, from containment_parents();
+    :param beam_width: the number of partial ladders to keep for each composition, None for the exhaustive search;
+    :param max_gap: the number of missing levels bridged by composition_parents, the best path of each linear glycan
+                    is kept for a gap;
+    :return: A list of the ladder levels, each is a list of (linear glycan, intensity, packed composition, former level,
+             former index, key).
+    """
+    glycan_ladders = [[] for _ in range(len(level_ions))]
+    first_ladder = True
+    # Base case for the first ladder 0, add ("", 0.0) in it, as an initialization.
+    glycan_ladders[0].append(("", 0.0, 0, None, None, None))
+    # The monosaccharides of the packed remains, which are repeated for many pairs of ladders.
+    glycan_remains_lists = {}
+    # All the ladders of a composition are next to each other in a level, so they are found by the positions of it.
+    composition_positions = [{0: [0]}] + [{} for _ in range(1, len(level_ions))]
+    for i in range(1, len(level_ions)):
+        # Base case for the first ladder, might contain several monosaccharides.
+        if first_ladder:
+            for (key, value), packed_key in zip(level_ions[i], level_compositions[i]):
+                new_key = glycan_vector_to_list(unpack_glycan(packed_key))
+                glycan_ladders[i].append((new_key, value, packed_key, None, None, key))
+            # Should pad the former ladders, but we ignore the process here, since the final step will contain it.
+            first_ladder = False
+        # Dynamic programming for generating ladders by top-down methods, from Y-ions to B-ions
+        else:
+            # Back tracing the nearest former ladder with a successful prefix, by the parents of each composition
+            for (key, value), packed_key, parents in zip(level_ions[i], level_compositions[i], composition_parents[i]):
+                for former_ladder, former_compositions in parents:
+                    for former_packed in former_compositions:
+                        glycan_remains = packed_key - former_packed
+                        if glycan_remains not in glycan_remains_lists:
+                            glycan_remains_lists[glycan_remains] = glycan_vector_to_list(unpack_glycan(glycan_remains))
+                        for k in composition_positions[former_ladder][former_packed]:
+                            former_key, former_value = glycan_ladders[former_ladder][k][:2]
+                            new_key = former_key + glycan_remains_lists[glycan_remains]
+                            new_value = round(former_value + value, 1)
+                            glycan_ladders[i].append((new_key, new_value, packed_key, former_ladder, k, key))
+        # Keep the best path of each linear glycan, and the best partial ladders of each composition.
+        if max_gap:
+            glycan_ladders[i] = best_ladders(glycan_ladders[i])
+        if beam_width is not None:
+            glycan_ladders[i] = beam_ladders(glycan_ladders[i], beam_width)
+        for k, ladder in enumerate(glycan_ladders[i]):
+            composition_positions[i].setdefault(ladder[2], []).append(k)
+    return glycan_ladders
+
+
+def replay_ladders(ladder_topology, glycan_intensity_dic):
+    """
+    Compute the intensities of the ladders from the topology of a former search with the same compositions, so the
+    ladders are not searched again when only the intensities are different.
+    :param ladder_topology: A tuple of the ladder levels, each is a list of (former level, former index, composition)
+                            for the ladders, where the former level is None for the first ladder, and the linear glycans
+                            of the last level;
+    :param glycan_intensity_dic: a dictionary contains composition and intensity;
+    :return: glycan de novo string tuple lists, the same as de_novo().
+    """
+    ladder_levels, last_glycans = ladder_topology
+    ladder_values = [[0.0]]
+    for ladder_level in ladder_levels:
+        values = []
+        for former_level, former_index, key in ladder_level:
+            # The precursor added as the end is not in the dictionary, and its intensity is 0.0.
+            value = glycan_intensity_dic.get(key, 0.0)
+            if former_level is not None:
+                value = round(ladder_values[former_level][former_index] + value, 1)
+            values.append(value)
+        ladder_values.append(values)
+    glycan_de_novo = dict(zip(last_glycans, ladder_values[-1]))
+    return sorted(glycan_de_novo.items(), key=lambda kv: (kv[1], kv[0]), reverse=True)
+
+
+class LRUCache(object):
+    """
+    A cache of the least recently used entries with a maximum size, which counts the hits and the misses.
+    """
+    def __init__(self, max_size):
+        """
+        :param max_size: the maximum number of entries, 0 for no entry.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        :param key: the key of an entry;
+        :return: the value of the entry, or None if it is not cached.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """
+        Add an entry, and remove the least recently used entry if the cache is full.
+        :param key: the key of an entry;
+        :param value: the value of the entry, not None.
+        """
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        """
+        :return: the ratio of the hits to the lookups, 0.0 for no lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
 
 
 class DeNovoSequencing(object):
 
+    def __init__(self, cache_size=0, verbose=False):
+        """
+        :param cache_size: the number of de novo results and ladder topologies to keep across the spectra, such as 1000,
+                           0 for no cache.
+        :param verbose: True to print the compositions and the ladders of each level for a search, not for a cache hit.
+        The replicate spectra of a glycopeptide often have the same glycan precursor and Y-ion compositions, the results
+        are reused for the same intensities, and the ladders are reused for the different intensities.
+        """
+        self.cache_size = cache_size
+        self.verbose = verbose
+        self.result_cache = LRUCache(cache_size)
+        self.ladder_cache = LRUCache(cache_size)
+
     @staticmethod
     def count_total(monosaccharide_numbers):
         """
@@ -41,13 +374,10 @@ class DeNovoSequencing(object):
 
         mono_length = len(monosaccharide_numbers)
         assert (mono_length % 2 == 0), "Wrong Input Monosaccharides for count_total!"
-        if monosaccharide_numbers.isdigit():
-            # transfer an integer into a list
-            numbers = list(monosaccharide_numbers)
-        else:
+        if not monosaccharide_numbers.isdigit():
             return "The sequence is not a number!"
 
-        return sum(int(numbers[i] + numbers[i+1]) for i in range(0, mono_length, 2))
+        return sum(glycan_str_to_vector(monosaccharide_numbers))
 
 
     @staticmethod
@@ -63,17 +393,11 @@ class DeNovoSequencing(object):
         if not isinstance(glycan_list, (str, )):
             raise ValueError("glycan_list must be a string")
 
-        glycan_mono = "HNFAG"
-        glycan_number = ['0', '0', '0', '0', '0']
-
-        for i in range(len(glycan_list)):
-            glycan_number[glycan_mono.find(glycan_list[i])] = str(int(glycan_number[glycan_mono.find(glycan_list[i])]) + 1)
-        # should add 0 to the front of glycan number if it is only one digit
-        for i in range(len(glycan_number)):
-            if len(glycan_number[i]) == 1:
-                glycan_number[i] = '0' + glycan_number[i]
+        glycan_number = [glycan_list.count(monosaccharide) for monosaccharide in glycan_monosaccharides]
+        # A character which is not a monosaccharide is counted as the last one.
+        glycan_number[-1] += len(glycan_list) - sum(glycan_number)
 
-        return "".join(glycan_number)
+        return glycan_vector_to_str(glycan_number)
 
 
     @staticmethod
@@ -96,8 +420,8 @@ class DeNovoSequencing(object):
         glycan_length = len(glycan_former)
         assert (glycan_length % 2 == 0), "Wrong Input Monosaccharides for glycan_contain!"
         return all(
-            int (glycan_former[i] + glycan_former[i+1]) <= int(glycan_current[i] + glycan_current[i+1])
-            for i in range(0, glycan_length, 2)
+            former <= current
+            for former, current in zip(glycan_str_to_vector(glycan_former), glycan_str_to_vector(glycan_current))
         )
 
 
@@ -121,17 +445,11 @@ class DeNovoSequencing(object):
         assert len(glycan_former) == len(glycan_current)
         glycan_length = len(glycan_former)
         assert (glycan_length % 2 == 0), "Wrong Input Monosaccharides for glycan_minus!"
-        # Minus all the letters
-        glycan_after_minus = list(range(glycan_length // 2))
-        # i starts from 0 to glycan_length/2, j starts from 0 to glycan_length
-        for i, j in enumerate(range(0, glycan_length, 2)):
-            glycan_after_minus[i] = str(int(glycan_current[j] + glycan_current[j+1]) - int(glycan_former[j] + glycan_former[j+1]))
-        # should add 0 to the front of glycan number if it is only one digit
-        for i in range(len(glycan_after_minus)):
-            if len(glycan_after_minus[i]) == 1:
-                glycan_after_minus[i] = '0' + glycan_after_minus[i]
-
-        return "".join(glycan_after_minus)
+        # Minus all the monosaccharides
+        return glycan_vector_to_str(
+            current - former
+            for former, current in zip(glycan_str_to_vector(glycan_former), glycan_str_to_vector(glycan_current))
+        )
 
 
     @staticmethod
@@ -148,28 +466,33 @@ class DeNovoSequencing(object):
         if not isinstance(glycan_str, (str, )):
             raise ValueError("glycan_former must be a string")
 
-        glycan_list = []
-        glycan_mono = "HNFAG"
         glycan_length = len(glycan_str)
         assert (glycan_length % 2 == 0), "Wrong Input Monosaccharides for glycan_str_to_list!"
-        # Should consider double-digit monosaccharides, which should visit glycan_mono[i//2]
-        for i in range(0, glycan_length, 2):
-            mono_number = int(glycan_str[i] + glycan_str[i+1]) - 0
-            for _ in range(mono_number):
-                glycan_list.append(glycan_mono[i//2])
+        glycan_vector = glycan_str_to_vector(glycan_str)
+        # Should consider double-digit monosaccharides, the numbers are for "HNFAG" in order
+        if any(glycan_vector[len(glycan_monosaccharides):]):
+            raise IndexError("Wrong Input Monosaccharides for glycan_str_to_list!")
 
         # Should we consider the combinations of the glycan?
         #glycan_set_list = permutations(glycan_list)
         #glycan_no_repeat_set = list(set(glycan_set_list))
         #return glycan_no_repeat_set
-        return "".join(glycan_list)
+        return glycan_vector_to_list(glycan_vector)
 
 
-    def de_novo(self, glycan_precursor, glycan_intensity_dic):
+    def de_novo(self, glycan_precursor, glycan_intensity_dic, beam_width=None, max_gap=0):
         """
         Generate a set of linearized glycan sequences, from glycan_intensity_dictionary.
         Here we use 2D lists to store the results of de novo sequencing.
         Time complexity should be O(n^3).
+        With a beam width, each ladder level only keeps the best partial ladders for each composition, so the large
+        glycans could not blow up the number of candidates, and the top beam_width results are the same as the
+        exhaustive search.
+        With a maximum gap, each composition also extends the ladders up to max_gap missing levels below its nearest
+        former level, so the spectra with missing Y-ions still have the candidates through them. A linear glycan reached
+        by several paths keeps the highest intensity of them, instead of the last one. The number of the
+        ladders grows exponentially with the levels without a beam, while it is polynomial with a beam, as
+        O(levels * compositions * parents * beam_width).
         For example:
             PEPTIDE=LSSJSTKK
             Glycan=HHHHHNNNNGG
@@ -180,6 +503,9 @@ class DeNovoSequencing(object):
                 '0202000000': 46100.9, '0504000000': 117434.6, '0404000001': 18476.5, '0302000000': 40545.4,
                 '0203000000': 3935.4, '0504000001': 25856.8, '0303000000': 76999.1, '0403000000': 233672.0,
                 '0303000001': 74035.4, '0403000001': 312205.2}
+        :param beam_width: the number of partial ladders to keep for each composition, such as the top number;
+                           None for the exhaustive search;
+        :param max_gap: the number of missing Y-ion levels which a ladder could bridge, such as 1, 0 for no gap;
         :return: glycan de novo string tuple lists, such as [('NNHHNHHANHNHAA', 954586.3), ('NNHHHNHANHNHAA', 954473.8)]
         """
 
@@ -188,6 +514,24 @@ class DeNovoSequencing(object):
             raise ValueError("glycan_precursor must be a string")
         if not isinstance(glycan_intensity_dic, (dict, )):
             raise ValueError("glycan_precursor must be a dictionary")
+        assert beam_width is None or beam_width > 0, "Wrong Beam Width for de_novo!"
+        assert max_gap >= 0, "Wrong Maximum Gap for de_novo!"
+
+        # The results depend on the order of the compositions, such as the repeated linear glycans in the last level.
+        if self.cache_size:
+            result_key = (glycan_precursor, beam_width, max_gap, tuple(glycan_intensity_dic.items()))
+            glycan_de_novo = self.result_cache.get(result_key)
+            if glycan_de_novo is not None:
+                return list(glycan_de_novo)
+            # The ladders of the beam and the best paths depend on the intensities, only the exhaustive ladders without
+            # a gap are reused.
+            reuse_ladders = beam_width is None and max_gap == 0
+            ladder_key = (glycan_precursor, tuple(glycan_intensity_dic))
+            ladder_topology = self.ladder_cache.get(ladder_key) if reuse_ladders else None
+            if ladder_topology is not None:
+                glycan_de_novo = replay_ladders(ladder_topology, glycan_intensity_dic)
+                self.result_cache.put(result_key, glycan_de_novo)
+                return list(glycan_de_novo)
 
         # First step, count total number of glycan, then generate a list with the length of it.
         # Here we use additional one to store the whole sequence
@@ -201,218 +545,177 @@ class DeNovoSequencing(object):
             ion_dic = {key: value}
             glycan_lists[ion_number].append(ion_dic)
 
-        for i in range(len(glycan_lists)):
-            print(glycan_lists[i])
+        if self.verbose:
+            for i in range(len(glycan_lists)):
+                print(glycan_lists[i])
 
         # Third step, generate glycan linear ladders based on the former ones
         # Should add a start ladder, which might not be the glycan_lists[1], in this case, should generate the sequence.
-        glycan_ladders = [[] for _ in range(glycan_precursor_length)]
-        first_ladder = True
-        # Base case for the first ladder 0, add {"0000000000": 0.0} in it, as an initialization.
-        glycan_ladders[0].append({"": 0.0})
         # Base case for the last glycan list:
         # If there is no glycan list in the last one, add {"glycan_precursor": 0.0} in it, as an end;
         # Otherwise, do nothing.
         if len(glycan_lists[glycan_precursor_length - 1]) == 0:
             glycan_lists[glycan_precursor_length - 1].append({glycan_precursor: 0.0})
         #print(glycan_lists)
+        # The ions of each level and their packed compositions, the level 0 is the empty glycan of the first ladder.
+        level_ions = [[]] + [[(key, value) for ion_dic in glycan_lists[i] for key, value in ion_dic.items()]
+                             for i in range(1, glycan_precursor_length)]
+        level_compositions = [[0]]
         for i in range(1, glycan_precursor_length):
-            # Base case for the first ladder, might contain several monosaccharides.
-            if first_ladder:
-                for j in range(len(glycan_lists[i])):
-                # Base case for the first monosaccharide
-                    for key, value in glycan_lists[i][j].items():
-                        glycan_ladder_list = self.glycan_str_to_list(key)
-                        new_key = "".join(glycan_ladder_list)
-                        glycan_ladders[i].append({new_key: value})
-                # Should pad the former ladders, but we ignore the process here, since the final step will contain it.
-                first_ladder = False
-            # Dynamic programming for generating ladders by top-down methods, from Y-ions to B-ions
-            else:
-                for j in range(len(glycan_lists[i])):
-                    # Back tracing the former ladder one by one until find a successful prefix
-                    # Check each element in the former ladder
-                    for key, value in glycan_lists[i][j].items():
-                        former_ladder = i - 1
-                        find = False
-                        while not find and former_ladder >= 0:
-                            for k in range(len(glycan_ladders[former_ladder])):
-                                for former_key, former_value in glycan_ladders[former_ladder][k].items():
-                                    former_glycan = self.glycan_list_to_str(former_key)
-                                    if self.glycan_contain(former_glycan, key):
-                                        find = True
-                                        glycan_remains = self.glycan_minus(former_glycan, key)
-                                        new_key = former_key + self.glycan_str_to_list(glycan_remains)
-                                        new_value = round(former_value + value, 1)
-                                        glycan_ladders[i].append({new_key: new_value})
-                            former_ladder -= 1
-
-        for i in range(len(glycan_ladders)):
-            print(glycan_ladders[i])
+            for key, _ in level_ions[i]:
+                # The first ladders are the monosaccharides of the keys, the other keys are five monosaccharides.
+                if i == 1:
+                    self.glycan_str_to_list(key)
+                else:
+                    assert len(key) == 2 * len(glycan_monosaccharides), "Wrong Input Monosaccharides for de_novo!"
+            level_compositions.append([pack_glycan(glycan_str_to_vector(key)) for key, _ in level_ions[i]])
+        composition_parents = containment_parents(level_compositions, max_gap)
+        glycan_ladders = build_ladders(level_ions, level_compositions, composition_parents, beam_width, max_gap)
+
+        if self.verbose:
+            for i in range(len(glycan_ladders)):
+                print([{ladder[0]: ladder[1]} for ladder in glycan_ladders[i]])
 
         # Use a set to store the last glycan_ladders, then sorted by intensity
         glycan_de_novo = {}
-        for i in range(len(glycan_ladders[glycan_precursor_length - 1])):
-            for key, value in glycan_ladders[glycan_precursor_length - 1][i].items():
-                glycan_de_novo[key] = value
+        for ladder in glycan_ladders[glycan_precursor_length - 1]:
+            glycan_de_novo[ladder[0]] = ladder[1]
         #for g in range(glycan_precursor_length):
         #    print(glycan_ladders[g])
-        return sorted(
+        glycan_de_novo = sorted(
             glycan_de_novo.items(), key=lambda kv: (kv[1], kv[0]), reverse=True
         )
 
-
-    def de_novo_gap(self, glycan, glycan_intensity_dic):
-        """
-        Generate a set of linearized glycan sequences, from glycan_intensity_dictionary.
-        We use 2D lists to store the results of de novo sequencing.
-        Time complexity should be O(n^3).
-        Here we consider the gap between the ladders:
-            if the gap is 0, we do not continue to search the former ladder,
-            otherwise, we need to search the former ladders plus the gap,
-                for example, current_ladder = 4, gap = 1, we need to search ladder = 3 and ladder = 4
-        :param glycan: the number representation of glycans, such as "5410"
-        :param glycan_intensity_dic: a dictionary contains composition and intensity
-            Such as {'2410': 400.3, '1300': 589.3, '2310': 491.9, '4300': 413.3, '0100': 3591.5,
-            '4310': 465.1, '1200': 648.3, '2200': 1793.2, '3200': 1706.6}
-        :return: original amino acid name string
-        """
-
-        # Check the input types
-        if not isinstance(glycan, (str, )):
-            raise ValueError("glycan must be a string")
-        if not isinstance(glycan_intensity_dic, (dict, )):
-            raise ValueError("glycan_precursor must be a dictionary")
-
-        # First step, count total number of glycan, and generate a list with the length of it.
-        glycan_length = self.count_total(glycan)
-        # total monosaccharides, get the maximum ions sequence number, index [0] will be an empty list here.
-        glycan_lists = [[] for _ in range(glycan_length)]
-
-        # Second step, count the total number of monosaccharides for the ions
-        for key, value in glycan_intensity_dic.items():
-            ion_number = self.count_total(key)
-            ion_dic = {key: value}
-            glycan_lists[ion_number].append(ion_dic)
-
-        # Third step, generate glycan linear ladders based on the former ones
-        glycan_ladders = [[] for _ in range(glycan_length)]
-        glycan_gaps = [[] for _ in range(glycan_length)]
-        for i in range(1, glycan_length):
-            for j in range(len(glycan_lists[i])):
-                # Base case for only one monosaccharide
-                if i == 1:
-                    for key, value in glycan_lists[i][j].items():
-                        monosaccharide = monosaccharide_number_replacement.get(key)
-                        glycan_ladders[i].append({monosaccharide: value})
-                        glycan_gaps[i].append(0)
-                # Dynamic programming for generating ladders by top-down methods, from Y-ions to B-ions
-                else:
-                    # Back tracing the former ladder one by one until find a successful prefix
-                    # Check each elements in the former ladder
-                    for key, value in glycan_lists[i][j].items():
-                        former_ladder = i - 1
-                        gap = 0
-                        find = False
-                        contain = 0
-                        while (not find or contain > 0) and former_ladder > 0:
-                            # Assume there is no gap, set contain to 0
-                            contain = 0
-                            for k in range(len(glycan_ladders[former_ladder])):
-                                for former_key, former_value in glycan_ladders[former_ladder][k].items():
-                                    former_glycan = self.glycan_list_to_str(former_key)
-                                    if self.glycan_contain(former_glycan, key):
-                                        find = True
-                                        if glycan_gaps[former_ladder][k] > contain:
-                                            contain = glycan_gaps[former_ladder][k]
-                                        glycan_remains = self.glycan_minus(former_glycan, key)
-                                        glycan_ladder_list = self.glycan_str_to_list(glycan_remains)
-                                        new_key = former_key + "".join(glycan_ladder_list)
-                                        new_value = round(former_value + value, 1)
-                                        glycan_ladders[i].append({new_key: new_value})
-                                        glycan_gaps[i].append(gap)
-                                        '''
-                                        for glycan_ladder_list in glycan_ladder_lists:
-                                            print(former_key)
-                                            new_key = former_key + "".join(glycan_ladder_list)
-                                            print(new_key)
-                                            print(value)
-                                            new_value = round(former_value + value, 1)
-                                            glycan_ ladders[i].append({new_key: new_value})
-                                            glycan_gaps[i].append(gap)
-                                            print(glycan_ladders[i])
-                                        '''
-                            former_ladder -= 1
-                            gap += 1
-
-        for g in range(glycan_length):
-            print(glycan_ladders[g])
-        for p in range(glycan_length):
-            print(glycan_gaps[p])
-        return glycan_lists
-
-
-    def de_novo_dic(self, glycan, glycan_intensity_dic):
+        if self.cache_size:
+            self.result_cache.put(result_key, glycan_de_novo)
+            if reuse_ladders:
+                ladder_levels = tuple([ladder[3:] for ladder in glycan_ladders[i]]
+                                      for i in range(1, glycan_precursor_length))
+                last_glycans = [ladder[0] for ladder in glycan_ladders[glycan_precursor_length - 1]]
+                self.ladder_cache.put(ladder_key, (ladder_levels, last_glycans))
+            return list(glycan_de_novo)
+        return glycan_de_novo
+
+    def de_novo_batch(self, precursors, compositions, intensities, offsets, top_number, beam_width=None, max_gap=0,
+                      workers=1, batch_size=1024):
         """
-        Generate a set of linearized glycan sequences, from glycan_intensity_dictionary.
-        Here we use a dictionary to store the results of de novo sequencing.
-        Time complexity should be O(n^4)
-        :param glycan: the number representation of glycans, such as "5410"
-        :param glycan_intensity_dic: a dictionary contains composition and intensity
-            Such as {'2410': 400.3, '1300': 589.3, '2310': 491.9, '4300': 413.3, '0100': 3591.5,
-            '4310': 465.1, '1200': 648.3, '2200': 1793.2, '3200': 1706.6}
-        :return: original amino acid name string
+        Generate the top linearized glycan sequences for a batch of spectra, the same as de_novo()[:top_number] for each
+        spectrum, without the prints and the cache.
+        The spectra are packed as the arrays by pack_spectra(), the compositions of a spectrum are sorted into the levels
+        and the containment DAGs of batch_size spectra are built at once, instead of the dictionaries of each spectrum.
+        :param precursors: An integer array of (spectra, monosaccharides) for the glycan precursors;
+        :param compositions: An integer array of (ions, monosaccharides) for the Y-ions of all the spectra;
+        :param intensities: A float array of (ions,) for the intensities of the Y-ions;
+        :param offsets: An integer array of (spectra + 1,), the ions of the spectrum i are in offsets[i]:offsets[i + 1];
+        :param top_number: the number of the top candidates for each spectrum, such as 10;
+        :param beam_width: the number of partial ladders to keep for each composition, None for the exhaustive search;
+        :param max_gap: the number of missing Y-ion levels which a ladder could bridge, such as 1, 0 for no gap;
+        :param workers: the number of worker processes for the parts of the spectra, such as 8;
+        :param batch_size: the number of spectra to build the containment DAGs at once;
+        :return: A list of the glycan de novo string tuple lists for the spectra, such as
+                 [[('NNHHNHHANHNHAA', 954586.3), ('NNHHHNHANHNHAA', 954473.8)], [('NNHH', 8900.4)]]
         """
-
-        # Check the input types
-        if not isinstance(glycan, (str,)):
-            raise ValueError("glycan must be a string")
-        if not isinstance(glycan_intensity_dic, (dict,)):
-            raise ValueError("glycan_precursor must be a dictionary")
-
-        # First step, count total number of glycan, and generate a list with the length of it.
-        glycan_length = self.count_total(glycan)
-        # total monosaccharides, get the maximum ions sequence number, index [0] will be an empty list here.
-        glycan_lists = [[] for _ in range(glycan_length)]
-
-        # Second step, count the total number of monosaccharides for the ions
-        for key, value in glycan_intensity_dic.items():
-            ion_number = self.count_total(key)
-            ion_dic = {key: value}
-            glycan_lists[ion_number].append(ion_dic)
-
-        # Third step, generate glycan linear set based on the former ones
-        glycan_dic = {}
-
-        for i in range(1, glycan_length):
-            for j in range(len(glycan_lists[i])):
-                # Base case for only one monosaccharide
-                if i == 1:
-                    for key, value in glycan_lists[i][j].items():
-                        monosaccharide = monosaccharide_number_replacement.get(key)
-                        glycan_dic[monosaccharide] = value
-                    print(glycan_dic)
-                # Dynamic programming for generating ladders by top-down methods, from Y-ions to B-ions
-                else:
-                    # Generate all the possible candidates, based on former results in the set.
-                    for key, value in glycan_lists[i][j].items():
-                        for former_key in list(glycan_dic):
-                            former_glycan = self.glycan_list_to_str(former_key)
-                            if self.glycan_contain(former_glycan, key):
-                                glycan_remains = self.glycan_minus(former_glycan, key)
-                                print(glycan_remains)
-                                glycan_dic_lists = self.glycan_str_to_list(glycan_remains)
-                                for glycan_dic_list in glycan_dic_lists:
-                                    print(former_key)
-                                    new_key = former_key + "".join(glycan_dic_list)
-                                    print(new_key)
-                                    print(value)
-                                    new_value = round(glycan_dic[former_key] + value, 1)
-                                    glycan_dic[new_key] = new_value
-                                    print(glycan_dic)
-
-        for key in list(glycan_dic):
-            print(key + ": " + str(glycan_dic[key]))
-
-        return glycan_dic
-
+        assert top_number > 0, "Wrong Top Number for de_novo_batch!"
+        assert beam_width is None or beam_width > 0, "Wrong Beam Width for de_novo_batch!"
+        assert max_gap >= 0, "Wrong Maximum Gap for de_novo_batch!"
+        precursors = np.asarray(precursors, dtype=np.int64)
+        compositions = np.asarray(compositions, dtype=np.int64)
+        intensities = np.asarray(intensities, dtype=np.float64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        number_spectra = len(precursors)
+        assert len(offsets) == number_spectra + 1 and offsets[-1] == len(compositions) == len(intensities), \
+            "Wrong Input Arrays for de_novo_batch!"
+        if number_spectra == 0:
+            return []
+
+        # Split the spectra into the parts for the worker processes, each part is packed as the arrays.
+        if workers > 1 and number_spectra > 1:
+            tasks = []
+            for part in np.array_split(np.arange(number_spectra), min(workers, number_spectra)):
+                start, end = offsets[part[0]], offsets[part[-1] + 1]
+                tasks.append((precursors[part[0]:part[-1] + 1], compositions[start:end], intensities[start:end],
+                              offsets[part[0]:part[-1] + 2] - start, top_number, beam_width, max_gap, batch_size))
+            return [glycan_de_novo for glycan_de_novos, _ in run_tasks(de_novo_batch_worker, tasks, workers)
+                    for glycan_de_novo in glycan_de_novos]
+
+        # The ions beyond the precursor could not be in a ladder, the ions without any monosaccharide are ignored.
+        spectrum_ids = np.repeat(np.arange(number_spectra), np.diff(offsets))
+        precursor_totals = precursors.sum(axis=1)
+        totals = compositions.sum(axis=1)
+        if np.any(totals > precursor_totals[spectrum_ids]):
+            raise IndexError("Wrong Input Monosaccharides for de_novo_batch!")
+        # Add the precursor with the intensity 0.0 as an end, if there is no ion in the last level.
+        has_precursor = np.zeros(number_spectra, dtype=bool)
+        has_precursor[spectrum_ids[totals == precursor_totals[spectrum_ids]]] = True
+        ion_ids = np.concatenate([spectrum_ids[totals > 0], np.flatnonzero(~has_precursor)])
+        ion_compositions = np.concatenate([compositions[totals > 0], precursors[~has_precursor]])
+        ion_intensities = np.concatenate([intensities[totals > 0], np.zeros(np.count_nonzero(~has_precursor))])
+        # Sort the ions of each spectrum into the levels, the ions in a level are in the same order as the input.
+        ion_totals = ion_compositions.sum(axis=1)
+        order = np.lexsort((ion_totals, ion_ids))
+        ion_ids, ion_compositions, ion_intensities, ion_totals = \
+            ion_ids[order], ion_compositions[order], ion_intensities[order], ion_totals[order]
+        ion_offsets = np.zeros(number_spectra + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ion_ids, minlength=number_spectra), out=ion_offsets[1:])
+        # The position of the empty glycan is 0 for each spectrum, and the ions are after it.
+        ion_positions = np.arange(len(ion_ids)) - ion_offsets[ion_ids] + 1
+        ion_packed = (ion_compositions << (field_bits * np.arange(ion_compositions.shape[1]))).sum(axis=1)
+
+        glycan_de_novos = []
+        for batch_start in range(0, number_spectra, batch_size):
+            batch_end = min(batch_start + batch_size, number_spectra)
+            start, end = ion_offsets[batch_start], ion_offsets[batch_end]
+            number_ions = int(np.diff(ion_offsets[batch_start:batch_end + 1]).max()) + 1
+            batch_compositions = np.zeros((batch_end - batch_start, number_ions, ion_compositions.shape[1]),
+                                          dtype=np.int64)
+            batch_totals = np.zeros((batch_end - batch_start, number_ions), dtype=np.int64)
+            batch_valid = np.zeros((batch_end - batch_start, number_ions), dtype=bool)
+            batch_valid[:, 0] = True
+            batch_index = (ion_ids[start:end] - batch_start, ion_positions[start:end])
+            batch_compositions[batch_index] = ion_compositions[start:end]
+            batch_totals[batch_index] = ion_totals[start:end]
+            batch_valid[batch_index] = True
+            batch_parents = batch_containment_parents(batch_compositions, batch_totals, batch_valid, max_gap)
+
+            for s in range(batch_end - batch_start):
+                spectrum_start, spectrum_end = ion_offsets[batch_start + s], ion_offsets[batch_start + s + 1]
+                levels = [0] + ion_totals[spectrum_start:spectrum_end].tolist()
+                packed = [0] + ion_packed[spectrum_start:spectrum_end].tolist()
+                values = ion_intensities[spectrum_start:spectrum_end].tolist()
+                level_ions = [[] for _ in range(levels[-1] + 1)]
+                level_compositions = [[0]] + [[] for _ in range(levels[-1])]
+                composition_parents = [[[]]] + [[] for _ in range(levels[-1])]
+                for position, value in enumerate(values, 1):
+                    level_ions[levels[position]].append((packed[position], value))
+                    level_compositions[levels[position]].append(packed[position])
+                # The parents from the nearest level, and in the order of the ions in a level.
+                parent_positions, child_positions = np.nonzero(batch_parents[s, :len(packed), :len(packed)])
+                parent_order = np.lexsort((parent_positions, -batch_totals[s, parent_positions], child_positions))
+                parents = [[] for _ in packed]
+                for parent, child in zip(parent_positions[parent_order].tolist(),
+                                         child_positions[parent_order].tolist()):
+                    if parents[child] and parents[child][-1][0] == levels[parent]:
+                        parents[child][-1][1].append(packed[parent])
+                    else:
+                        parents[child].append((levels[parent], [packed[parent]]))
+                for position in range(1, len(packed)):
+                    composition_parents[levels[position]].append(parents[position])
+
+                glycan_ladders = build_ladders(level_ions, level_compositions, composition_parents, beam_width,
+                                               max_gap)
+                glycan_de_novo = {}
+                for ladder in glycan_ladders[-1]:
+                    glycan_de_novo[ladder[0]] = ladder[1]
+                glycan_de_novos.append(sorted(glycan_de_novo.items(), key=lambda kv: (kv[1], kv[0]),
+                                              reverse=True)[:top_number])
+        return glycan_de_novos
+
+
+def de_novo_batch_worker(precursors, compositions, intensities, offsets, top_number, beam_width=None, max_gap=0,
+                         batch_size=1024):
+    """
+    Search a part of the spectra in a worker process, the arguments are the same as DeNovoSequencing.de_novo_batch().
+    :return: A list of the glycan de novo string tuple lists for the spectra.
+    """
+    return DeNovoSequencing().de_novo_batch(precursors, compositions, intensities, offsets, top_number, beam_width,
+                                            max_gap, 1, batch_size)
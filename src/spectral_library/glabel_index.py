@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script builds an index for a gLabel file, to join the spectra from an mgf file with their identifications.
+The gLabel rows are sorted by the spectrum title once, each title is mapped to its range of rows, and the needed
+columns are stored as plain lists, so that each spectrum is joined by a dictionary lookup.
+The peaks of a spectrum are matched to the ion masses of gLabel within a tolerance by a vectorized search.
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+import pandas as pd
+import numpy as np
+
+
+# The columns of gLabel used to construct the spectral libraries.
+glabel_columns = ['spec', 'matched_ion', 'peptide', 'modinfo', 'formula']
+
+
+class GLabelIndex(object):
+    """
+    Join the gLabel identifications to the spectra by the title, such as
+    "202110_Palleon_Cyno_In_vitro-20211027_Palleon_A_HILIC.3200.3200.5.0.dta".
+    """
+    def __init__(self, glabel_file, glycan_column='glycan(H,N,F,A,G)'):
+        """
+        :param glabel_file: the glabel file to read;
+        :param glycan_column: the column of glycan compositions, such as "glycan(H,N,F,A,G)" for five monosaccharides.
+        """
+        glabel = pd.read_csv(glabel_file, sep='\t', header=0, encoding='utf8', engine='python', on_bad_lines='skip')
+        # Use a stable sort, so that the duplicated IDs of a spectrum keep the order in the gLabel file.
+        glabel_sort = glabel.sort_values(by=["spec"], kind='mergesort')
+        self.glycan_column = glycan_column
+        self.columns = {column: glabel_sort[column].tolist() for column in glabel_columns + [glycan_column]}
+
+        # One spectrum from MGF might have several identifications in gLabel, map the title to a range of rows.
+        self.title_ranges = {}
+        titles = self.columns['spec']
+        start = 0
+        for i in range(1, len(titles) + 1):
+            if i == len(titles) or titles[i] != titles[start]:
+                self.title_ranges[titles[start]] = (start, i)
+                start = i
+
+    def __len__(self):
+        return len(self.columns['spec'])
+
+    def rows(self, title):
+        """
+        :param title: the title of a spectrum;
+        :return: a range of the rows for the title, it is empty if the title could not be found.
+        """
+        start, end = self.title_ranges.get(title, (0, 0))
+        return range(start, end)
+
+    def value(self, column, row):
+        """
+        :param column: the column name, such as "peptide";
+        :param row: the row number from rows();
+        :return: the value of the column in the row.
+        """
+        return self.columns[column][row]
+
+    def glycan(self, row):
+        """
+        :param row: the row number from rows();
+        :return: the glycan compositions in the row, such as "5,4,0,0,2".
+        """
+        return self.columns[self.glycan_column][row]
+
+    def matched_ion_arrays(self, row):
+        """
+        Parse the matched ions, such as 'Y-H(3)N(3)+1=1996.916,4248.5;b2+1=235.119,9667.3', into arrays.
+        :param row: the row number from rows();
+        :return: a NumPy float array for the ion masses, and a list of the annotations, in the order of gLabel.
+        """
+        ion_mz = []
+        ion_annotations = []
+        for ion in self.columns['matched_ion'][row].split(';'):
+            ion_anno = ion.split('=')
+            ion_mz.append(ion_anno[1].split(',')[0])
+            ion_annotations.append(ion_anno[0])
+        return np.array(ion_mz, dtype=np.float64), ion_annotations
+
+
+def match_peaks(peak_mz, ion_mz, tolerance=0.001, unit='Da'):
+    """
+    Match the ion masses from gLabel to the peaks of a spectrum, each ion is matched to its nearest peak within the
+    tolerance. If several ions are matched to the same peak, the last ion in gLabel is kept.
+    :param peak_mz: a NumPy float array for the m/z of the peaks;
+    :param ion_mz: a NumPy float array for the ion masses;
+    :param tolerance: the tolerance for matching, such as 0.001 Da or 10 ppm;
+    :param unit: the unit of the tolerance, "Da" or "ppm";
+    :return: a NumPy array of the matched peak indices in ascending order, and a NumPy array of the ion indices.
+    """
+    assert unit in ('Da', 'ppm'), "Wrong Unit of Tolerance!"
+    peak_mz = np.asarray(peak_mz, dtype=np.float64)
+    ion_mz = np.asarray(ion_mz, dtype=np.float64)
+    if len(peak_mz) == 0 or len(ion_mz) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    # The peaks in a mgf file are usually sorted, but sort them again to make sure.
+    peak_order = np.argsort(peak_mz, kind='mergesort')
+    sorted_mz = peak_mz[peak_order]
+    # The nearest peak is either the one on the left or the one on the right of the insertion point.
+    right = np.searchsorted(sorted_mz, ion_mz).clip(1, len(sorted_mz) - 1) if len(sorted_mz) > 1 \
+        else np.zeros(len(ion_mz), dtype=np.intp)
+    left = (right - 1).clip(0)
+    use_left = np.abs(ion_mz - sorted_mz[left]) <= np.abs(sorted_mz[right] - ion_mz)
+    nearest = np.where(use_left, left, right)
+    error = np.abs(sorted_mz[nearest] - ion_mz)
+    if unit == 'ppm':
+        error = error / ion_mz * 1e6
+    ion_indices = np.flatnonzero(error <= tolerance)
+    peak_indices = peak_order[nearest[ion_indices]]
+
+    # Keep the last ion for each peak, then order the matches by the peaks.
+    unique_peaks, last_reversed = np.unique(peak_indices[::-1], return_index=True)
+    ion_indices = ion_indices[::-1][last_reversed]
+    return unique_peaks, ion_indices
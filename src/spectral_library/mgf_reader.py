@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script provides a streaming reader for MS/MS spectra in a Mascot Generic Format (MGF) file.
+Each spectrum between "BEGIN IONS" and "END IONS" is parsed into the parameters and the contiguous NumPy arrays of
+the peaks, the text is read in large blocks and split at "END IONS", and the peaks of a spectrum are parsed at once,
+instead of line by line.
+A file could be split into byte ranges at "BEGIN IONS" to parse the ranges in parallel, and the titles could be
+indexed by the byte offsets of the spectra to fetch a spectrum by its title.
+The compressed mgf files, such as "sample.mgf.gz", are decompressed as streams on reading.
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+from pathlib import Path
+import bisect
+import codecs
+import mmap
+import re
+import warnings
+import numpy as np
+from compressed_io import open_file, is_compressed
+from parallel_workers import run_tasks
+
+
+"""
+The following is a sample spectrum for an mgf file.
+
+BEGIN IONS
+TITLE=202110_Palleon_Cyno_In_vitro-20211027_Palleon_A_HILIC.3200.3200.5.0.dta
+PEPMASS=752.10299
+CHARGE=5+
+RTINSECONDS=351.1281
+235.119 9667.3
+284.172 834.2
+END IONS
+
+"""
+
+# The size of the blocks to read the text of an mgf file.
+block_size = 1 << 22
+# The lines of "BEGIN IONS" and "TITLE=" for indexing the titles.
+begin_pattern = re.compile(rb'^[ \t]*BEGIN IONS[ \t]*\r?$', re.MULTILINE)
+title_pattern = re.compile(rb'^[ \t]*TITLE=([^\r\n]*)', re.MULTILINE | re.IGNORECASE)
+
+
+class MGFSpectrum(object):
+    """
+    A spectrum in an mgf file, the parameters are kept as strings, and the peaks are stored as NumPy arrays.
+    """
+    __slots__ = ('params', 'title', 'precursor_mz', 'precursor_intensity', 'charges', 'retention_time', 'mz',
+                 'intensity')
+
+    def __init__(self, params, mz, intensity):
+        """
+        :param params: A dictionary for the parameters with the lower case keys, such as
+                       {"title": "run.3200.3200.5.0.dta", "pepmass": "752.10299", "charge": "5+"};
+        :param mz: A NumPy float array for the m/z of the peaks;
+        :param intensity: A NumPy float array for the intensities of the peaks.
+        """
+        self.params = params
+        self.title = params.get('title', '')
+        # The PEPMASS could have the intensity after the m/z, such as "752.10299 12345.6".
+        pepmass = params.get('pepmass', 'nan').split()
+        self.precursor_mz = float(pepmass[0])
+        self.precursor_intensity = float(pepmass[1]) if len(pepmass) > 1 else None
+        self.charges = parse_charges(params.get('charge', ''))
+        self.retention_time = float(params.get('rtinseconds', 'nan'))
+        self.mz = mz
+        self.intensity = intensity
+
+    def __len__(self):
+        return len(self.mz)
+
+    @property
+    def charge(self):
+        """
+        :return: A string of the charges, such as "5+", or "2+ and 3+" for several charges.
+        """
+        return ' and '.join(f"{abs(charge)}{'+' if charge > 0 else '-'}" for charge in self.charges)
+
+
+def parse_charges(charge_string):
+    """
+    Parse the charges such as "5+", "5", "2+ and 3+" or "2-" into a tuple of numbers.
+    :param charge_string: A string of the "CHARGE" parameter;
+    :return: A tuple of the charges, such as (5,), (2, 3) or (-2,), empty for no charge.
+    """
+    charges = []
+    for charge in charge_string.replace(' and ', ',').split(','):
+        charge = charge.strip()
+        if not charge:
+            continue
+        if charge.endswith('-'):
+            charges.append(-int(charge[:-1]))
+        else:
+            charges.append(int(charge.rstrip('+')))
+    return tuple(charges)
+
+
+def parse_mgf_block(block):
+    """
+    Parse the text between "BEGIN IONS" and "END IONS" into an MGFSpectrum.
+    :param block: A string of the parameter lines followed by the peak lines;
+    :return: An MGFSpectrum.
+    """
+    params = {}
+    position = 0
+    while position < len(block):
+        line_end = block.find('\n', position)
+        if line_end < 0:
+            line_end = len(block)
+        line = block[position:line_end]
+        # The parameters are "KEY=value", the peak lines follow them.
+        if '=' not in line and line.strip():
+            break
+        key, _, value = line.partition('=')
+        if key.strip():
+            params[key.strip().lower()] = value.strip()
+        position = line_end + 1
+
+    # Parse all the peak lines at once, each peak line is "m/z intensity" with an optional charge.
+    peak_text = block[position:].strip()
+    number_peaks = peak_text.count('\n') + 1 if peak_text else 0
+    try:
+        with warnings.catch_warnings():
+            # The older NumPy warns for the text which could not be parsed, instead of raising a ValueError.
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(peak_text, sep=' ')
+    except ValueError:
+        values = None
+    # The peaks with the charges, or the blank lines, are parsed line by line.
+    if values is None or len(values) != 2 * number_peaks:
+        values = np.array([value for line in peak_text.splitlines() for value in line.split()[:2]],
+                          dtype=np.float64)
+    peaks = values.reshape(-1, 2)
+    return MGFSpectrum(params, np.ascontiguousarray(peaks[:, 0]), np.ascontiguousarray(peaks[:, 1]))
+
+
+def iter_mgf_spectra(text_blocks):
+    """
+    Use "BEGIN IONS" and "END IONS" to determine the start and end of each spectrum, and yield the parsed spectra.
+    The text is split at "END IONS" as large blocks, instead of line by line.
+    :param text_blocks: An iterable of the text in an mgf file, such as the blocks of 4 MB, or the lines;
+    :return: A generator of MGFSpectrum.
+    """
+    rest = ''
+    for text_block in text_blocks:
+        text = rest + text_block
+        text_end = text.rfind('END IONS')
+        if text_end < 0:
+            rest = text
+            continue
+        rest = text[text_end + len('END IONS'):]
+        for block in text[:text_end].split('END IONS'):
+            begin = block.find('BEGIN IONS')
+            if begin >= 0:
+                yield parse_mgf_block(block[begin + len('BEGIN IONS'):])
+
+
+def iter_text_blocks(mgf_input, start=0, end=None):
+    """
+    :param mgf_input: An mgf file opened in binary mode;
+    :param start: the byte offset to start;
+    :param end: the byte offset to end, None for the end of the file;
+    :return: A generator of the decoded text blocks in the byte range.
+    """
+    mgf_input.seek(start)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    remaining = None if end is None else end - start
+    while remaining is None or remaining > 0:
+        data = mgf_input.read(block_size if remaining is None else min(block_size, remaining))
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def read_mgf(mgf_file, start=0, end=None):
+    """
+    Read the spectra from an mgf file one by one, or only the spectra in a byte range of the file.
+    :param mgf_file: the mgf file to read, or a compressed mgf file, such as "sample.mgf.gz";
+    :param start: the byte offset to start, should be a spectrum boundary from split_mgf_ranges or index_mgf_titles;
+    :param end: the byte offset to end, None for the end of the file;
+    :return: A generator of MGFSpectrum.
+    """
+    # The byte offsets of a compressed file are the offsets of the decompressed stream.
+    with open_file(mgf_file, 'rb') as mgf_input:
+        yield from iter_mgf_spectra(iter_text_blocks(mgf_input, start, end))
+
+
+def read_mgf_range(mgf_file, start, end):
+    """
+    Read the spectra in a byte range for a worker process, the peaks of all the spectra are joined into two arrays,
+    which are sent back to the main process much faster than the arrays of each spectrum.
+    :param mgf_file: the mgf file to read;
+    :param start: the byte offset to start;
+    :param end: the byte offset to end;
+    :return: A tuple of a list of the parameters, the arrays of m/z and intensities, and the offsets of the spectra.
+    """
+    spectra = list(read_mgf(mgf_file, start, end))
+    offsets = np.zeros(len(spectra) + 1, dtype=np.int64)
+    np.cumsum([len(spectrum) for spectrum in spectra], out=offsets[1:])
+    mz = np.concatenate([spectrum.mz for spectrum in spectra]) if spectra else np.zeros(0)
+    intensity = np.concatenate([spectrum.intensity for spectrum in spectra]) if spectra else np.zeros(0)
+    return [spectrum.params for spectrum in spectra], mz, intensity, offsets
+
+
+def read_mgf_parallel(mgf_file, workers=1):
+    """
+    Read all the spectra from an mgf file, by parsing the byte ranges of the file in a process pool.
+    :param mgf_file: the mgf file to read;
+    :param workers: the number of worker processes, such as 8;
+    :return: A list of MGFSpectrum in the same order as the file, the peaks of a spectrum are the contiguous slices
+             of the arrays for a byte range.
+    """
+    tasks = [(mgf_file, start, end) for start, end in split_mgf_ranges(mgf_file, int(workers))]
+    spectra = []
+    for (params_list, mz, intensity, offsets), _ in run_tasks(read_mgf_range, tasks, workers):
+        for i, params in enumerate(params_list):
+            spectra.append(MGFSpectrum(params, mz[offsets[i]:offsets[i + 1]], intensity[offsets[i]:offsets[i + 1]]))
+    return spectra
+
+
+def split_mgf_ranges(mgf_file, number_ranges):
+    """
+    Split an mgf file into byte ranges with similar sizes, each range starts at a "BEGIN IONS" line, so that
+    no spectrum is split into two ranges.
+    A compressed mgf file could not be seeked without decompressing it from the start, so it is one range.
+    :param mgf_file: the mgf file to split;
+    :param number_ranges: the number of ranges, such as 8;
+    :return: A list of (start, end) byte offsets, such as [(0, 1048576), (1048576, 2097152)],
+             or [(0, None)] for a compressed mgf file.
+    """
+    if is_compressed(mgf_file):
+        return [(0, None)]
+    file_size = Path(mgf_file).stat().st_size
+    boundaries = [0]
+    with open(mgf_file, 'rb') as mgf_input:
+        for i in range(1, number_ranges):
+            target = file_size * i // number_ranges
+            if target <= boundaries[-1]:
+                continue
+            mgf_input.seek(target)
+            # Skip the rest of the current line, then find the next "BEGIN IONS".
+            position = target + len(mgf_input.readline())
+            boundary = file_size
+            for line in mgf_input:
+                if line.strip() == b'BEGIN IONS':
+                    boundary = position
+                    break
+                position += len(line)
+            if boundaries[-1] < boundary < file_size:
+                boundaries.append(boundary)
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def index_mgf_titles(mgf_file):
+    """
+    Index the titles of the spectra by the byte offsets of their "BEGIN IONS" lines, without parsing the peaks.
+    The lines are searched by the regular expressions over the memory mapped file, a compressed file is read into
+    the memory instead.
+    :param mgf_file: the mgf file to index;
+    :return: A dictionary of the titles to the byte offsets, the first spectrum is kept for a duplicated title.
+    """
+    with open_file(mgf_file, 'rb') as mgf_input:
+        if is_compressed(mgf_file):
+            content = mgf_input.read()
+        elif Path(mgf_file).stat().st_size == 0:
+            return {}
+        else:
+            content = mmap.mmap(mgf_input.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            begin_offsets = [match.start() for match in begin_pattern.finditer(content)]
+            title_offsets = {}
+            for match in title_pattern.finditer(content):
+                # The title belongs to the last "BEGIN IONS" before it.
+                i = bisect.bisect_right(begin_offsets, match.start()) - 1
+                if i >= 0:
+                    title_offsets.setdefault(match.group(1).strip().decode(), begin_offsets[i])
+        finally:
+            if isinstance(content, mmap.mmap):
+                content.close()
+    return title_offsets
+
+
+def read_mgf_spectrum(mgf_file, offset):
+    """
+    :param mgf_file: the mgf file to read;
+    :param offset: the byte offset of a spectrum from index_mgf_titles;
+    :return: the MGFSpectrum at the offset, or None if there is no spectrum.
+    """
+    spectra = read_mgf(mgf_file, offset)
+    try:
+        return next(spectra, None)
+    finally:
+        spectra.close()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script builds a byte-offset index for an MSP format file, such as the annotated msp files and the denovo msp
+files, then fetches any spectrum by memory mapping without a scan of the whole file.
+
+The index is stored in a sidecar file next to the msp file, such as "sample.msp.idx", which is a tab separated file:
+offset  length  name    precursor_mass  peptide glycans
+0       1026    20211027_Palleon_A_HILIC.3200.3200.5.0.dta      752.10299       HPHJJSSDLHPHK   H(5)N(4)G(2)
+For a compressed msp file, such as "sample.msp.gz", the offsets are in the decompressed bytes, which are loaded
+into the memory instead of the memory mapping.
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+import argparse
+import mmap
+from pathlib import Path
+import numpy as np
+from msp_reader import parse_comment, parse_msp_chunk
+from compressed_io import open_file, is_compressed, split_compression
+
+
+INDEX_SUFFIX = '.idx'
+index_columns = ['offset', 'length', 'name', 'precursor_mass', 'peptide', 'glycans']
+
+
+def index_file_name(msp_file):
+    """
+    :param msp_file: the msp file, such as "/data/N-GP-MSP/sample.msp";
+    :return: the sidecar index file, such as "/data/N-GP-MSP/sample.msp.idx".
+    """
+    msp_file = Path(msp_file)
+    return msp_file.with_name(msp_file.name + INDEX_SUFFIX)
+
+
+def build_msp_index(msp_file, index_file=None):
+    """
+    Scan an msp file once, and record the byte offset and length of each spectrum in a sidecar index file.
+    Only the header lines of each spectrum are decoded, the peak lines are skipped.
+    :param msp_file: the msp file to index;
+    :param index_file: the index file to write, default is the msp file name plus ".idx";
+    :return: the index file.
+    """
+    if index_file is None:
+        index_file = index_file_name(msp_file)
+
+    num_spectra = 0
+    with open_file(msp_file, 'rb') as spec_library_file, open(index_file, 'w') as index_output_file:
+        index_output_file.write('\t'.join(index_columns) + '\n')
+
+        def write_entry(start, end, header):
+            if len(header) < 3 or not header[0].startswith("Name: ") or not header[1].startswith("MW: ") \
+                    or not header[2].startswith("Comment: "):
+                print("This chunk has some extra lines, or some deleted lines!")
+                print(header)
+                return 0
+            name = header[0].split(":", 1)[1].strip()
+            precursor_mass = header[1].split()[1]
+            comments = parse_comment(header[2])
+            index_output_file.write(f"{start}\t{end - start}\t{name}\t{precursor_mass}\t"
+                                    f"{comments.get('PEPTIDE', '')}\t{comments.get('GLYCANS', '')}\n")
+            return 1
+
+        # Use blank line to determine the start and end of each spectrum
+        offset = 0
+        start = None
+        header = []
+        for line in spec_library_file:
+            stripped = line.strip()
+            if stripped:
+                if start is None:
+                    start = offset
+                    header = []
+                if len(header) < 3:
+                    header.append(stripped.decode())
+            elif start is not None:
+                num_spectra += write_entry(start, offset, header)
+                start = None
+            offset += len(line)
+        # The last spectrum may not be followed by a blank line.
+        if start is not None:
+            num_spectra += write_entry(start, offset, header)
+
+    print(f"Constructed an index file: {Path(index_file).name} for {num_spectra} spectra")
+    return index_file
+
+
+class MSPIndex(object):
+    """
+    Random access to the spectra in an msp file by the sidecar index, keyed by the name, the precursor mass (MW),
+    and the peptide/glycan.
+    """
+    def __init__(self, msp_file, index_file=None):
+        """
+        Load the sidecar index, it is built again if it does not exist, or it is older than the msp file.
+        :param msp_file: the msp file to read;
+        :param index_file: the index file to read, default is the msp file name plus ".idx".
+        """
+        self.msp_file = Path(msp_file)
+        if index_file is None:
+            index_file = index_file_name(msp_file)
+        index_file = Path(index_file)
+        if not index_file.exists() or index_file.stat().st_mtime < self.msp_file.stat().st_mtime:
+            build_msp_index(self.msp_file, index_file)
+
+        offsets = []
+        lengths = []
+        self.names = []
+        precursor_masses = []
+        self.peptides = []
+        self.glycans = []
+        with open(index_file) as index_input_file:
+            next(index_input_file)
+            for line in index_input_file:
+                offset, length, name, precursor_mass, peptide, glycans = line.rstrip('\n').split('\t')
+                offsets.append(int(offset))
+                lengths.append(int(length))
+                self.names.append(name)
+                precursor_masses.append(float(precursor_mass))
+                self.peptides.append(peptide)
+                self.glycans.append(glycans)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.lengths = np.array(lengths, dtype=np.int64)
+        self.precursor_masses = np.array(precursor_masses, dtype=np.float64)
+        # Sort the precursor masses once for the range queries.
+        self.mass_order = np.argsort(self.precursor_masses, kind='stable')
+        self.sorted_masses = self.precursor_masses[self.mass_order]
+
+        # The same spectrum could be annotated several times, so each key maps to a list of positions.
+        self.name_positions = {}
+        self.peptide_positions = {}
+        self.peptide_glycan_positions = {}
+        for i, (name, peptide, glycans) in enumerate(zip(self.names, self.peptides, self.glycans)):
+            self.name_positions.setdefault(name, []).append(i)
+            self.peptide_positions.setdefault(peptide, []).append(i)
+            self.peptide_glycan_positions.setdefault((peptide, glycans), []).append(i)
+
+        self._file = open_file(self.msp_file, 'rb')
+        # mmap can not map an empty file, or the decompressed bytes of a compressed file.
+        if is_compressed(self.msp_file):
+            self._mmap = self._file.read()
+        elif self.msp_file.stat().st_size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = b''
+
+    def __len__(self):
+        return len(self.names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def get_raw(self, position):
+        """
+        :param position: the position of the spectrum in the index;
+        :return: the bytes of the spectrum in the msp file, without the blank line.
+        """
+        offset = int(self.offsets[position])
+        return self._mmap[offset:offset + int(self.lengths[position])]
+
+    def get_spectrum(self, position):
+        """
+        :param position: the position of the spectrum in the index;
+        :return: an MSPSpectrum.
+        """
+        lines = [line.strip() for line in self.get_raw(position).decode().splitlines()]
+        return parse_msp_chunk([line for line in lines if line])
+
+    def find_by_name(self, name):
+        """
+        :param name: the name of the spectrum, such as "20211027_Palleon_A_HILIC.3200.3200.5.0.dta";
+        :return: a list of positions.
+        """
+        return self.name_positions.get(name, [])
+
+    def find_by_peptide_glycan(self, peptide, glycans=None):
+        """
+        :param peptide: the peptide, such as "HPHJJSSDLHPHK";
+        :param glycans: the glycans, such as "H(5)N(4)G(2)", if None, all the glycans of the peptide are found;
+        :return: a list of positions.
+        """
+        if glycans is not None:
+            return self.peptide_glycan_positions.get((peptide, glycans), [])
+        return self.peptide_positions.get(peptide, [])
+
+    def find_by_mass(self, low_mass, high_mass):
+        """
+        :param low_mass: the lower bound of the precursor mass (MW);
+        :param high_mass: the upper bound of the precursor mass (MW);
+        :return: a list of positions whose precursor masses are in [low_mass, high_mass], ordered by mass.
+        """
+        left = np.searchsorted(self.sorted_masses, low_mass, side='left')
+        right = np.searchsorted(self.sorted_masses, high_mass, side='right')
+        return self.mass_order[left:right].tolist()
+
+    def write_subset(self, positions, msp_file):
+        """
+        Re-export a subset of the spectra into a new msp file.
+        :param positions: a list of positions;
+        :param msp_file: the msp file to write, it is compressed by the suffix, such as "subset.msp.gz".
+        """
+        with open_file(msp_file, 'wb') as msp_writer:
+            for position in positions:
+                msp_writer.write(self.get_raw(position).rstrip(b'\r\n') + b'\n\n')
+        print(f"Constructed a msp file: {Path(msp_file).name} for {len(positions)} spectra")
+
+
+# Build the index files for all the msp files in a folder.
+def index_msp_files(input_path):
+    """
+    :param input_path: A string for the msp folder or an msp file, such as "/data/Training-01-Human-285/N-GP-MSP";
+    :return: write an index file next to each msp file.
+    """
+    path_name = Path(input_path)
+    if path_name.is_file():
+        build_msp_index(path_name)
+        return
+    assert path_name.is_dir(), "Input path is wrong!"
+    for msp_file in sorted(path_name.iterdir()):
+        if msp_file.is_file() and split_compression(msp_file)[0].suffix == '.msp':
+            build_msp_index(msp_file)
+
+
+if __name__ == "__main__":
+    # Please run the script with the following input format in Linux/Unix/Mac such as:
+    # python msp_index.py -IP=/data/Training-01-Human-285/N-GP-MSP
+    # Print a spectrum of an msp file by the name:
+    # python msp_index.py -IP=/data/Training-01-Human-285/N-GP-MSP/sample.msp -NA=sample.3200.3200.5.0.dta
+    parser = argparse.ArgumentParser(description='Input parameters to run the script.')
+    parser.add_argument('--InputPath', '-IP', help='Input Path parameter，required，no default. An msp folder or an '
+                                                   'msp file, such as /data/Training-01-Human-285/N-GP-MSP.',
+                        required=True)
+    parser.add_argument('--Name', '-NA', help='Name parameter，not required，no default. Print the spectra with the '
+                                              'name from the msp file.', required=False)
+    args = parser.parse_args()
+
+    if args.Name is None:
+        index_msp_files(args.InputPath)
+    else:
+        with MSPIndex(args.InputPath) as msp_index:
+            for i in msp_index.find_by_name(args.Name):
+                print(msp_index.get_raw(i).decode())
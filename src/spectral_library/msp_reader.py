@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script provides a streaming reader for MS/MS spectral library data in an MSP format file.
+It is shared by the stages which read the annotated msp files and the denovo msp files.
+The compressed msp files, such as "sample.msp.gz", are decompressed as streams on reading.
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+from pathlib import Path
+import numpy as np
+from compressed_io import open_file, is_compressed
+
+
+"""
+The following is a sample spectrum for an msp file for five monosaccharides.
+
+Name: 202110_Palleon_Cyno_In_vitro-20211027_Palleon_A_HILIC.3200.3200.5.0.dta
+MW: 752.10299
+Comment: CHARGE=5+      RTINSECONDS=351.1281    PEPTIDE=HPHJJSSDLHPHK   MODIFICATIONS=nan
+GLYCAN(H,N,F,A,G)=5,4,0,0,2     GLYCANS=H(5)N(4)G(2)
+Num Peaks: 29
+235.119 9667.3  b2+1
+284.172 834.2   y2+1
+695.045 1616.6  Y-H(4)N(3)+4
+
+"""
+
+monosaccharide_list = "HNFAG"
+
+
+class MSPSpectrum(object):
+    """
+    A spectrum in an msp file, the header fields are typed, and the peaks are stored as NumPy arrays.
+    """
+    __slots__ = ('header_lines', 'name', 'precursor_mass', 'comments', 'charge', 'retention_time', 'peptide',
+                 'modifications', 'glycan_composition', 'glycans', 'mz', 'intensity', 'annotations', 'peak_text')
+
+    def __init__(self, header_lines, name, precursor_mass, comments, mz, intensity, annotations, peak_text=None):
+        """
+        :param header_lines: A tuple of the four header lines, "Name: ", "MW: ", "Comment: " and "Num Peaks: ";
+        :param name: A string for the name of the spectrum;
+        :param precursor_mass: A float for the "MW";
+        :param comments: A dictionary for the fields in "Comment", such as {"CHARGE": "5+", "PEPTIDE": "HPHJJSSDLHPHK"};
+        :param mz: A NumPy float array for the m/z of the peaks;
+        :param intensity: A NumPy float array for the intensities of the peaks;
+        :param annotations: A list of strings for the annotations of the peaks, such as ["b2+1", "Y-H(4)N(3)+4"];
+        :param peak_text: A tuple of the original peak lines, they are written out as they are in the msp file.
+        """
+        self.header_lines = header_lines
+        self.name = name
+        self.precursor_mass = precursor_mass
+        self.comments = comments
+        # Only store the number of charge, ignore the '+'
+        self.charge = int(comments.get('CHARGE', '0').rstrip('+'))
+        self.retention_time = float(comments.get('RTINSECONDS', 'nan'))
+        self.peptide = comments.get('PEPTIDE', '')
+        self.modifications = comments.get('MODIFICATIONS', 'nan')
+        self.glycan_composition = parse_glycan_composition(comments)
+        self.glycans = comments.get('GLYCANS', '')
+        self.mz = mz
+        self.intensity = intensity
+        self.annotations = annotations
+        self.peak_text = peak_text
+
+    def __len__(self):
+        return len(self.annotations)
+
+    @property
+    def retention_time_text(self):
+        """
+        :return: The original text of "RTINSECONDS", such as "495.110", to write it out without the float formatting.
+        """
+        return self.comments.get('RTINSECONDS', 'nan')
+
+    @property
+    def glycan_length(self):
+        """
+        :return: The total number of monosaccharides in the glycan, such as 11 for GLYCAN(H,N,F,A,G)=5,4,0,0,2.
+        """
+        return sum(self.glycan_composition)
+
+    @property
+    def monosaccharides(self):
+        """
+        :return: The monosaccharides in the glycan, such as "HHHHHNNNNGG" for GLYCAN(H,N,F,A,G)=5,4,0,0,2.
+        """
+        return "".join(monosaccharide * number
+                       for monosaccharide, number in zip(monosaccharide_list, self.glycan_composition))
+
+    def peak_lines(self):
+        """
+        :return: A list of peak lines in the msp format, such as ["235.119\t9667.3\tb2+1", ...], the original lines
+                 are kept, such as "1699.6420" is not written as "1699.642".
+        """
+        if self.peak_text is not None:
+            return list(self.peak_text)
+        return [f"{mz}\t{intensity}\t{annotation}"
+                for mz, intensity, annotation in zip(self.mz.tolist(), self.intensity.tolist(), self.annotations)]
+
+
+def parse_glycan_composition(comments):
+    """
+    Parse the glycan compositions such as GLYCAN(H,N,F,A,G)=5,4,1,1,1 into a tuple of numbers for "HNFAG".
+    :param comments: A dictionary for the fields in "Comment";
+    :return: A tuple like (5, 4, 1, 1, 1), all zeros for "nan".
+    """
+    glycan_compositions = 'nan'
+    for key, value in comments.items():
+        if key.startswith('GLYCAN('):
+            glycan_compositions = value
+            break
+    monosaccharide_numbers = [0] * len(monosaccharide_list)
+    if glycan_compositions != 'nan':
+        # Should consider double-digit monosaccharides.
+        for i, number in enumerate(glycan_compositions.split(",")):
+            monosaccharide_numbers[i] = int(number)
+    return tuple(monosaccharide_numbers)
+
+
+def parse_comment(comment_line):
+    """
+    Parse the "Comment" line into a dictionary of fields.
+    :param comment_line: A string like "Comment: CHARGE=5+\tRTINSECONDS=351.1281\tPEPTIDE=HPHJJSSDLHPHK";
+    :return: A dictionary like {"CHARGE": "5+", "RTINSECONDS": "351.1281", "PEPTIDE": "HPHJJSSDLHPHK"}.
+    """
+    comment = comment_line.split(":", 1)[1]
+    # The fields are separated by tabs, the value of "DENOVO" in a denovo msp file contains spaces.
+    fields = comment.split('\t') if '\t' in comment else comment.split()
+    comments = {}
+    for field in fields:
+        key, _, value = field.strip().partition('=')
+        if key:
+            comments[key] = value
+    return comments
+
+
+def parse_msp_chunk(current_chunk):
+    """
+    Parse the stripped lines of one spectrum into an MSPSpectrum.
+    :param current_chunk: A list of non-empty lines, the header lines are followed by the peak lines;
+    :return: An MSPSpectrum, or None if the chunk has some extra lines, or some deleted lines.
+    """
+    if len(current_chunk) < 4 or not current_chunk[0].startswith("Name: ") \
+            or not current_chunk[1].startswith("MW: ") or not current_chunk[2].startswith("Comment: "):
+        print("This chunk has some extra lines, or some deleted lines!")
+        print(current_chunk)
+        return None
+
+    name = current_chunk[0].split(":", 1)[1].strip()
+    precursor_mass = float(current_chunk[1].split()[1])
+    comments = parse_comment(current_chunk[2])
+
+    # Split all the peak lines at once, each peak line is "m/z intensity annotation".
+    peak_lines = current_chunk[4:]
+    values = " ".join(peak_lines).split()
+    if len(values) != 3 * len(peak_lines):
+        print("This chunk has some peaks without m/z, intensity or annotation!")
+        print(current_chunk)
+        return None
+    mz = np.array(values[0::3], dtype=np.float64)
+    intensity = np.array(values[1::3], dtype=np.float64)
+    annotations = values[2::3]
+
+    return MSPSpectrum(tuple(current_chunk[:4]), name, precursor_mass, comments, mz, intensity, annotations,
+                       tuple(peak_lines))
+
+
+def iter_msp_spectra(lines):
+    """
+    Use blank lines to determine the start and end of each spectrum, and yield the parsed spectra.
+    :param lines: An iterable of lines in an msp file;
+    :return: A generator of MSPSpectrum.
+    """
+    current_chunk = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            current_chunk.append(line)
+        elif current_chunk:
+            # End of chunk - start processing
+            spectrum = parse_msp_chunk(current_chunk)
+            if spectrum is not None:
+                yield spectrum
+            current_chunk = []
+    # The last spectrum may not be followed by a blank line.
+    if current_chunk:
+        spectrum = parse_msp_chunk(current_chunk)
+        if spectrum is not None:
+            yield spectrum
+
+
+def read_msp(msp_file, start=0, end=None):
+    """
+    Read the spectra from an msp file one by one, or only the spectra in a byte range of the file.
+    :param msp_file: the msp file to read, or a compressed msp file, such as "sample.msp.gz";
+    :param start: the byte offset to start, should be a spectrum boundary from split_msp_ranges;
+    :param end: the byte offset to end, None for the end of the file;
+    :return: A generator of MSPSpectrum.
+    """
+    if start == 0 and end is None:
+        with open_file(msp_file) as spec_library_file:
+            yield from iter_msp_spectra(spec_library_file)
+    else:
+        # The byte offsets of a compressed file are the offsets of the decompressed stream.
+        with open_file(msp_file, 'rb') as spec_library_file:
+            yield from iter_msp_spectra(iter_range_lines(spec_library_file, start, end))
+
+
+def iter_range_lines(spec_library_file, start, end=None):
+    """
+    :param spec_library_file: An msp file opened in binary mode;
+    :param start: the byte offset to start;
+    :param end: the byte offset to end, None for the end of the file;
+    :return: A generator of the decoded lines in the byte range.
+    """
+    spec_library_file.seek(start)
+    position = start
+    for line in spec_library_file:
+        if end is not None and position >= end:
+            break
+        position += len(line)
+        yield line.decode()
+
+
+def split_msp_ranges(msp_file, number_ranges):
+    """
+    Split an msp file into byte ranges with similar sizes, each range starts after a blank line, so that
+    no spectrum is split into two ranges.
+    A compressed msp file could not be seeked without decompressing it from the start, so it is one range.
+    :param msp_file: the msp file to split;
+    :param number_ranges: the number of ranges, such as 8;
+    :return: A list of (start, end) byte offsets, such as [(0, 1048576), (1048576, 2097152)],
+             or [(0, None)] for a compressed msp file.
+    """
+    if is_compressed(msp_file):
+        return [(0, None)]
+    file_size = Path(msp_file).stat().st_size
+    boundaries = [0]
+    with open(msp_file, 'rb') as spec_library_file:
+        for i in range(1, number_ranges):
+            target = file_size * i // number_ranges
+            if target <= boundaries[-1]:
+                continue
+            spec_library_file.seek(target)
+            # Skip the rest of the current line, then find the next blank line.
+            position = target + len(spec_library_file.readline())
+            boundary = file_size
+            for line in spec_library_file:
+                position += len(line)
+                if not line.strip():
+                    boundary = position
+                    break
+            if boundaries[-1] < boundary < file_size:
+                boundaries.append(boundary)
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script runs the same function over many tasks, such as one task for each msp file, in a process pool.
+The results are returned in the order of the tasks, so the merged counters are the same as the serial run.
+The results could also be yielded one by one, so a finished task is recorded before the others are finished.
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+
+def timed_call(function, arguments):
+    """
+    :param function: A function defined at the top level of a module, so it can be sent to a worker process;
+    :param arguments: A tuple of the arguments for the function;
+    :return: A tuple of the result and the process time in seconds.
+    """
+    start_time = time.time()
+    result = function(*arguments)
+    return result, time.time() - start_time
+
+
+def iter_tasks(function, tasks, workers=1):
+    """
+    Run function(*task) for each task, serially for one worker, otherwise in a process pool, and yield the results
+    one by one, so the caller could record a finished task before the others are finished.
+    :param function: A function defined at the top level of a module;
+    :param tasks: A list of tuples of the arguments;
+    :param workers: The number of worker processes, such as 8;
+    :return: A generator of tuples of the result and the process time, in the same order as the tasks.
+    """
+    workers = int(workers)
+    assert workers > 0, "Wrong Number of Workers!"
+    if workers == 1 or len(tasks) < 2:
+        for task in tasks:
+            yield timed_call(function, task)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        futures = [executor.submit(timed_call, function, task) for task in tasks]
+        for future in futures:
+            yield future.result()
+
+
+def run_tasks(function, tasks, workers=1):
+    """
+    Run function(*task) for each task, serially for one worker, otherwise in a process pool.
+    :param function: A function defined at the top level of a module;
+    :param tasks: A list of tuples of the arguments;
+    :param workers: The number of worker processes, such as 8;
+    :return: A list of tuples of the result and the process time, in the same order as the tasks.
+    """
+    return list(iter_tasks(function, tasks, workers))
@@ -18,6 +18,8 @@ But the speed of reading pkl file is faster than that of csv file, roughly doubl
 
 Created on 8 March 2022.
 Modified on 11 April 2022, to handle both N and O linked glycopeptides.
+Modified on 18 October 2026, read the columnar folders of npy files as an option of the csv files.
+Modified on 18 October 2026, construct y (49, 36) for all the samples at once by the shared look-up tables of the ions.
 #######################################################################################################################
 """
 __author__ = 'ZLiang'
@@ -29,22 +31,12 @@ import pickle
 from pathlib import Path
 import argparse
 import time
+from training_data import TrainingData, tokens_to_one_hot, is_training_data, samples_to_y
 
 # Control whether to truncate or not. Should set as infinity "inf".
 # Otherwise, it outputs ellipsis "..." to represent the truncated lists, which affects csv files, but not for pkl files.
 np.set_printoptions(threshold=np.inf)
 
-# Assume the maximum length of peptide is 32, and maximum length of glycan is 18.
-# The maximum charge of glycopeptide is 6.
-# The maximum number of ions is 3 (b, y, Y).
-max_peptide_length = 32
-max_glycan_length = 18
-max_num_charges = 6
-max_num_ions = 3
-
-# sequence length
-seq_len = max_peptide_length + max_glycan_length
-
 # Header for the deep learning input output csv
 dl_csv_header = [
     'X, X_meta, y',
@@ -87,10 +79,29 @@ def data_to_csv(input_csv, output_dl_csv_file):
     print(f"Constructed a dl csv file:{dl_csv_name}")
 
 
+# write the data into a pkl file and a deep learning csv file.
+def data_to_pkl_dl(dl_data, pkl_file, dl_csv_file):
+    """
+    :param dl_data: the data of X, X_meta, y;
+    :param pkl_file: the pkl file to write;
+    :param dl_csv_file: the deep leaning csv file to write.
+    :return:
+    """
+    time_write_pkl = time.asctime(time.localtime(time.time()))
+    print(f"The time for writing the pkl file:{time_write_pkl}")
+    # write the data into a pickle file.
+    data_to_pkl(dl_data, pkl_file)
+
+    time_write_dl_csv = time.asctime(time.localtime(time.time()))
+    print(f"The time for writing the dl csv file:{time_write_dl_csv}")
+    # write the data into a deep learning input and output csv file.
+    data_to_csv(dl_data, dl_csv_file)
+
+
 # read the processed information from a csv file, and write the data into a pkl file and a deep learning csv file.
 def csv_to_pkl_dl(csv_file, pkl_file, dl_csv_file):
     """
-    Write the information of input_csv into the files of csv and denovo msp;
+    Write the information of input_csv into the files of pkl and deep learning csv;
     :param csv_file: the csv file to read;
     :param pkl_file: the pkl file to write;
     :param dl_csv_file: the deep leaning csv file to write.
@@ -100,14 +111,18 @@ def csv_to_pkl_dl(csv_file, pkl_file, dl_csv_file):
     df = pd.read_csv(csv_file, encoding='utf-8')
     # Initialize X, y, X_meta for the deep learning model.
     Xs = []
-    ys = []
     X_metas = []
+    # The peaks of all the samples are concatenated, then y is constructed for all the samples at once.
+    sample_intensities = []
+    sample_ions = []
+    sample_positions = []
+    sample_ion_charges = []
     for line in np.array(df):
         # Data for X: glycopeptide one-hot encoding (50, 26), use "eval" to keep it as lists.
         Xs.append(np.array(eval(line[0])))
         # Data for X_meta: charge (1), should use np.array to generate an array, add [] for metas.
         X_metas.append(np.array([line[1]]))
-        # Data for y: (50, 18)
+        # Data for y: (49, 36)
         # intensities
         intensities = np.array(eval(line[5])).astype(float)
         # ions
@@ -122,56 +137,63 @@ def csv_to_pkl_dl(csv_file, pkl_file, dl_csv_file):
         assert np.min(positions) >= 1
         assert np.min(ion_charges) >= 0
 
-        # Consider four different types of ions: b ion, y ion, Y ion.
-        # The max position of the ion is limited to "seq_len - 1".
-        # For the length glycopeptide of 50, we have 49 for y.
-        # Use "b, y, Y" to represent ions, and times the maximum charges, then the space is 3*6 = 18
-        y = np.zeros((seq_len - 1, max_num_ions * max_num_charges))
-        # Arrange ion intensities to the corresponding places.
-        for i in range(len(intensities)):
-            # b ion, keep the positions[i], and use [1, 0, 0] for the b ion.
-            if ions[i] == '0':
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * max_num_ions + 0
-            # y ion, use max_peptide_length - positions[i], and use [0, 1, 0] for the y ion.
-            elif ions[i] == '1':
-                position = max_peptide_length - positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * max_num_ions + 1
-            # Y ion, ions[i] == '2', keep the positions[i], and use [0, 0, 1] for the Y ion.
-            else:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * max_num_ions + 2
-            # Add the intensity to the corresponding place.
-            y[position, ion_type] += intensities[i]
-        # Normalization by the summary of the total intensities.
-        y = y / np.sum(y)
-        # Concatenate into y(50, 18)
-        ys.append(y)
+        sample_intensities.append(intensities)
+        sample_ions.append(ions)
+        sample_positions.append(positions)
+        sample_ion_charges.append(ion_charges)
         num_samples += 1
 
+    # Data for y: (49, 36) for each sample, the same as parse_csv_to_pkl.py.
+    peak_offsets = np.cumsum([0] + [len(intensities) for intensities in sample_intensities])
+    if num_samples > 0:
+        ys = list(samples_to_y(np.concatenate(sample_intensities), np.concatenate(sample_ions),
+                               np.concatenate(sample_positions), np.concatenate(sample_ion_charges), peak_offsets))
+    else:
+        ys = []
+
     # Construct the final data for the deep learning model.
-    dl_data = list(zip(Xs, X_metas, ys))
+    data_to_pkl_dl(list(zip(Xs, X_metas, ys)), pkl_file, dl_csv_file)
 
-    time_write_pkl = time.asctime(time.localtime(time.time()))
-    print(f"The time for writing the pkl file:{time_write_pkl}")
-    # write the data into a pickle file.
-    data_to_pkl(dl_data, pkl_file)
+    return num_samples
 
-    time_write_dl_csv = time.asctime(time.localtime(time.time()))
-    print(f"The time for writing the dl csv file:{time_write_dl_csv}")
-    # write the data into a deep learning input and output csv file.
-    data_to_csv(dl_data, dl_csv_file)
+
+# read the samples from a columnar folder, and write the data into a pkl file and a deep learning csv file.
+def columnar_to_pkl_dl(columnar_path, pkl_file, dl_csv_file):
+    """
+    Write the information of a columnar folder into the files of pkl and deep learning csv, the same data as
+    csv_to_pkl_dl;
+    :param columnar_path: the columnar folder to read;
+    :param pkl_file: the pkl file to write;
+    :param dl_csv_file: the deep leaning csv file to write.
+    :return: the total number of samples for a pkl file.
+    """
+    training_data = TrainingData(columnar_path)
+    num_samples = len(training_data)
+    # Data for X: glycopeptide one-hot encoding (50, 26) from the tokens.
+    Xs = list(tokens_to_one_hot(np.array(training_data.tokens)))
+    # Data for X_meta: charge (1), should use np.array to generate an array, add [] for metas.
+    X_metas = [np.array([charge]) for charge in training_data.charges.astype(int).tolist()]
+    # Data for y: (49, 36), constructed for all the samples at once from the columns.
+    assert np.all(training_data.intensities > 0)
+    assert np.all(training_data.positions >= 1)
+    ys = list(samples_to_y(training_data.intensities, training_data.ions, training_data.positions,
+                           training_data.ion_charges, training_data.peak_offsets))
+
+    # Construct the final data for the deep learning model.
+    data_to_pkl_dl(list(zip(Xs, X_metas, ys)), pkl_file, dl_csv_file)
 
     return num_samples
 
 
 # Read a path for the input folder (CSV), then process the csv files into X, X_meta, and y,
 # which are used in the deep learning model.
-def parse_csv_files(input_type, input_path):
+def parse_csv_files(input_type, input_path, input_format='csv'):
     """
     Read the CSV files from the folder of "input_path", then converts them into the formats for the deep learning model
     :param input_type: A string for the folder of input type, such as "N" or "O"
-    :param input_path: A string for the input folder, such as "/data/Training-01-Human-285".
+    :param input_path: A string for the input folder, such as "/data/Training-01-Human-285";
+    :param input_format: A string for the format of the samples, "csv" for the "CSV" folder, or "columnar" for the
+                         columnar folders in the "COL" folder from parse_msp_to_csv.py.
     :return: write all the PKL files to the "/data/Training-01-Human-285/N-GP-PKL";
              write all the denovo msp files to the "/data/Training-01-Human-285/N-GP-DENOVO-MSP".
     """
@@ -179,13 +201,15 @@ def parse_csv_files(input_type, input_path):
 
     # Check whether path name is a folder
     assert path_name.is_dir(), "Input path is wrong!"
+    assert input_format in ('csv', 'columnar'), "Wrong Input Format!"
+    csv_folder = 'CSV' if input_format == 'csv' else 'COL'
 
     if input_type == 'N':
-        csv_path = path_name / 'N-GP-CSV'
+        csv_path = path_name / f'N-GP-{csv_folder}'
         pkl_path = path_name / 'N-GP-PKL'
         dl_csv_path = path_name / 'N-GP-DL-CSV'
     elif input_type == 'O':
-        csv_path = path_name / 'O-GP-CSV'
+        csv_path = path_name / f'O-GP-{csv_folder}'
         pkl_path = path_name / 'O-GP-PKL'
         dl_csv_path = path_name / 'O-GP-DL-CSV'
     else:
@@ -215,17 +239,21 @@ def parse_csv_files(input_type, input_path):
 
     # Iterate all the files in the CSV folder
     for csv_file in csv_path.iterdir():
-        if not csv_file.is_file():
+        if input_format == 'columnar':
+            if not is_training_data(csv_file):
+                print("There is a file or folder which is not columnar!")
+                continue
+        elif not csv_file.is_file():
             print("There is a folder in the CSV folder!")
             continue
-        if csv_file.suffix != '.csv':
+        elif csv_file.suffix != '.csv':
            print("There is a file whose type is not csv!")
            continue
         time_read_csv = time.asctime(time.localtime(time.time()))
         print(f"The time for reading the csv file: {time_read_csv}")
 
         # Get the filename without the extension, csv_file is the full "path/name" for the csv file.
-        csv_stem = csv_file.stem
+        csv_stem = csv_file.stem if input_format == 'csv' else csv_file.name
         # Generate the name for a pkl file, and the whole path/file for it.
         pkl_name = f'{csv_stem}.pkl'
         pkl_path_file = pkl_path / pkl_name
@@ -233,7 +261,10 @@ def parse_csv_files(input_type, input_path):
         dl_csv_name = f'dl_{csv_stem}.csv'
         dl_csv_path_file = dl_csv_path / dl_csv_name
 
-        num_samples_one_file = csv_to_pkl_dl(csv_file, pkl_path_file, dl_csv_path_file)
+        if input_format == 'csv':
+            num_samples_one_file = csv_to_pkl_dl(csv_file, pkl_path_file, dl_csv_path_file)
+        else:
+            num_samples_one_file = columnar_to_pkl_dl(csv_file, pkl_path_file, dl_csv_path_file)
 
         total_num_files += 1
         total_num_samples += num_samples_one_file
@@ -249,20 +280,22 @@ def parse_csv_files(input_type, input_path):
     print(f"The total time is: {total_time_seconds} Seconds, {total_time_minutes} Minutes, {total_time_hours} Hours.")
 
 #  CLI (command line interface) for the input and output
-def user_interface(input_type, input_path):
+def user_interface(input_type, input_path, input_format):
     """
     Get the folder of input path for the CSV and PKL files
     :param input_type: A string for the folder of input type;
-    :param input_path: A string for the folder of input path.
+    :param input_path: A string for the folder of input path;
+    :param input_format: A string for the format of the samples, "csv" or "columnar".
     :return: Call read_csv for the input of CSV files, and convert them into PKL and deep learning CSV files.
     """
     #  python parse_csv_data.py -IP=/data/Training-2021-D-Va--Human
-    parse_csv_files(input_type, input_path)
+    parse_csv_files(input_type, input_path, input_format)
 
 """
 Input parameters for the user interface:
     1   Input Glyco Peptide Type
     2   Input File Path Name
+    3   Input Format of the samples
 """
 parser = argparse.ArgumentParser(description='Input parameters to run the script.')
 parser.add_argument('--InputType', '-IT',
@@ -271,19 +304,25 @@ parser.add_argument('--InputType', '-IT',
 parser.add_argument('--InputPath', '-IP',
                     help='Input Path parameter，required，no default. Such as /data/Training-01-Human-285.',
                     required=False)
+parser.add_argument('--InputFormat', '-IF',
+                    help='Input Format parameter，not required, has default. csv-the csv files from parse_msp_to_csv.py; '
+                         'columnar-the columnar folders from parse_msp_to_csv.py -OF=columnar.',
+                    required=False, default='csv')
 
 args = parser.parse_args()
 
 if __name__ == "__main__":
     # Please run the script with the following input format in Linux/Unix/Mac such as:
     # python parse_csv_data.py -IT=N -IP=/data/Training-01-Human-285
+    # Read the columnar folders of "N-GP-COL" from "parse_msp_to_csv.py -OF=columnar":
+    # python parse_csv_data.py -IT=N -IP=/data/Training-01-Human-285 -IF=columnar
     # Or Windows such as:
     # python parse_csv_data.py -IT=O -IP=D:\data\Training-01-Human-285
     # For huge files processed by several hours, should use "nohup" and "&" to run in the background. For example:
     # nohup python -u parse_csv_data.py -IP=/data/Training-2021-D-Va--Human > D-Va–Human_out_pkl.out 2>&1 &
 
     try:
-        user_interface(args.InputType, args.InputPath)
+        user_interface(args.InputType, args.InputPath, args.InputFormat)
     except Exception as e:
         print(e)
 
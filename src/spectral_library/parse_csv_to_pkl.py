@@ -21,6 +21,12 @@ Modified on 11 April 2022, to handle both N and O linked glycopeptides.
 Modified on 21 April 2022, to read csv file with one denovo candidate and only convert to pkl file.
 Modified on 26 April 2022, for outputting csv files with top N denovo candidates for CLI.
 Modified on 11 August 2022, for generating 9 different types ions with maximum charge of 6.
+Modified on 18 October 2026, read the columnar folders of npy files as an option of the csv files.
+Modified on 18 October 2026, construct y for all the samples at once by the look-up tables of the ions.
+Modified on 18 October 2026, store y as a sparse y of (shape, flat indices, values) as an option.
+Modified on 18 October 2026, store X as the uint8 tokens (50,) instead of the one hot encoding (50, 26) by default.
+Modified on 18 October 2026, read the compressed csv files, such as "sample.csv.gz".
+Modified on 18 October 2026, skip the csv files whose pkl files are current by the manifest, and resume the runs.
 #######################################################################################################################
 """
 __author__ = 'ZLiang'
@@ -32,11 +38,17 @@ import pickle
 from pathlib import Path
 import argparse
 import time
+from training_data import TrainingData, tokens_to_one_hot, is_training_data, samples_to_y, sparse_y
+from compressed_io import split_compression
+from run_manifest import RunManifest, code_version, manifest_file
 
 # Control whether to truncate or not. Should set as infinity "inf".
 # Otherwise, it outputs ellipsis "..." to represent the truncated lists, which affects csv files, but not for pkl files.
 np.set_printoptions(threshold=np.inf)
 
+# The source files for the version of the code in the manifest, the pkl files are written again if any is changed.
+source_files = ('parse_csv_to_pkl.py', 'training_data.py', 'compressed_io.py')
+
 # Assume the maximum length of peptide is 32, and maximum length of glycan is 18.
 # The maximum charge of glycopeptide is 4.
 # The maximum number of ions is 9 (b, b$, b-N(1), y, y$, y-N(1), Y, Y0, Y$).
@@ -64,22 +76,30 @@ def data_to_pkl(input_pkl, output_pkl_file):
 
 
 # read the processed information from a csv file, and write the data into a pkl file.
-def csv_to_pkl(csv_file, pkl_file):
+def csv_to_pkl(csv_file, pkl_file, target_format='dense', sequence_format='tokens'):
     """
     Write the information of input_csv into the files of csv and denovo msp;
     :param csv_file: the csv file to read;
     :param pkl_file: the pkl file to write;
+    :param target_format: "dense" for y as an array (49, 36), "sparse" for y as (shape, flat indices, values);
+    :param sequence_format: "tokens" for X as the uint8 tokens (50,), "one_hot" for X as the one hot encoding (50, 26);
     :return: the total number of samples for a pkl file.
     """
     num_samples = 0
     df = pd.read_csv(csv_file, encoding='utf-8')
     # Initialize X, y, X_meta for the deep learning model.
     Xs = []
-    ys = []
     X_metas = []
+    # The peaks of all the samples are concatenated, then y is constructed for all the samples at once.
+    sample_intensities = []
+    sample_ions = []
+    sample_positions = []
+    sample_ion_charges = []
     for line in np.array(df):
-        # Data for X: glycopeptide one-hot encoding (49, 26), use "eval" to keep it as lists.
-        Xs.append(np.array(eval(line[0])))
+        # Data for X: glycopeptide one-hot encoding (50, 26), use "eval" to keep it as lists.
+        X = np.array(eval(line[0]))
+        # The tokens are the indices of the items which are 1.
+        Xs.append(X.argmax(axis=1).astype(np.uint8) if sequence_format == 'tokens' else X)
         # Data for X_meta: charge (1), should use np.array to generate an array, add [] for metas.
         X_metas.append(np.array([line[1]]))
         # Data for y: (49, 36)
@@ -97,59 +117,56 @@ def csv_to_pkl(csv_file, pkl_file):
         assert np.min(positions) >= 1
         assert np.min(ion_charges) >= 0
 
-        # Consider nine different types of ions:
-        # b ions: 0 - b3, 1 - b$3, 2 - b3-N(1);
-        # y ions: 3 - y3, 4 - y$3, 5 - y3-N(1);
-        # Y ions: 6 - Y0, 7 - Y$,  8 - Y-N(1).
-        # The max position of the ion is limited to "seq_len".
-        # For the length glycopeptide of 32+18 = 50, we have 30 for peptide, 19 for glycan (17 for Y, 2 for Y0 and Y$).
-        # Use "b, b$, b-N(1), y, y$, y-N(1), Y, Y0, y$" to represent ions, and times the maximum charges,
-        # then the space is 9*4 = 36
-        y = np.zeros((SEQ_LEN - 1, MAX_NUM_IONS * MAX_NUM_CHARGES))
-        # Arrange ion intensities to the corresponding places.
-        for i in range(len(intensities)):
-            # ions should be int of 0, not string of '0',
-            # Python has no switch case feature Until 3.10
-            # b ion, b, b$, b-N(1), keep the positions[i], and use [1, 1, 1, 0, 0, 0, 0, 0, 0] for the b ion.
-            if ions[i] == 0:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 0
-            elif ions[i] == 1:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 1
-            elif ions[i] == 2:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 2
-            # y ion, y, y$, y-N(1),
-            # put max_peptide_length - positions[i], and use [0, 0, 0, 1, 1, 1, 0, 0, 0] for the y ion.
-            elif ions[i] == 3:
-                position = MAX_PEPTIDE_LENGTH - positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 3
-            elif ions[i] == 4:
-                position = MAX_PEPTIDE_LENGTH - positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 4
-            elif ions[i] == 5:
-                position = MAX_PEPTIDE_LENGTH - positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 5
-            # Y ion, Y0, y$, Y, keep the positions[i], and use [0, 0, 0, 0, 0, 0, 1, 1, 1]  for the Y ion.
-            # For the older version:
-            # ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 1
-            elif ions[i] == 6:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 6
-            elif ions[i] == 7:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 7
-            else:
-                position = positions[i] - 1
-                ion_type = (ion_charges[i] - 1) * MAX_NUM_IONS + 8
-            y[position, ion_type] += intensities[i]
-        # Normalization by the summary of the total intensities.
-        y = y / np.sum(y)
-        # Concatenate into y(50, 18)
-        ys.append(y)
+        sample_intensities.append(intensities)
+        sample_ions.append(ions)
+        sample_positions.append(positions)
+        sample_ion_charges.append(ion_charges)
         num_samples += 1
 
+    # Data for y: (49, 36) for each sample.
+    peak_offsets = np.cumsum([0] + [len(intensities) for intensities in sample_intensities])
+    if num_samples > 0:
+        ys = samples_to_y(np.concatenate(sample_intensities), np.concatenate(sample_ions),
+                          np.concatenate(sample_positions), np.concatenate(sample_ion_charges), peak_offsets)
+        ys = sparse_y(ys) if target_format == 'sparse' else list(ys)
+    else:
+        ys = []
+
+    # Construct the final data for the deep learning model.
+    dl_data = list(zip(Xs, X_metas, ys))
+
+    time_write_pkl = time.asctime(time.localtime(time.time()))
+    print(f"The time for writing the pkl file:{time_write_pkl}")
+    # write the data into a pickle file.
+    data_to_pkl(dl_data, pkl_file)
+
+    return num_samples
+
+
+# read the samples from a columnar folder, and write the data into a pkl file.
+def columnar_to_pkl(columnar_path, pkl_file, target_format='dense', sequence_format='tokens'):
+    """
+    Write the information of a columnar folder into a pkl file, the same data as csv_to_pkl;
+    :param columnar_path: the columnar folder to read;
+    :param pkl_file: the pkl file to write;
+    :param target_format: "dense" for y as an array (49, 36), "sparse" for y as (shape, flat indices, values);
+    :param sequence_format: "tokens" for X as the uint8 tokens (50,), "one_hot" for X as the one hot encoding (50, 26);
+    :return: the total number of samples for a pkl file.
+    """
+    training_data = TrainingData(columnar_path)
+    num_samples = len(training_data)
+    # Data for X: the tokens (50,), or glycopeptide one-hot encoding (50, 26) from the tokens.
+    tokens = np.array(training_data.tokens)
+    Xs = list(tokens if sequence_format == 'tokens' else tokens_to_one_hot(tokens))
+    # Data for X_meta: charge (1), should use np.array to generate an array, add [] for metas.
+    X_metas = [np.array([charge]) for charge in training_data.charges.astype(int).tolist()]
+    # Data for y: (49, 36), constructed for all the samples at once from the columns.
+    assert np.all(training_data.intensities > 0)
+    assert np.all(training_data.positions >= 1)
+    ys = samples_to_y(training_data.intensities, training_data.ions, training_data.positions,
+                      training_data.ion_charges, training_data.peak_offsets)
+    ys = sparse_y(ys) if target_format == 'sparse' else list(ys)
+
     # Construct the final data for the deep learning model.
     dl_data = list(zip(Xs, X_metas, ys))
 
@@ -163,12 +180,20 @@ def csv_to_pkl(csv_file, pkl_file):
 
 # Read a path for the input folder (CSV) and the top number of de novo sequencing,
 # then process the csv files into X, X_meta, and y, which are used in the deep learning model.
-def parse_csv_files(input_type, top_number, input_path):
+def parse_csv_files(input_type, top_number, input_path, input_format='csv', target_format='dense',
+                    sequence_format='tokens', resume='yes'):
     """
     Read the CSV files from the folder of "input_path", then converts them into the formats for the deep learning model
     :param input_type: A string for the folder of input type, such as "N" or "O";
     :param top_number: A value for the top number of de novo sequencing, such as "10";
-    :param input_path: A string for the input folder, such as "/data/Training-01-Human-285".
+    :param input_path: A string for the input folder, such as "/data/Training-01-Human-285";
+    :param input_format: A string for the format of the samples, "csv" for the "CSV" folder, or "columnar" for the
+                         columnar folders in the "COL" folder from parse_msp_to_csv.py;
+    :param target_format: A string for the format of y, "dense" or "sparse", the sparse y is densified by the trainer;
+    :param sequence_format: A string for the format of X, "tokens" or "one_hot", the tokens are looked up by the
+                            embedding of the model;
+    :param resume: A string, "yes" to skip the csv files whose pkl files are current by the manifest, "no" to convert
+                   all of them.
     :return: write all the PKL files to the "/data/Training-01-Human-285/N-GP-PKL";
              write all the denovo msp files to the "/data/Training-01-Human-285/N-GP-DENOVO-MSP".
     """
@@ -178,14 +203,19 @@ def parse_csv_files(input_type, top_number, input_path):
 
     top_number = int(top_number)
     assert top_number > 0 and top_number < 101, "Wrong Top Number!"
+    assert input_format in ('csv', 'columnar'), "Wrong Input Format!"
+    assert target_format in ('dense', 'sparse'), "Wrong Target Format!"
+    assert sequence_format in ('tokens', 'one_hot'), "Wrong Sequence Format!"
+    assert resume in ('yes', 'no'), "Wrong Resume!"
+    csv_folder = 'CSV' if input_format == 'csv' else 'COL'
 
     if input_type == 'N':
-        csv_name = 'N-GP-CSV-TOP-' + str(top_number)
+        csv_name = f'N-GP-{csv_folder}-TOP-' + str(top_number)
         csv_path = path_name / csv_name
         pkl_name = 'N-GP-PKL-TOP-' + str(top_number)
         pkl_path = path_name / pkl_name
     elif input_type == 'O':
-        csv_name = 'O-GP-CSV-TOP-' + str(top_number)
+        csv_name = f'O-GP-{csv_folder}-TOP-' + str(top_number)
         csv_path = path_name / csv_name
         pkl_name = 'O-GP-PKL-TOP-' + str(top_number)
         pkl_path = path_name / pkl_name
@@ -211,24 +241,43 @@ def parse_csv_files(input_type, top_number, input_path):
         print("The CSV folder does not exist!")
         return
 
+    # The manifest of the pkl files, keyed by the names of the csv files (or the columnar folders).
+    manifest = RunManifest(manifest_file(path_name, pkl_path.name),
+                           {'input_type': input_type, 'top_number': top_number, 'input_format': input_format,
+                            'target_format': target_format, 'sequence_format': sequence_format},
+                           code_version(*source_files), resume == 'yes')
+
     # Iterate all the files in the CSV folder
     for csv_file in csv_path.iterdir():
-        if not csv_file.is_file():
+        if input_format == 'columnar':
+            if not is_training_data(csv_file):
+                print("There is a file or folder which is not columnar!")
+                continue
+        elif not csv_file.is_file():
             print("There is a folder in the CSV folder!")
             continue
-        if csv_file.suffix != '.csv':
+        elif split_compression(csv_file)[0].suffix != '.csv':
            print("There is a file whose type is not csv!")
            continue
         time_read_csv = time.asctime(time.localtime(time.time()))
         print(f"The time for reading the csv file: {time_read_csv}")
 
-        # Get the filename without the extension, csv_file is the full "path/name" for the csv file.
-        csv_stem = csv_file.stem
+        # Get the filename without the extension (and the compression, such as ".gz"), csv_file is the full
+        # "path/name" for the csv file, which is decompressed by "pd.read_csv" by the suffix.
+        csv_stem = split_compression(csv_file)[0].stem if input_format == 'csv' else csv_file.name
         # Generate the name for a pkl file, and the whole path/file for it.
         pkl_name = f'{csv_stem}.pkl'
         pkl_path_file = pkl_path / pkl_name
 
-        num_samples_one_file = csv_to_pkl(csv_file, pkl_path_file)
+        if manifest.is_current(csv_file.name, [csv_file], [pkl_path_file]):
+            print(f"The pkl file is current: {pkl_name}")
+            num_samples_one_file = manifest.result(csv_file.name)
+        elif input_format == 'csv':
+            num_samples_one_file = csv_to_pkl(csv_file, pkl_path_file, target_format, sequence_format)
+            manifest.record(csv_file.name, [csv_file], [pkl_path_file], num_samples_one_file)
+        else:
+            num_samples_one_file = columnar_to_pkl(csv_file, pkl_path_file, target_format, sequence_format)
+            manifest.record(csv_file.name, [csv_file], [pkl_path_file], num_samples_one_file)
 
         total_num_files += 1
         total_num_samples += num_samples_one_file
@@ -245,16 +294,20 @@ def parse_csv_files(input_type, top_number, input_path):
 
 
 #  CLI (command line interface) for the input and output
-def user_interface(input_type, top_number, input_path):
+def user_interface(input_type, top_number, input_path, input_format, target_format, sequence_format, resume):
     """
     Get the folder of input path for the CSV and PKL files
     :param input_type: A string for the folder of input type;
     :param top_number: A value for the top number of de novo sequencing, such as "10";
-    :param input_path: A string for the folder of input path.
+    :param input_path: A string for the folder of input path;
+    :param input_format: A string for the format of the samples, "csv" or "columnar";
+    :param target_format: A string for the format of y, "dense" or "sparse";
+    :param sequence_format: A string for the format of X, "tokens" or "one_hot";
+    :param resume: A string, "yes" to skip the csv files whose pkl files are current, "no" to convert all of them.
     :return: Call read_csv for the input of CSV files, and convert them into PKL and deep learning CSV files.
     """
     #  python parse_csv_data.py -IT=N -TN=10 -IP=/data/Training-2021-D-Va--Human
-    parse_csv_files(input_type, top_number, input_path)
+    parse_csv_files(input_type, top_number, input_path, input_format, target_format, sequence_format, resume)
 
 
 """
@@ -262,6 +315,10 @@ Input parameters for the user interface:
     1   Input Glyco Peptide Type
     2   Input Top Number of De Novo Sequencing
     3   Input File Path Name
+    4   Input Format of the samples
+    5   Target Format of y
+    6   Sequence Format of X
+    7   Resume the run by the manifest
 """
 parser = argparse.ArgumentParser(description='Input parameters to run the script.')
 parser.add_argument('--InputType', '-IT',
@@ -273,6 +330,22 @@ parser.add_argument('--TopNumber', '-TN',
 parser.add_argument('--InputPath', '-IP',
                     help='Input Path parameter，required，no default. Such as /data/Training-01-Human-285.',
                     required=False)
+parser.add_argument('--InputFormat', '-IF',
+                    help='Input Format parameter，not required, has default. csv-the csv files from parse_msp_to_csv.py; '
+                         'columnar-the columnar folders from parse_msp_to_csv.py -OF=columnar.',
+                    required=False, default='csv')
+parser.add_argument('--TargetFormat', '-TF',
+                    help='Target Format parameter，not required, has default. dense-y as an array (49, 36); '
+                         'sparse-y as (shape, flat indices, values) of the non-zero cells, densified by the trainer.',
+                    required=False, default='dense')
+parser.add_argument('--SequenceFormat', '-SF',
+                    help='Sequence Format parameter，not required, has default. tokens-X as the uint8 tokens (50,), '
+                         'looked up by the embedding of the model; one_hot-X as the one hot encoding (50, 26).',
+                    required=False, default='tokens')
+parser.add_argument('--Resume', '-RS',
+                    help='Resume parameter，not required, has default. yes-skip the csv files whose pkl files are '
+                         'current by the manifest in the MANIFEST folder; no-convert all the csv files again.',
+                    required=False, default='yes')
 
 args = parser.parse_args()
 
@@ -280,13 +353,20 @@ args = parser.parse_args()
 if __name__ == "__main__":
     # Please run the script with the following input format in Linux/Unix/Mac such as:
     # python parse_csv_to_pkl.py -IT=N -TN=10 -IP=/data/Training-01-Human-285
+    # Read the columnar folders from "parse_msp_to_csv.py -OF=columnar":
+    # python parse_csv_to_pkl.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -IF=columnar
+    # Store the sparse y, which is about one tenth of the size:
+    # python parse_csv_to_pkl.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -TF=sparse
+    # Store X as the one hot encoding (50, 26) for the older readers:
+    # python parse_csv_to_pkl.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -SF=one_hot
     # Or Windows such as:
     # python parse_csv_to_pkl.py -IT=O -TN=10 -IP=D:\data\Training-01-Human-285
     # For huge files processed by several hours, should use "nohup" and "&" to run in the background. For example:
     # nohup python -u parse_csv_to_pkl.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 > Training-01-Human-285_PKL.out 2>&1 &
 
     try:
-        user_interface(args.InputType, args.TopNumber, args.InputPath)
+        user_interface(args.InputType, args.TopNumber, args.InputPath, args.InputFormat, args.TargetFormat,
+                       args.SequenceFormat, args.Resume)
     except Exception as e:
         print(e)
 
@@ -12,6 +12,7 @@ Modified on 24 February 2022 for combining 'I' and 'L' into 'X', to support the
 Modified on 28 February 2022 for handling the fixed modification for amino acid 'C', such as Carbamidomethyl[C].
 Modified on 04 March 2022, for the filters of large peptides and glycans.
 Modified on 08 April 2022, for the handling of N and O linked glycopeptides.
+Modified on 18 October 2026, read the spectra with the shared msp reader.
 ###################################################################################################################
 """
 __author__ = 'ZLiang'
@@ -21,6 +22,7 @@ import csv
 import re
 import stack_queue
 from de_novo_sequencing import DeNovoSequencing
+from msp_reader import read_msp
 import argparse
 from pathlib import Path
 import time
@@ -287,271 +289,149 @@ def msp_to_csv_denovo(msp_file, csv_file, denovo_file):
     num_samples = 0
     num_dl_spectra = 0
     num_spectra = 0
-    with open(msp_file) as spec_library_file, \
-            open(csv_file, "w", newline='') as csv_output_file, \
-            open(denovo_file, 'w') as denovo_msp_file:
+    # Initialization
+    denovor = DeNovoSequencing()
+    with open(csv_file, "w", newline='') as csv_output_file, open(denovo_file, 'w') as denovo_msp_file:
         writer_csv = csv.DictWriter(csv_output_file, fieldnames=csv_output_rows)
         writer_csv.writeheader()
 
-        while True:
-            current_chunk = []
-            read = False
-            for line in spec_library_file:
-                read = True
-                # Initialization
-                denovor = DeNovoSequencing()
-                # Use blank line to determine the start and end of each spectrum
-                if not line.strip():
-                    # End of chunk - start processing
-
-                    # Variables to write:
-                    # encoded_name
-                    # charge
-
-                    # Write the processed data into a csv file.
-                    precursor_mass_line = current_chunk[1]
-                    try:
-                        assert (precursor_mass_line.startswith("MW: "))
-                    except AssertionError:
-                        print("This chunk has some extra lines, or some deleted lines!")
-                        print(current_chunk)
-                        break
-
-                    num_spectra += 1
-                    # Check the 'MODIFICATIONS' in Comment, there are two modifications right now.
-                    # Example: MODIFICATIONS = 10, Carbamidomethyl[C];7, Oxidation[M];
-                    # Fixed modification: Carbamidomethyl[C]
-                    # Variable modification: Oxidation[M]
-                    # We ignore the variable modification and keep the fixed modification, or ignore all
-                    # spectra that have the variable modifications.
-                    comment, charge, retention_time, peptide, modifications, glycan, glycans = current_chunk[2].split()
-                    if modifications.find("Oxidation[M]") != -1:
-                        #print("Has variable modifications, ignore it!")
-                        #print(peptide)
-                        #print(modifications)
-                        break
-
-                    # Parse precursor charge, retention time, peptide backbone, glycan compositions
-                    # Only store the number of charge which is smaller than 10, ignore the '+'
-                    charge = charge.split("=")[1][:1]
-                    retention_time = retention_time.split("=")[1]
-                    peptide_name = peptide.split("=")[1]
-
-                    # Add filters to remove peptides with long sequences, whose lengths are
-                    # greater than the maximum thresholds.
-                    # For the lengths of peptides, 0.6% are greater than 32;
-                    if len(peptide_name) > max_peptide_length:
-                        #print("Peptide length is greater than 32, ignore it!")
-                        #print(peptide)
-                        break
-
-                    # Use 'X' to represent 'I' and 'L' that with the same masses,
-                    # save room for the fifth monosaccharide.
-                    peptide_name = peptide_name.replace('I', 'X')
-                    peptide_name = peptide_name.replace('L', 'X')
-                    # Assume the maximum length of peptide is 32, pad the left locations with "Z"
-                    left_peptide_length = max_peptide_length - len(peptide_name)
-                    peptide_pad_name = peptide_name + 'Z' * left_peptide_length
-                    # print(peptide_pad_name)
-                    glycan_compositions = glycan.split("=")[1]
-                    # Parse monosaccharides from glycan compositions: GLYCAN(H,N,F,A,G)=5,4,1,1,1
-                    # Should consider double-digit monosaccharides.
-                    monosaccharide_numbers = []
-                    if glycan_compositions == "nan":
-                        monosaccharide_numbers = ['0', '0', '0', '0', '0']
+        for spectrum in read_msp(msp_file):
+            num_spectra += 1
+            # Check the 'MODIFICATIONS' in Comment, there are two modifications right now.
+            # Example: MODIFICATIONS = 10, Carbamidomethyl[C];7, Oxidation[M];
+            # Fixed modification: Carbamidomethyl[C]
+            # Variable modification: Oxidation[M]
+            # We ignore the variable modification and keep the fixed modification, or ignore all
+            # spectra that have the variable modifications.
+            if spectrum.modifications.find("Oxidation[M]") != -1:
+                continue
+
+            # Add filters to remove peptides with long sequences, whose lengths are
+            # greater than the maximum thresholds.
+            # For the lengths of peptides, 0.6% are greater than 32;
+            if len(spectrum.peptide) > max_peptide_length:
+                continue
+
+            # Use 'X' to represent 'I' and 'L' that with the same masses,
+            # save room for the fifth monosaccharide.
+            peptide_name = spectrum.peptide.replace('I', 'X')
+            peptide_name = peptide_name.replace('L', 'X')
+            # Assume the maximum length of peptide is 32, pad the left locations with "Z"
+            left_peptide_length = max_peptide_length - len(peptide_name)
+            peptide_pad_name = peptide_name + 'Z' * left_peptide_length
+
+            # Add filter to remove glycans with long sequences, whose lengths are
+            # greater than the maximum threshold.
+            # For the lengths of glycans, 0.2% are greater than 18.
+            if spectrum.glycan_length > max_glycan_length:
+                continue
+
+            # Check the number of peaks, if is 0, ignore the following processing:
+            if len(spectrum) == 0:
+                print("This spectrum has no peaks!")
+                continue
+
+            m_over_z_s = []
+            intensities = []
+            ions = []
+            ion_charges = []
+            positions = []
+
+            glycan_intensity = {}
+            # Read MS2 ions
+            for mz, intensity, annotation in zip(spectrum.mz.tolist(), spectrum.intensity.tolist(),
+                                                 spectrum.annotations):
+                # For b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da, ignore it now
+                # For Y0+2, Y means "peptide backbone charge 2", would ignore it now
+                # For y12-N(1)+2, peptide fragment plus a glycan, also ignore it now.
+                if annotation[0] in backbone_ions and annotation[1] != '$' and '-' not in annotation:
+                    # b, or y ions in the peptide backbone
+                    ion_indicator_code = backbone_ions.index(annotation[0])
+                    position_search = re.search(position_regex, annotation)
+                    position = int(position_search.group("position"))
+                    # Consider padding empty amino acids to the length of 32
+                    if annotation[0] == 'y':
+                        position += left_peptide_length
+                    positions.append(position)
+                elif annotation[0] in glyco_ions and annotation[1] == '-':
+                    # Y ions: peptide backbone attached a fragmented glycan
+                    # Summarize ion intensities for each glycan composition
+                    # For GLYCAN(H,N,F,A,G)=5,4,1,0,0 such as
+                    # 1018.423	7877.0	Y-H(5)N(4)F(1)+3
+                    # First parse H(5)N(4)F(1), then call Stack to transfer to a dictionary
+                    # {'H': 5, 'N': 4, 'F': 1}, and reverse it to 5410 by adding intensity;
+                    # after that, use a dictionary such as {5410: 7877.0} to represent it;
+                    # by considering multiple charges, we add all of them together.
+                    glycan_ion = annotation.split("-")[1].split("+")[0]
+                    glycan_ion_dic = parse_glycan(glycan_ion)
+                    glycan_str = glycan_to_str(glycan_ion_dic)
+                    if glycan_str in glycan_intensity:
+                        sum_intensity = round(glycan_intensity[glycan_str] + intensity, 1)
                     else:
-                        monosaccharide_numbers = glycan_compositions.split(",")
-                    # Transfer the number of monosaccharides to glycan compositions such as "5410"
-                    monosaccharides = ''
-                    glycan_length = 0
-                    for i in range(len(monosaccharide_numbers)):
-                        number = int(monosaccharide_numbers[i])
-                        for _ in range(number):
-                            monosaccharides += monosaccharide_list[i]
-                        glycan_length += number
-
-                    # Add filter to remove glycans with long sequences, whose lengths are
-                    # greater than the maximum threshold.
-                    # For the lengths of glycans, 0.2% are greater than 18.
-                    if glycan_length > max_glycan_length:
-                        #print("Glycan length is greater than 18, ignore it!")
-                        #print(peptide)
-                        #print(glycan_compositions)
-                        break
-
-                    precursor_mass = float(precursor_mass_line.split()[1])
-
-                    # Check the line of "Num Peaks", if is 0, ignore the following processing:
-                    number_peaks_line = current_chunk[3]
-                    try:
-                        assert (number_peaks_line.split(":")[1].strip() != '0')
-                    except AssertionError:
-                        print("This spectrum has no peaks!")
-                        continue
-
-                    m_over_z_s = []
-                    intensities = []
-                    ions = []
-                    ion_charges = []
-                    positions = []
-
-                    glycan_intensity = {}
-                    # Read MS2 ions
-                    for data in current_chunk[4:]:
-                        mz, intensity, annotation = data.split()
-                        # For b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da, ignore it now
-                        # For Y0+2, Y means "peptide backbone charge 2", would ignore it now
-                        # For y12-N(1)+2, peptide fragment plus a glycan, also ignore it now.
-                        if annotation[0] in backbone_ions and annotation[1] != '$' and '-' not in annotation:
-                            # b, or y ions in the peptide backbone
-                            ion_indicator_code = backbone_ions.index(annotation[0])
-                            position_search = re.search(position_regex, annotation)
-                            position = int(position_search.group("position"))
-                            # Consider padding empty amino acids to the length of 32
-                            if annotation[0] == 'y':
-                                position += left_peptide_length
-                            positions.append(position)
-                        elif annotation[0] in glyco_ions and annotation[1] == '-':
-                            # Y ions: peptide backbone attached a fragmented glycan
-                            # Summarize ion intensities for each glycan composition
-                            # For GLYCAN(H,N,F,A,G)=5,4,1,0,0 such as
-                            # 1018.423	7877.0	Y-H(5)N(4)F(1)+3
-                            # First parse H(5)N(4)F(1), then call Stack to transfer to a dictionary
-                            # {'H': 5, 'N': 4, 'F': 1}, and reverse it to 5410 by adding intensity;
-                            # after that, use a dictionary such as {5410: 7877.0} to represent it;
-                            # by considering multiple charges, we add all of them together.
-                            glycan_ion = annotation.split("-")[1].split("+")[0]
-                            glycan_ion_dic = parse_glycan(glycan_ion)
-                            # print(glycan_ion_dic)
-                            glycan_str = glycan_to_str(glycan_ion_dic)
-                            # print(glycan_str)
-                            if glycan_str in glycan_intensity:
-                                sum_intensity = round(float(glycan_intensity[glycan_str]) + float(intensity), 1)
-                            else:
-                                sum_intensity = round(float(intensity), 1)
-                            # if sum_intensity > float(intensity):
-                            # print(intensity)
-                            # print(sum_intensity)
-                            glycan_intensity[glycan_str] = round(float(sum_intensity), 1)
-                            # print(glycan_intensity)
-                            # Position is counted as the total number of glycan ions, plus peptide maximum length 32
-                            ion_indicator_code = 2
-                            position = denovor.count_total(glycan_str) + max_peptide_length
-                            positions.append(position)
-                        #elif annotation[0] in precursor_ions:
-                            # M-ions: intact glycopeptide (peptide attached the whole glycan)
-                            # MW: 1030.0249
-                            # Comment: CHARGE=5+	RTINSECONDS=5680.6674	PEPTIDE=SVQEIQATFFYFTPJK
-                            # MODIFICATIONS=nan	GLYCAN(H,N,F,A,G)=7,6,0,3,0 	GLYCANS=H(7)N(6)A(3)
-                            # 1030.023	1885.5	M+5
-                        #    glycan_ion_dic = parse_glycan(glycans)
-                            # print(glycan_ion_dic)
-                        #    glycan_str = glycan_to_str(glycan_ion_dic)
-                            # print("M ions:", glycan_str)
-                        #    if glycan_str in glycan_intensity:
-                        #        sum_intensity = round(float(glycan_intensity[glycan_str]) + float(intensity), 1)
-                        #    else:
-                        #        sum_intensity = round(float(intensity), 1)
-                            # if sum_intensity > float(intensity):
-                            # print(intensity)
-                            # print(sum_intensity)
-                        #    glycan_intensity[glycan_str] = round(float(sum_intensity), 1)
-                            # print(glycan_intensity)
-                            # Position is counted as the total number of glycan ions, plus peptide maximum length 32
-                        #    ion_indicator_code = 2
-                        #    position = denovor.count_total(glycan_str) + max_peptide_length
-                            # print("M ions position:", position)
-                        #    positions.append(position)
-                        else:
-                            # Ignore the position, use 32 + 18 to replace it
-                            # ion_indicator_code = 3
-                            # positions.append(50)
-                            continue
-                        charge_search = re.search(charge_regex, annotation)
-                        ion_charge = int(charge_search.group("charge"))
-
-                        m_over_z_s.append(float(mz))
-                        intensities.append(round(float(intensity), 1))
-                        ions.append(ion_indicator_code)
-                        ion_charges.append(ion_charge)
-
-                    glycan_sequence = glycans.split("=")[1]
-                    glycan_dic = parse_glycan(glycan_sequence)
-                    glycan_str = glycan_to_str(glycan_dic)
-                    # Call de novo sequencing to generate linearized glycan string
-                    glycan_deno_lists = denovor.de_novo(glycan_str, glycan_intensity)
-                    """
-                    # Output the glycans with double-digit monosaccharides.                    
-                    for i in range(len(monosaccharide_numbers)):
-                        # for two-digit monosaccharide
-                        if int(monosaccharide_numbers[i]) > 9:
-                            print(peptide)
-                            print(modifications)
-                            print("Glycan=" + monosaccharides)
-                            print("Glycan String=" + glycan_str)
-                            print(glycan_intensity)
-                            print("Sorted denovo candidates by intensity:")
-                            print(glycan_deno_lists)
-                    # for the fixed modifications: "Carbamidomethyl[C]"
-                    if modifications.find("Carbamidomethyl[C]") != -1:
-                        print(peptide)
-                        print(modifications)
-                        print("Glycan=" + monosaccharides)
-                        print("Glycan String=" + glycan_str)
-                        print(glycan_intensity)
-                        print("Sorted denovo candidates by intensity:")
-                        print(glycan_deno_lists)
-                    """
-                    # Assume the maximum length of glycan is max_glycan_length, pad the left locations with "Z"
-                    left_glycan_length = max_glycan_length - len(monosaccharides)
-                    # The number of spectra for deep learning could have several denovo results for the samples
-                    num_dl_spectra += 1
-                    # Consider top 10 de novo sequence candidates if the total number greater than 10
-                    top_ten_candidates = min(len(glycan_deno_lists), 10)
-                    for i in range(top_ten_candidates):
-                        # glycan_deno_lists[i] is a tuple like ('NNHHNHHANHNHAA', 954586.3)
-                        glycan_de_novo_sequence = glycan_deno_lists[i][0]
-                        for monosaccharide, monosaccharide_code in monosaccharide_component_replacements.items():
-                            # Replace monosaccharide with our special codes
-                            glycan_de_novo_sequence = glycan_de_novo_sequence.replace(monosaccharide,
-                                                                                      monosaccharide_code)
-                        glycan_pad_name = glycan_de_novo_sequence + 'Z' * left_glycan_length
-                        glycopeptide_name = peptide_pad_name + glycan_pad_name
-                        # print(glycopeptide_name)
-                        glycopeptide_one_hot_encoded = one_hot_encode(glycopeptide_name,
-                                                                      amino_acid_monosaccharide_zero_codes)
-                        row_dictionary = {
-                            'glycopeptide': glycopeptide_one_hot_encoded,
-                            'charge': charge,
-                            'precursor_mass': precursor_mass,
-                            'retention_time': retention_time,
-                            'mzs': m_over_z_s,
-                            'intensities': intensities,
-                            'ions': ions,
-                            'positions': positions,
-                            'ion_charges': ion_charges,
-                        }
-                        assert len(m_over_z_s) == len(intensities) == len(ions) == len(positions) == len(ion_charges)
-                        writer_csv.writerow(row_dictionary)
-                        num_samples += 1
-
-                    # Write the msp file and denovo results into a denovo msp file.
-                    # Here the denovo msp file do not contain variable modifications.
-                    denovo_msp_file.write(current_chunk[0] + '\n')
-                    denovo_msp_file.write(current_chunk[1] + '\n')
-                    denovo_msp_file.write(current_chunk[2] + '\t' + 'DENOVO=' + str(glycan_deno_lists) + '\n')
-                    denovo_msp_file.write(current_chunk[3] + '\n')
-                    for data in current_chunk[4:]:
-                        denovo_msp_file.write(data + '\n')
-                    denovo_msp_file.write('\n')
-
-                    # Should use break here, to successfully end the process of one chunk, and start a new one.
-                    break
+                        sum_intensity = round(intensity, 1)
+                    glycan_intensity[glycan_str] = sum_intensity
+                    # Position is counted as the total number of glycan ions, plus peptide maximum length 32
+                    ion_indicator_code = 2
+                    position = denovor.count_total(glycan_str) + max_peptide_length
+                    positions.append(position)
                 else:
-                    current_chunk.append(line.strip())
-            # If there is no new data, end the reading process.
-            if not read:
-                break
+                    # Ignore the M-ions: intact glycopeptide (peptide attached the whole glycan)
+                    continue
+                charge_search = re.search(charge_regex, annotation)
+                ion_charge = int(charge_search.group("charge"))
+
+                m_over_z_s.append(mz)
+                intensities.append(round(intensity, 1))
+                ions.append(ion_indicator_code)
+                ion_charges.append(ion_charge)
+
+            glycan_dic = parse_glycan(spectrum.glycans)
+            glycan_str = glycan_to_str(glycan_dic)
+            # Call de novo sequencing to generate linearized glycan string
+            glycan_deno_lists = denovor.de_novo(glycan_str, glycan_intensity)
+            # Assume the maximum length of glycan is max_glycan_length, pad the left locations with "Z"
+            left_glycan_length = max_glycan_length - spectrum.glycan_length
+            # The number of spectra for deep learning could have several denovo results for the samples
+            num_dl_spectra += 1
+            # Consider top 10 de novo sequence candidates if the total number greater than 10
+            top_ten_candidates = min(len(glycan_deno_lists), 10)
+            for i in range(top_ten_candidates):
+                # glycan_deno_lists[i] is a tuple like ('NNHHNHHANHNHAA', 954586.3)
+                glycan_de_novo_sequence = glycan_deno_lists[i][0]
+                for monosaccharide, monosaccharide_code in monosaccharide_component_replacements.items():
+                    # Replace monosaccharide with our special codes
+                    glycan_de_novo_sequence = glycan_de_novo_sequence.replace(monosaccharide,
+                                                                              monosaccharide_code)
+                glycan_pad_name = glycan_de_novo_sequence + 'Z' * left_glycan_length
+                glycopeptide_name = peptide_pad_name + glycan_pad_name
+                glycopeptide_one_hot_encoded = one_hot_encode(glycopeptide_name,
+                                                              amino_acid_monosaccharide_zero_codes)
+                row_dictionary = {
+                    'glycopeptide': glycopeptide_one_hot_encoded,
+                    'charge': spectrum.charge,
+                    'precursor_mass': spectrum.precursor_mass,
+                    'retention_time': spectrum.retention_time_text,
+                    'mzs': m_over_z_s,
+                    'intensities': intensities,
+                    'ions': ions,
+                    'positions': positions,
+                    'ion_charges': ion_charges,
+                }
+                assert len(m_over_z_s) == len(intensities) == len(ions) == len(positions) == len(ion_charges)
+                writer_csv.writerow(row_dictionary)
+                num_samples += 1
+
+            # Write the msp file and denovo results into a denovo msp file.
+            # Here the denovo msp file do not contain variable modifications.
+            name_line, precursor_mass_line, comment_line, number_peaks_line = spectrum.header_lines
+            denovo_msp_file.write(name_line + '\n')
+            denovo_msp_file.write(precursor_mass_line + '\n')
+            denovo_msp_file.write(comment_line + '\t' + 'DENOVO=' + str(glycan_deno_lists) + '\n')
+            denovo_msp_file.write(number_peaks_line + '\n')
+            for data in spectrum.peak_lines():
+                denovo_msp_file.write(data + '\n')
+            denovo_msp_file.write('\n')
+
     print(f"The total number of spectra is: {num_spectra}")
     print(f"The total number of spectra for the deep learning is: {num_dl_spectra}")
     print(f"The total number of samples is: {num_samples}")
@@ -15,6 +15,15 @@ Modified on 08 April 2022, for the handling of N and O linked glycopeptides.
 Modified on 21 April 2022, for only outputting csv files with only one denovo candidate.
 Modified on 26 April 2022, for outputting csv files with top N denovo candidates for CLI.
 Modified on 11 August 2022, filter out those ions with charge > 4.
+Modified on 18 October 2026, read the spectra with the shared msp reader, and parse the files in parallel.
+Modified on 18 October 2026, write the samples into a columnar format as an option of the csv files.
+Modified on 18 October 2026, write the samples into the shards of (X, X_meta, y) for the training directly.
+Modified on 18 October 2026, encode and decode the one hot encoding by the look-up tables of the tokens.
+Modified on 18 October 2026, read the compressed msp files, and compress the csv and denovo files the same way.
+Modified on 18 October 2026, skip the msp files whose outputs are current by the manifest, and resume the runs.
+Modified on 18 October 2026, search the de novo candidates by a beam of the top number, as an option.
+Modified on 18 October 2026, reuse the de novo results and ladders of the replicate spectra by a cache in each process.
+Modified on 18 October 2026, bridge the missing Y-ions in de novo by a maximum gap, as an option.
 ###################################################################################################################
 """
 __author__ = 'ZLiang'
@@ -24,11 +33,24 @@ import csv
 import re
 from stack_queue import Stack
 from de_novo_sequencing import DeNovoSequencing
+from msp_reader import read_msp, split_msp_ranges
+from compressed_io import open_file, split_compression
+from parallel_workers import run_tasks, iter_tasks, timed_call
+from run_manifest import RunManifest, code_version, manifest_file
+from training_data import TrainingDataWriter, merge_training_data, ShardWriter, merge_shards, shard_files, \
+    code_tokens, decode_tokens
+import numpy as np
 import argparse
 from pathlib import Path
+import shutil
 import time
 
 
+# The source files for the version of the code in the manifest, the outputs are written again if any is changed.
+source_files = ('parse_msp_to_csv.py', 'de_novo_sequencing.py', 'stack_queue.py', 'msp_reader.py', 'training_data.py',
+                'compressed_io.py')
+
+
 """
 The following is a sample spectrum for an msp file for five monosaccharides.
 
@@ -67,6 +89,11 @@ monosaccharide_list = "HNFAG"
 MAX_PEPTIDE_LENGTH = 32
 MAX_GLYCAN_LENGTH = 18
 
+# The de novo results and ladders of the latest 1000 glycan compositions are kept, since the replicate spectra of a
+# glycopeptide are close in the msp files. The searcher is kept for all the files processed by a worker process.
+DE_NOVO_CACHE_SIZE = 1000
+de_novo_searcher = DeNovoSequencing(DE_NOVO_CACHE_SIZE)
+
 # Headers for the csv output
 csv_output_rows = [
     'glycopeptide',
@@ -112,17 +139,64 @@ def one_hot_encode(values, code):
         ...,
         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1]]
     """
-    result = []
-    for letter in values:
-        letter_encoding = [1 if code_letter == letter else 0 for code_letter in code]
-        try:
-            assert (sum(letter_encoding) == 1)
-        except AssertionError:
-            print("One hot encoding failed - unexpected letter in this name")
-            print(values)
-            raise
-        result.append(letter_encoding)
-    return result
+    # Look up the token of each letter, then expand the tokens by the rows of an identity matrix.
+    tokens = code_tokens(values, code)
+    try:
+        assert not np.any(tokens == 255)
+    except AssertionError:
+        print("One hot encoding failed - unexpected letter in this name")
+        print(values)
+        raise
+    return np.eye(len(code), dtype=int)[tokens].tolist()
+
+# A csv writer which writes the glycopeptide name as the one hot encoding.
+class OneHotDictWriter(csv.DictWriter):
+    """
+    Write the samples into a csv file, the lists such as the one hot encoding are written as strings in the cells.
+    """
+    def __init__(self, csv_file):
+        """
+        :param csv_file: the csv file to write, it is compressed by the suffix, such as "sample.csv.gz".
+        """
+        self.csv_output_file = open_file(csv_file, "w", newline='')
+        super().__init__(self.csv_output_file, fieldnames=csv_output_rows)
+
+    def writeheader(self):
+        # The header is written as it is, without the one hot encoding.
+        return super().writerow(dict(zip(self.fieldnames, self.fieldnames)))
+
+    def writerow(self, row_dictionary):
+        """
+        :param row_dictionary: A dictionary of a sample, 'glycopeptide' is the name with the length of 50.
+        """
+        row_dictionary = dict(row_dictionary)
+        row_dictionary['glycopeptide'] = one_hot_encode(row_dictionary['glycopeptide'],
+                                                        amino_acid_monosaccharide_zero_codes)
+        return super().writerow(row_dictionary)
+
+    def close(self):
+        self.csv_output_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_sample_writer(output_format, sample_file):
+    """
+    :param output_format: "csv" for a csv file, "columnar" for a columnar folder of npy files,
+                          "shard" for the shards of (X, X_meta, y);
+    :param sample_file: the csv file, the columnar folder, or the prefix of the shards to write;
+    :return: a writer with "writerow" for the samples.
+    """
+    if output_format == 'csv':
+        return OneHotDictWriter(sample_file)
+    if output_format == 'shard':
+        return ShardWriter(sample_file)
+    return TrainingDataWriter(sample_file)
+
 
 # Transfer one hot encodings back into the sequence
 def reverse_one_hot_encode(vectors, code):
@@ -136,11 +210,13 @@ def reverse_one_hot_encode(vectors, code):
     :return: a string converted from the vectors, by using the code, such as
         "VVXHPJYSQVDXGXXKZZZZZZZZZZZZZZZZ@@!!@!@!!@!@!$ZZZZ".
     """
-    letters = []
-    for vector in vectors:
-        i = vector.index(1)  # get the index of the item which is 1
-        letters.append(code[i])
-    return "".join(letters)
+    if len(vectors) == 0:
+        return ""
+    # get the index of the item which is 1 for all the vectors at once
+    hits = np.asarray(vectors) == 1
+    if not hits.any(axis=1).all():
+        raise ValueError("1 is not in list")
+    return decode_tokens(hits.argmax(axis=1), code)
 
 # reverse_one_hot_encode(one_hot_encode(values, code), code) should be the values.
 
@@ -276,328 +352,326 @@ def create_annoying_string(row_data, row_id):
     """
 
 
-# read the processed information from a msp file, and write the data into a csv file and a denovo msp file.
-def msp_to_csv_denovo(top_number, msp_file, csv_file, denovo_file):
+# Process the spectra from a msp file, and write the data into a csv file and a denovo msp file.
+def write_csv_denovo(top_number, spectra, writer_csv, denovo_msp_file, de_novo_mode='exhaustive', max_gap=1):
     """
-    Write the information of input_csv into the files of csv and denovo msp;
+    Write the information of the spectra into the files of csv and denovo msp;
     :param top_number: the top number of denovo results;
-    :param msp_file: the msp file to read;
-    :param csv_file: the csv file to write;
-    :param denovo_file: the denovo msp file to write.
-    :return: the total number of samples for a csv file.
+    :param spectra: the spectra to process, such as read_msp(msp_file);
+    :param writer_csv: the writer of the samples, a csv writer or a columnar writer;
+    :param denovo_msp_file: the denovo msp file to write;
+    :param de_novo_mode: "exhaustive" for all the de novo candidates, "beam" for a beam of the top number,
+                         "gap" for a beam of the top number which bridges the missing Y-ions;
+    :param max_gap: the number of missing Y-ion levels to bridge for the "gap" mode.
+    :return: the total number of spectra, spectra for the deep learning, samples, and the hits of the de novo cache
+             for the results and the ladders.
     """
     num_samples = 0
     num_dl_spectra = 0
     num_spectra = 0
-    with open(msp_file) as spec_library_file, \
-            open(csv_file, "w", newline='') as csv_output_file, \
-            open(denovo_file, 'w') as denovo_msp_file:
-        writer_csv = csv.DictWriter(csv_output_file, fieldnames=csv_output_rows)
-        writer_csv.writeheader()
-
-        while True:
-            current_chunk = []
-            read = False
-            for line in spec_library_file:
-                read = True
-                # Initialization
-                denovor = DeNovoSequencing()
-                # Use blank line to determine the start and end of each spectrum
-                if not line.strip():
-                    # End of chunk - start processing
-
-                    # Variables to write:
-                    # encoded_name
-                    # charge
-
-                    # Write the processed data into a csv file.
-                    precursor_mass_line = current_chunk[1]
-                    try:
-                        assert (precursor_mass_line.startswith("MW: "))
-                    except AssertionError:
-                        print("This chunk has some extra lines, or some deleted lines!")
-                        print(current_chunk)
-                        break
-
-                    num_spectra += 1
-                    # Check the 'MODIFICATIONS' in Comment, there are two modifications right now.
-                    # Example: MODIFICATIONS = 10, Carbamidomethyl[C];7, Oxidation[M];
-                    # Fixed modification: Carbamidomethyl[C]
-                    # Variable modification: Oxidation[M]
-                    # We ignore the variable modification and keep the fixed modification, or ignore all
-                    # spectra that have the variable modifications.
-                    comment, charge, retention_time, peptide, modifications, glycan, glycans = current_chunk[2].split()
-                    if modifications.find("Oxidation[M]") != -1:
-                        #print("Has variable modifications, ignore it!")
-                        #print(peptide)
-                        #print(modifications)
-                        break
-
-                    # Parse precursor charge, retention time, peptide backbone, glycan compositions
-                    # Only store the number of charge which is smaller than 10, ignore the '+'
-                    charge = charge.split("=")[1][:1]
-                    retention_time = retention_time.split("=")[1]
-                    peptide_name = peptide.split("=")[1]
-
-                    # Add filters to remove peptides with long sequences, whose lengths are
-                    # greater than the maximum thresholds.
-                    # For the lengths of peptides, 0.6% are greater than 32;
-                    if len(peptide_name) > MAX_PEPTIDE_LENGTH:
-                        #print("Peptide length is greater than 32, ignore it!")
-                        #print(peptide)
-                        break
-
-                    # Use 'X' to represent 'I' and 'L' that with the same masses,
-                    # save room for the fifth monosaccharide.
-                    peptide_name = peptide_name.replace('I', 'X')
-                    peptide_name = peptide_name.replace('L', 'X')
-                    # Assume the maximum length of peptide is 32, pad the left locations with "Z"
-                    left_peptide_length = MAX_PEPTIDE_LENGTH - len(peptide_name)
-                    peptide_pad_name = peptide_name + 'Z' * left_peptide_length
-                    # print(peptide_pad_name)
-                    glycan_compositions = glycan.split("=")[1]
-                    # Parse monosaccharides from glycan compositions: GLYCAN(H,N,F,A,G)=5,4,1,1,1
-                    # Should consider double-digit monosaccharides.
-                    monosaccharide_numbers = []
-                    if glycan_compositions == "nan":
-                        monosaccharide_numbers = ['0', '0', '0', '0', '0']
-                    else:
-                        monosaccharide_numbers = glycan_compositions.split(",")
-                    # Transfer the number of monosaccharides to glycan compositions such as "5410"
-                    monosaccharides = ''
-                    glycan_length = 0
-                    for i in range(len(monosaccharide_numbers)):
-                        number = int(monosaccharide_numbers[i])
-                        for _ in range(number):
-                            monosaccharides += monosaccharide_list[i]
-                        glycan_length += number
-
-                    # Add filter to remove glycans with long sequences, whose lengths are
-                    # greater than the maximum threshold.
-                    # For the lengths of glycans, 0.2% are greater than 18.
-                    if glycan_length > MAX_GLYCAN_LENGTH:
-                        #print("Glycan length is greater than 18, ignore it!")
-                        #print(peptide)
-                        #print(glycan_compositions)
-                        break
-
-                    precursor_mass = float(precursor_mass_line.split()[1])
-
-                    # Check the line of "Num Peaks", if is 0, ignore the following processing:
-                    number_peaks_line = current_chunk[3]
-                    try:
-                        assert (number_peaks_line.split(":")[1].strip() != '0')
-                    except AssertionError:
-                        print("This spectrum has no peaks!")
-                        continue
-
-                    m_over_z_s = []
-                    intensities = []
-                    ions = []
-                    ion_charges = []
-                    positions = []
-
-                    glycan_intensity = {}
-                    # Read MS2 ions
-                    for data in current_chunk[4:]:
-                        mz, intensity, annotation = data.split()
-                        # Only consider maximum charge of 4 now.
-                        charge_search = re.search(charge_regex, annotation)
-                        ion_charge = int(charge_search.group("charge"))
-                        # ignore the ions with charge 5, 6
-                        if ion_charge > 4:
-                            continue
-                        # For b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da, ignore it now
-                        # For Y0+2, Y means "peptide backbone charge 2", would ignore it now
-                        # For y12-N(1)+2, peptide fragment plus a glycan, also ignore it now.
-                        if annotation[0] in backbone_ions:
-                            # b, or y ions in the peptide backbone
-                            # b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da
-                            # y12-N(1)+2, peptide fragment plus a glycan
-                            # For b ions: b3 is 0, b$3 is 1, b3-N(1) is 2,
-                            # For y ions: y3 is 3, y$3 is 4, y3-N(1) is 5.
-                            ion_indicator = backbone_ions.index(annotation[0])
-                            if '$' in annotation:
-                                ion_indicator_code = ion_indicator * 3 + 1
-                                annotation = annotation.replace('$', '')
-                            elif '-' in annotation:
-                                ion_indicator_code = ion_indicator * 3 + 2
-                            else:
-                                ion_indicator_code = ion_indicator * 3
-                            position_search = re.search(position_regex, annotation)
-                            position = int(position_search.group("position"))
-                            # Consider padding empty amino acids to the length of 32
-                            if annotation[0] == 'y':
-                                position += left_peptide_length
-                        elif annotation[0] in glyco_ions:
-                            # intact charged peptide without glycan
-                            # Y0+2=1113.098
-                            if annotation[1] == '0':
-                                ion_indicator_code = 6
-                                position = MAX_PEPTIDE_LENGTH
-                            # intact charged peptide with cross ring fragment of a HexNAc
-                            # Y$+2=1154.617
-                            elif annotation[1] == '$':
-                                ion_indicator_code = 7
-                                position = MAX_PEPTIDE_LENGTH
-                            # Y ions: peptide backbone attached a fragmented glycan
-                            # Summarize ion intensities for each glycan composition
-                            # For GLYCAN(H,N,F,A,G)=5,4,1,0,0 such as
-                            # 1018.423	7877.0	Y-H(5)N(4)F(1)+3
-                            # First parse H(5)N(4)F(1), then call Stack to transfer to a dictionary
-                            # {'H': 5, 'N': 4, 'F': 1}, and reverse it to 5410 by adding intensity;
-                            # after that, use a dictionary such as {5410: 7877.0} to represent it;
-                            # by considering multiple charges, we add all of them together.
-                            # annotation[1] == '-':
-                            else:
-                                glycan_ion = annotation.split("-")[1].split("+")[0]
-                                glycan_ion_dic = parse_glycan(glycan_ion)
-                                # print(glycan_ion_dic)
-                                glycan_str = glycan_to_str(glycan_ion_dic)
-                                # print(glycan_str)
-                                if glycan_str in glycan_intensity:
-                                    sum_intensity = round(float(glycan_intensity[glycan_str]) + float(intensity), 1)
-                                else:
-                                    sum_intensity = round(float(intensity), 1)
-                                # if sum_intensity > float(intensity):
-                                # print(intensity)
-                                # print(sum_intensity)
-                                glycan_intensity[glycan_str] = round(float(sum_intensity), 1)
-                                #print(glycan_intensity)
-                                # Position is counted as the total number of glycan ions, plus peptide maximum length 32
-                                ion_indicator_code = 8
-                                position = denovor.count_total(glycan_str) + MAX_PEPTIDE_LENGTH
-                        #elif annotation[0] in precursor_ions:
-                            # M-ions: intact glycopeptide (peptide attached the whole glycan)
-                            # MW: 1030.0249
-                            # Comment: CHARGE=5+	RTINSECONDS=5680.6674	PEPTIDE=SVQEIQATFFYFTPJK
-                            # MODIFICATIONS=nan	GLYCAN(H,N,F,A,G)=7,6,0,3,0 	GLYCANS=H(7)N(6)A(3)
-                            # 1030.023	1885.5	M+5
-                            #glycan_ion_dic = parse_glycan(glycans)
-                            # print(glycan_ion_dic)
-                            #glycan_str = glycan_to_str(glycan_ion_dic)
-                            # print("M ions:", glycan_str)
-                            #if glycan_str in glycan_intensity:
-                                #sum_intensity = round(float(glycan_intensity[glycan_str]) + float(intensity), 1)
-                            #else:
-                                #sum_intensity = round(float(intensity), 1)
-                            # if sum_intensity > float(intensity):
-                            # print(intensity)
-                            # print(sum_intensity)
-                        #    glycan_intensity[glycan_str] = round(float(sum_intensity), 1)
-                            # print(glycan_intensity)
-                            # Position is counted as the total number of glycan ions, plus peptide maximum length 32
-                        #    ion_indicator_code = 2
-                        #    position = denovor.count_total(glycan_str) + max_peptide_length
-                            # print("M ions position:", position)
-                        #    positions.append(position)
-                        else:
-                            # Ignore the position, use 32 + 18 to replace it
-                            # ion_indicator_code = 3
-                            # positions.append(50)
-                            continue
-
-                        positions.append(position)
-                        m_over_z_s.append(float(mz))
-                        intensities.append(round(float(intensity), 1))
-                        ions.append(ion_indicator_code)
-                        ion_charges.append(ion_charge)
-
-                    glycan_sequence = glycans.split("=")[1]
-                    glycan_dic = parse_glycan(glycan_sequence)
-                    glycan_str = glycan_to_str(glycan_dic)
-                    # Call de novo sequencing to generate linearized glycan string
-                    glycan_deno_lists = denovor.de_novo(glycan_str, glycan_intensity)
-                    """
-                    # Output the glycans with double-digit monosaccharides.
-                    for i in range(len(monosaccharide_numbers)):
-                        # for two-digit monosaccharide
-                        if int(monosaccharide_numbers[i]) > 9:
-                            print(peptide)
-                            print(modifications)
-                            print("Glycan=" + monosaccharides)
-                            print("Glycan String=" + glycan_str)
-                            print(glycan_intensity)
-                            print("Sorted denovo candidates by intensity:")
-                            print(glycan_deno_lists)
-                    # for the fixed modifications: "Carbamidomethyl[C]"
-                    if modifications.find("Carbamidomethyl[C]") != -1:
-                        print(peptide)
-                        print(modifications)
-                        print("Glycan=" + monosaccharides)
-                        print("Glycan String=" + glycan_str)
-                        print(glycan_intensity)
-                        print("Sorted denovo candidates by intensity:")
-                        print(glycan_deno_lists)
-                    """
-                    # Assume the maximum length of glycan is max_glycan_length, pad the left locations with "Z"
-                    left_glycan_length = MAX_GLYCAN_LENGTH - len(monosaccharides)
-                    # The number of spectra for deep learning could have several denovo results for the samples
-                    num_dl_spectra += 1
-                    # Consider top 10 de novo sequence candidates if the total number greater than 10
-                    # top_ten_candidates = min(len(glycan_deno_lists), 10)
-                    top_one_candidate = min(len(glycan_deno_lists), top_number)
-                    for i in range(top_one_candidate):
-                        # glycan_deno_lists[i] is a tuple like ('NNHHNHHANHNHAA', 954586.3)
-                        glycan_de_novo_sequence = glycan_deno_lists[i][0]
-                        for monosaccharide, monosaccharide_code in monosaccharide_component_replacements.items():
-                            # Replace monosaccharide with our special codes
-                            glycan_de_novo_sequence = glycan_de_novo_sequence.replace(monosaccharide,
-                                                                                      monosaccharide_code)
-                        glycan_pad_name = glycan_de_novo_sequence + 'Z' * left_glycan_length
-                        glycopeptide_name = peptide_pad_name + glycan_pad_name
-                        # print(glycopeptide_name)
-                        glycopeptide_one_hot_encoded = one_hot_encode(glycopeptide_name,
-                                                                      amino_acid_monosaccharide_zero_codes)
-                        row_dictionary = {
-                            'glycopeptide': glycopeptide_one_hot_encoded,
-                            'charge': charge,
-                            'precursor_mass': precursor_mass,
-                            'retention_time': retention_time,
-                            'mzs': m_over_z_s,
-                            'intensities': intensities,
-                            'ions': ions,
-                            'positions': positions,
-                            'ion_charges': ion_charges,
-                        }
-                        assert len(m_over_z_s) == len(intensities) == len(ions) == len(positions) == len(ion_charges)
-                        writer_csv.writerow(row_dictionary)
-                        num_samples += 1
-
-                    # Write the msp file and denovo results into a denovo msp file.
-                    # Here the denovo msp file do not contain variable modifications.
-                    denovo_msp_file.write(current_chunk[0] + '\n')
-                    denovo_msp_file.write(current_chunk[1] + '\n')
-                    denovo_msp_file.write(current_chunk[2] + '\t' + 'DENOVO=' + str(glycan_deno_lists) + '\n')
-                    denovo_msp_file.write(current_chunk[3] + '\n')
-                    for data in current_chunk[4:]:
-                        denovo_msp_file.write(data + '\n')
-                    denovo_msp_file.write('\n')
-
-                    # Should use break here, to successfully end the process of one chunk, and start a new one.
-                    break
+    # Initialization
+    denovor = de_novo_searcher
+    result_hits = denovor.result_cache.hits
+    ladder_hits = denovor.ladder_cache.hits
+    # The beam keeps the best partial ladders of each composition, the top results are the same as the exhaustive one.
+    # The gap also keeps a beam of the top number, so the paths bridging the missing Y-ions could not blow up.
+    beam_width = top_number if de_novo_mode in ('beam', 'gap') else None
+    max_gap = max_gap if de_novo_mode == 'gap' else 0
+    for spectrum in spectra:
+        num_spectra += 1
+        # Check the 'MODIFICATIONS' in Comment, there are two modifications right now.
+        # Example: MODIFICATIONS = 10, Carbamidomethyl[C];7, Oxidation[M];
+        # Fixed modification: Carbamidomethyl[C]
+        # Variable modification: Oxidation[M]
+        # We ignore the variable modification and keep the fixed modification, or ignore all
+        # spectra that have the variable modifications.
+        if spectrum.modifications.find("Oxidation[M]") != -1:
+            continue
+
+        # Add filters to remove peptides with long sequences, whose lengths are
+        # greater than the maximum thresholds.
+        # For the lengths of peptides, 0.6% are greater than 32;
+        if len(spectrum.peptide) > MAX_PEPTIDE_LENGTH:
+            continue
+
+        # Use 'X' to represent 'I' and 'L' that with the same masses,
+        # save room for the fifth monosaccharide.
+        peptide_name = spectrum.peptide.replace('I', 'X')
+        peptide_name = peptide_name.replace('L', 'X')
+        # Assume the maximum length of peptide is 32, pad the left locations with "Z"
+        left_peptide_length = MAX_PEPTIDE_LENGTH - len(peptide_name)
+        peptide_pad_name = peptide_name + 'Z' * left_peptide_length
+
+        # Add filter to remove glycans with long sequences, whose lengths are
+        # greater than the maximum threshold.
+        # For the lengths of glycans, 0.2% are greater than 18.
+        if spectrum.glycan_length > MAX_GLYCAN_LENGTH:
+            continue
+
+        # Check the number of peaks, if is 0, ignore the following processing:
+        if len(spectrum) == 0:
+            print("This spectrum has no peaks!")
+            continue
+
+        m_over_z_s = []
+        intensities = []
+        ions = []
+        ion_charges = []
+        positions = []
+
+        glycan_intensity = {}
+        # Read MS2 ions
+        for mz, intensity, annotation in zip(spectrum.mz.tolist(), spectrum.intensity.tolist(),
+                                             spectrum.annotations):
+            # Only consider maximum charge of 4 now.
+            charge_search = re.search(charge_regex, annotation)
+            ion_charge = int(charge_search.group("charge"))
+            # ignore the ions with charge 5, 6
+            if ion_charge > 4:
+                continue
+            # For b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da, ignore it now
+            # For Y0+2, Y means "peptide backbone charge 2", would ignore it now
+            # For y12-N(1)+2, peptide fragment plus a glycan, also ignore it now.
+            if annotation[0] in backbone_ions:
+                # b, or y ions in the peptide backbone
+                # b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da
+                # y12-N(1)+2, peptide fragment plus a glycan
+                # For b ions: b3 is 0, b$3 is 1, b3-N(1) is 2,
+                # For y ions: y3 is 3, y$3 is 4, y3-N(1) is 5.
+                ion_indicator = backbone_ions.index(annotation[0])
+                if '$' in annotation:
+                    ion_indicator_code = ion_indicator * 3 + 1
+                    annotation = annotation.replace('$', '')
+                elif '-' in annotation:
+                    ion_indicator_code = ion_indicator * 3 + 2
+                else:
+                    ion_indicator_code = ion_indicator * 3
+                position_search = re.search(position_regex, annotation)
+                position = int(position_search.group("position"))
+                # Consider padding empty amino acids to the length of 32
+                if annotation[0] == 'y':
+                    position += left_peptide_length
+            elif annotation[0] in glyco_ions:
+                # intact charged peptide without glycan
+                # Y0+2=1113.098
+                if annotation[1] == '0':
+                    ion_indicator_code = 6
+                    position = MAX_PEPTIDE_LENGTH
+                # intact charged peptide with cross ring fragment of a HexNAc
+                # Y$+2=1154.617
+                elif annotation[1] == '$':
+                    ion_indicator_code = 7
+                    position = MAX_PEPTIDE_LENGTH
+                # Y ions: peptide backbone attached a fragmented glycan
+                # Summarize ion intensities for each glycan composition
+                # For GLYCAN(H,N,F,A,G)=5,4,1,0,0 such as
+                # 1018.423	7877.0	Y-H(5)N(4)F(1)+3
+                # First parse H(5)N(4)F(1), then call Stack to transfer to a dictionary
+                # {'H': 5, 'N': 4, 'F': 1}, and reverse it to 5410 by adding intensity;
+                # after that, use a dictionary such as {5410: 7877.0} to represent it;
+                # by considering multiple charges, we add all of them together.
+                # annotation[1] == '-':
                 else:
-                    current_chunk.append(line.strip())
-            # If there is no new data, end the reading process.
-            if not read:
-                break
+                    glycan_ion = annotation.split("-")[1].split("+")[0]
+                    glycan_ion_dic = parse_glycan(glycan_ion)
+                    glycan_str = glycan_to_str(glycan_ion_dic)
+                    if glycan_str in glycan_intensity:
+                        sum_intensity = round(glycan_intensity[glycan_str] + intensity, 1)
+                    else:
+                        sum_intensity = round(intensity, 1)
+                    glycan_intensity[glycan_str] = sum_intensity
+                    # Position is counted as the total number of glycan ions, plus peptide maximum length 32
+                    ion_indicator_code = 8
+                    position = denovor.count_total(glycan_str) + MAX_PEPTIDE_LENGTH
+            else:
+                # Ignore the M-ions: intact glycopeptide (peptide attached the whole glycan)
+                continue
+
+            positions.append(position)
+            m_over_z_s.append(mz)
+            intensities.append(round(intensity, 1))
+            ions.append(ion_indicator_code)
+            ion_charges.append(ion_charge)
+
+        glycan_dic = parse_glycan(spectrum.glycans)
+        glycan_str = glycan_to_str(glycan_dic)
+        # Call de novo sequencing to generate linearized glycan string
+        glycan_deno_lists = denovor.de_novo(glycan_str, glycan_intensity, beam_width, max_gap)
+        # Assume the maximum length of glycan is max_glycan_length, pad the left locations with "Z"
+        left_glycan_length = MAX_GLYCAN_LENGTH - spectrum.glycan_length
+        # The number of spectra for deep learning could have several denovo results for the samples
+        num_dl_spectra += 1
+        # Consider top N de novo sequence candidates if the total number greater than N
+        top_one_candidate = min(len(glycan_deno_lists), top_number)
+        for i in range(top_one_candidate):
+            # glycan_deno_lists[i] is a tuple like ('NNHHNHHANHNHAA', 954586.3)
+            glycan_de_novo_sequence = glycan_deno_lists[i][0]
+            for monosaccharide, monosaccharide_code in monosaccharide_component_replacements.items():
+                # Replace monosaccharide with our special codes
+                glycan_de_novo_sequence = glycan_de_novo_sequence.replace(monosaccharide,
+                                                                          monosaccharide_code)
+            glycan_pad_name = glycan_de_novo_sequence + 'Z' * left_glycan_length
+            glycopeptide_name = peptide_pad_name + glycan_pad_name
+            # The writer encodes the name, as the one hot encoding for csv, or the tokens for columnar.
+            row_dictionary = {
+                'glycopeptide': glycopeptide_name,
+                'charge': spectrum.charge,
+                'precursor_mass': spectrum.precursor_mass,
+                'retention_time': spectrum.retention_time_text,
+                'mzs': m_over_z_s,
+                'intensities': intensities,
+                'ions': ions,
+                'positions': positions,
+                'ion_charges': ion_charges,
+            }
+            assert len(m_over_z_s) == len(intensities) == len(ions) == len(positions) == len(ion_charges)
+            writer_csv.writerow(row_dictionary)
+            num_samples += 1
+
+        # Write the msp file and denovo results into a denovo msp file.
+        # Here the denovo msp file do not contain variable modifications.
+        name_line, precursor_mass_line, comment_line, number_peaks_line = spectrum.header_lines
+        denovo_msp_file.write(name_line + '\n')
+        denovo_msp_file.write(precursor_mass_line + '\n')
+        denovo_msp_file.write(comment_line + '\t' + 'DENOVO=' + str(glycan_deno_lists) + '\n')
+        denovo_msp_file.write(number_peaks_line + '\n')
+        for data in spectrum.peak_lines():
+            denovo_msp_file.write(data + '\n')
+        denovo_msp_file.write('\n')
+
+    return num_spectra, num_dl_spectra, num_samples, denovor.result_cache.hits - result_hits, \
+        denovor.ladder_cache.hits - ladder_hits
+
+
+def print_cache_hits(num_dl_spectra, num_result_hits, num_ladder_hits):
+    """
+    Print the hit rates of the de novo cache for the results and the ladders.
+    :param num_dl_spectra: the number of spectra for the deep learning, each is searched by de novo once;
+    :param num_result_hits: the number of spectra whose de novo results are reused;
+    :param num_ladder_hits: the number of spectra whose de novo ladders are reused with the new intensities.
+    """
+    result_rate = num_result_hits / num_dl_spectra if num_dl_spectra else 0.0
+    ladder_rate = num_ladder_hits / num_dl_spectra if num_dl_spectra else 0.0
+    print(f"The hit rate of the de novo results is: {num_result_hits}/{num_dl_spectra} ({result_rate:.1%})")
+    print(f"The hit rate of the de novo ladders is: {num_ladder_hits}/{num_dl_spectra} ({ladder_rate:.1%})")
+
+
+# Process the spectra in a byte range of a msp file, and write the data into the part files of csv and denovo msp.
+def msp_range_to_csv_denovo(top_number, msp_file, start, end, csv_file, denovo_file, output_format='csv',
+                            de_novo_mode='exhaustive', max_gap=1):
+    """
+    Write the information of the spectra in a byte range into the files of csv (without header) and denovo msp;
+    :param top_number: the top number of denovo results;
+    :param msp_file: the msp file to read;
+    :param start: the byte offset to start;
+    :param end: the byte offset to end;
+    :param csv_file: the part csv file (or columnar folder) to write;
+    :param denovo_file: the part denovo msp file to write;
+    :param output_format: "csv", "columnar" or "shard";
+    :param de_novo_mode: "exhaustive", "beam" or "gap";
+    :param max_gap: the number of missing Y-ion levels to bridge for the "gap" mode.
+    :return: the total number of spectra, spectra for the deep learning, samples, and the hits of the de novo cache.
+    """
+    with open_sample_writer(output_format, csv_file) as writer_csv, open_file(denovo_file, 'w') as denovo_msp_file:
+        return write_csv_denovo(top_number, read_msp(msp_file, start, end), writer_csv, denovo_msp_file,
+                                de_novo_mode, max_gap)
+
+
+# read the processed information from a msp file, and write the data into a csv file and a denovo msp file.
+def msp_to_csv_denovo(top_number, msp_file, csv_file, denovo_file, workers=1, output_format='csv',
+                      de_novo_mode='exhaustive', max_gap=1):
+    """
+    Write the information of input_csv into the files of csv and denovo msp;
+    For several workers, the msp file is split into byte ranges at the blank lines, the ranges are processed in
+    parallel, and the part files are joined in the original order.
+    :param top_number: the top number of denovo results;
+    :param msp_file: the msp file to read;
+    :param csv_file: the csv file (or columnar folder, or prefix of the shards) to write;
+    :param denovo_file: the denovo msp file to write;
+    :param workers: the number of worker processes for the byte ranges;
+    :param output_format: "csv" for a csv file, "columnar" for a columnar folder of npy files,
+                          "shard" for the shards of (X, X_meta, y) for the training;
+    :param de_novo_mode: "exhaustive" for all the de novo candidates, "beam" for a beam of the top number,
+                         "gap" for a beam of the top number which bridges the missing Y-ions;
+    :param max_gap: the number of missing Y-ion levels to bridge for the "gap" mode.
+    :return: the total number of spectra, spectra for the deep learning, samples, and the hits of the de novo cache.
+    """
+    if workers == 1:
+        with open_sample_writer(output_format, csv_file) as writer_csv, \
+                open_file(denovo_file, 'w') as denovo_msp_file:
+            if output_format == 'csv':
+                writer_csv.writeheader()
+            num_spectra, num_dl_spectra, num_samples, num_result_hits, num_ladder_hits = \
+                write_csv_denovo(top_number, read_msp(msp_file), writer_csv, denovo_msp_file, de_novo_mode,
+                                 max_gap)
+    else:
+        tasks = []
+        for i, (start, end) in enumerate(split_msp_ranges(msp_file, workers)):
+            csv_part_file = csv_file.with_name(f'{csv_file.name}.part-{i}')
+            denovo_part_file = denovo_file.with_name(f'{denovo_file.name}.part-{i}')
+            tasks.append((top_number, msp_file, start, end, csv_part_file, denovo_part_file, output_format,
+                          de_novo_mode, max_gap))
+        results = run_tasks(msp_range_to_csv_denovo, tasks, workers)
+
+        num_samples = 0
+        num_dl_spectra = 0
+        num_spectra = 0
+        num_result_hits = 0
+        num_ladder_hits = 0
+        # Stitch the part files back in the original order.
+        if output_format == 'csv':
+            with open_file(csv_file, "w", newline='') as csv_output_file:
+                writer_csv = csv.DictWriter(csv_output_file, fieldnames=csv_output_rows)
+                writer_csv.writeheader()
+                for task in tasks:
+                    with open(task[4], newline='') as csv_part:
+                        shutil.copyfileobj(csv_part, csv_output_file)
+                    task[4].unlink()
+        elif output_format == 'columnar':
+            merge_training_data([task[4] for task in tasks], csv_file)
+        else:
+            merge_shards([task[4] for task in tasks], csv_file)
+        with open_file(denovo_file, 'w') as denovo_msp_file:
+            for task, ((num_spectra_part, num_dl_spectra_part, num_samples_part, num_result_hits_part,
+                        num_ladder_hits_part), _) in zip(tasks, results):
+                denovo_part_file = task[5]
+                with open(denovo_part_file) as denovo_part:
+                    shutil.copyfileobj(denovo_part, denovo_msp_file)
+                denovo_part_file.unlink()
+                num_spectra += num_spectra_part
+                num_dl_spectra += num_dl_spectra_part
+                num_samples += num_samples_part
+                num_result_hits += num_result_hits_part
+                num_ladder_hits += num_ladder_hits_part
+
     print(f"The total number of spectra is: {num_spectra}")
     print(f"The total number of spectra for the deep learning is: {num_dl_spectra}")
     print(f"The total number of samples is: {num_samples}")
-    print(f"Constructed a csv file: {csv_file.name}" )
+    print_cache_hits(num_dl_spectra, num_result_hits, num_ladder_hits)
+    print(f"Constructed a {output_format} file: {csv_file.name}" )
     print(f"Constructed a denovo msp file: {denovo_file.name}")
-    return num_spectra, num_dl_spectra, num_samples
+    return num_spectra, num_dl_spectra, num_samples, num_result_hits, num_ladder_hits
 
 
 # Read the path for input folder (MSP) and the top number of de novo sequencing,
 # then write csv files into CSV folder, and denovo msp files into DENOVO folder.
-def parse_msp_files(input_type, top_number, input_path):
+def parse_msp_files(input_type, top_number, input_path, workers=1, output_format='csv', resume='yes',
+                    de_novo_mode='exhaustive', max_gap=1):
     """
     Write the CSV files to the folder of "input_path"
     :param input_type: A type for the input folder, such as "N" or "O";
     :param top_number: A value for the top number of de novo sequencing, such as "10";
     :param input_path: A string for the input folder, such as "/data/Training-01-Human-285";
-    :return: write all the CSV files to the "/data/Training-01-Human-285/N-GP-CSV";
+    :param workers: A value for the number of worker processes to parse the msp files in parallel, such as "8",
+                    a file is split into byte ranges for the workers if there are fewer files than workers;
+    :param output_format: A string for the format of the samples, "csv", "columnar" or "shard";
+    :param resume: "yes" to skip the msp files whose outputs are current by the manifest, "no" to parse all of them;
+    :param de_novo_mode: "exhaustive" for all the de novo candidates, "beam" for a beam of the top number,
+                         "gap" for a beam of the top number which bridges the missing Y-ions;
+    :param max_gap: A value for the number of missing Y-ion levels to bridge for the "gap" mode, such as "1";
+    :return: write all the CSV files to the "/data/Training-01-Human-285/N-GP-CSV",
+             or all the columnar folders to the "/data/Training-01-Human-285/N-GP-COL",
+             or all the shards to the "/data/Training-01-Human-285/N-GP-SHARD";
              write all the denovo msp files to the "/data/Training-01-Human-285/N-GP-DENOVO-MSP".
     """
     path_name = Path(input_path)
@@ -606,16 +680,27 @@ def parse_msp_files(input_type, top_number, input_path):
 
     top_number = int(top_number)
     assert top_number > 0 and top_number < 101, "Wrong Top Number!"
+    workers = int(workers)
+    assert workers > 0, "Wrong Number of Workers!"
+    assert output_format in ('csv', 'columnar', 'shard'), "Wrong Output Format!"
+    assert resume in ('yes', 'no'), "Wrong Resume!"
+    assert de_novo_mode in ('exhaustive', 'beam', 'gap'), "Wrong De Novo Mode!"
+    max_gap = int(max_gap)
+    assert max_gap >= 0, "Wrong Maximum Gap!"
+    # The gap is only used by the "gap" mode, so the other modes are current for any gap.
+    max_gap = max_gap if de_novo_mode == 'gap' else 0
+    # The columnar folders are written into the "COL" folder, and the shards into the "SHARD" folder.
+    csv_folder = {'csv': 'CSV', 'columnar': 'COL', 'shard': 'SHARD'}[output_format]
 
     if input_type == 'N':
         msp_path = path_name / 'N-GP-MSP'
-        csv_name = 'N-GP-CSV-TOP-' + str(top_number)
+        csv_name = f'N-GP-{csv_folder}-TOP-' + str(top_number)
         csv_path = path_name / csv_name
         denovo_name = 'N-GP-DENOVO-MSP-TOP-' + str(top_number)
         denovo_msp_path = path_name / denovo_name
     elif input_type == 'O':
         msp_path = path_name / 'O-GP-MSP'
-        csv_name = 'O-GP-CSV-TOP-' + str(top_number)
+        csv_name = f'O-GP-{csv_folder}-TOP-' + str(top_number)
         csv_path = path_name / csv_name
         denovo_name = 'O-GP-DENOVO-MSP-TOP-' + str(top_number)
         denovo_msp_path = path_name / denovo_name
@@ -639,40 +724,77 @@ def parse_msp_files(input_type, top_number, input_path):
     total_num_spectra = 0
     total_num_dl_spectra = 0
     total_num_samples = 0
+    total_num_result_hits = 0
+    total_num_ladder_hits = 0
     # Check the MSP folder
     if not msp_path.exists():
         print("The MSP folder does not exist!")
         return
 
-    # Iterate all the files in the MSP folder
-    for msp_file in msp_path.iterdir():
+    # The manifest of the outputs, keyed by the names of the msp files.
+    manifest = RunManifest(manifest_file(path_name, csv_path.name),
+                           {'input_type': input_type, 'top_number': top_number, 'output_format': output_format,
+                            'de_novo_mode': de_novo_mode, 'max_gap': max_gap},
+                           code_version(*source_files), resume == 'yes')
+
+    # Iterate all the files in the MSP folder, sorted by the names to merge the counters in the same order.
+    tasks = []
+    results = []
+    for msp_file in sorted(msp_path.iterdir()):
         # Judge whether msp is a folder, only open it as a msp file
         # Example: 202110_Palleon_Cyno_In_vitro-20211027_Palleon_A_HILIC_HCDFT.msp
         if not msp_file.is_file():
             print("There is a folder in the MSP folder!")
             continue
-        if msp_file.suffix != '.msp':
+        # A compressed msp file, such as "sample.msp.gz", is checked by its name without the compression.
+        msp_plain_file, compression = split_compression(msp_file)
+        if msp_plain_file.suffix != '.msp':
            print("There is a file whose type is not msp!")
            continue
-        time_read_msp = time.time()
         # Get the filename without the extension.
-        msp_stem = msp_file.stem
-        # Generate the name for a csv file, and the whole path/file for it.
-        csv_name = f'{msp_stem}.csv'
+        msp_stem = msp_plain_file.stem
+        # Generate the name for a csv file (or a columnar folder, or a prefix of shards), and the whole path/file for it.
+        # The csv file and the denovo msp file are compressed the same as the msp file.
+        csv_name = f'{msp_stem}.csv{compression}' if output_format == 'csv' else msp_stem
         csv_path_file = csv_path / csv_name
         # Generate the name for a denovo msp file, and the whole path/file for it.
-        denovo_name = f'denovo_{msp_stem}.msp'
+        denovo_name = f'denovo_{msp_stem}.msp{compression}'
         denovo_path_file = denovo_msp_path / denovo_name
+        # The shards are known after writing them, only the recorded shards are checked.
+        output_files = None if output_format == 'shard' else [csv_path_file, denovo_path_file]
+        if manifest.is_current(msp_file.name, [msp_file], output_files):
+            print(f"The outputs of the msp file are current: {msp_file.name}")
+            results.append((tuple(manifest.result(msp_file.name)), 0))
+            continue
+        tasks.append((top_number, msp_file, csv_path_file, denovo_path_file, 1, output_format, de_novo_mode,
+                      max_gap))
+
+    # Each file is processed by a worker, and the counters are merged in the order of the files.
+    # If there are fewer files than workers, such as one enormous file for an instrument run,
+    # process the files one by one, and split each file into byte ranges for the workers.
+    # Each finished file is recorded into the manifest at once, so an interrupted run resumes after it.
+    if len(tasks) < workers:
+        task_results = (timed_call(msp_to_csv_denovo, task[:4] + (workers,) + task[5:]) for task in tasks)
+    else:
+        task_results = iter_tasks(msp_to_csv_denovo, tasks, workers)
+    for task, (result, process_time) in zip(tasks, task_results):
+        msp_file, csv_path_file, denovo_path_file = task[1:4]
+        output_files = [denovo_path_file]
+        if output_format == 'shard':
+            output_files.extend(shard_files(csv_path_file))
+        else:
+            output_files.append(csv_path_file)
+        manifest.record(msp_file.name, [msp_file], output_files, list(result))
+        results.append((result, process_time))
 
-        num_spectra_file, num_dl_spectra_file, num_samples_file = \
-            msp_to_csv_denovo(top_number, msp_file, csv_path_file, denovo_path_file)
-
+    for (num_spectra_file, num_dl_spectra_file, num_samples_file, num_result_hits_file, num_ladder_hits_file), \
+            process_time in results:
         total_num_files += 1
         total_num_spectra += num_spectra_file
         total_num_dl_spectra += num_dl_spectra_file
         total_num_samples += num_samples_file
-        time_write_csv = time.time()
-        process_time = time_write_csv - time_read_msp
+        total_num_result_hits += num_result_hits_file
+        total_num_ladder_hits += num_ladder_hits_file
         print(f"The time for reading the msp file, then write the csv file and denovo file: {process_time}")
 
     time_end_msp =  time.asctime(time.localtime(time.time()))
@@ -684,21 +806,28 @@ def parse_msp_files(input_type, top_number, input_path):
     print(f"The total number of spectra is: {total_num_spectra}")
     print(f"The total number of spectra for the deep learning is: {total_num_dl_spectra}")
     print(f"The total number of samples is: {total_num_samples}")
+    print_cache_hits(total_num_dl_spectra, total_num_result_hits, total_num_ladder_hits)
     print(f"The end time is: {time_end_msp}")
     print(f"The total time is: {total_time_seconds} Seconds, {total_time_minutes} Minutes, {total_time_hours} Hours.")
 
 
 #  CLI (command line interface) for the input and output
-def user_interface(input_type, top_number, input_path):
+def user_interface(input_type, top_number, input_path, workers, output_format, resume, de_novo_mode, max_gap):
     """
     Get the folder by the input type and input path for the CSV files
     :param input_type: A string for the folder of input type;
     :param top_number: A value for the top number of de novo sequencing, such as "10";
-    :param input_path: A string for the folder of input path.
+    :param input_path: A string for the folder of input path;
+    :param workers: A value for the number of worker processes;
+    :param output_format: A string for the format of the samples, "csv", "columnar" or "shard";
+    :param resume: A string, "yes" to skip the msp files whose outputs are current, "no" to parse all of them;
+    :param de_novo_mode: A string, "exhaustive" for all the de novo candidates, "beam" for a beam of the top number,
+                         "gap" for a beam of the top number which bridges the missing Y-ions;
+    :param max_gap: A value for the number of missing Y-ion levels to bridge for the "gap" mode.
     :return: The output of CSV files.
     """
-    #  python parse_msp_data.py -IT=N -TN=10 -IP=/data/Training-2021-D-Va--Human
-    parse_msp_files(input_type, top_number, input_path)
+    #  python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-2021-D-Va--Human -WN=8 -OF=columnar
+    parse_msp_files(input_type, top_number, input_path, workers, output_format, resume, de_novo_mode, max_gap)
 
 
 """
@@ -706,6 +835,11 @@ Input parameters for the user interface:
     1   Input Glyco Peptide Type
     2   Input Top Number of De Novo Sequencing
     3   Input File Path Name
+    4   Input Number of Workers
+    5   Output Format of the samples
+    6   Resume the run by the manifest
+    7   De Novo Mode of the search
+    8   Maximum Gap of the missing Y-ions for the gap mode
 """
 parser = argparse.ArgumentParser(description='Input parameters to run the script.')
 parser.add_argument('--InputType', '-IT',
@@ -716,6 +850,27 @@ parser.add_argument('--TopNumber', '-TN',
                          'sequencing.', required=False, default='1')
 parser.add_argument('--InputPath', '-IP', help='Input Path parameter，required，no default. Such as /data/Training-01-Human-285.',
                     required=False)
+parser.add_argument('--Workers', '-WN',
+                    help='Workers parameter，not required, has default. The number of worker processes to parse the msp '
+                         'files in parallel.', required=False, default='1')
+parser.add_argument('--OutputFormat', '-OF',
+                    help='Output Format parameter，not required, has default. csv-one hot encoding and lists in the csv '
+                         'cells; columnar-npy files of tokens, charges and peaks with offsets; shard-npz files of '
+                         '(X, X_meta, y) for the training, without the csv and pkl files.',
+                    required=False, default='csv')
+parser.add_argument('--Resume', '-RS',
+                    help='Resume parameter，not required, has default. yes-skip the msp files whose outputs are current '
+                         'by the manifest in the MANIFEST folder; no-parse all the msp files again.',
+                    required=False, default='yes')
+parser.add_argument('--DeNovoMode', '-DM',
+                    help='De Novo Mode parameter，not required, has default. exhaustive-keep all the partial ladders of '
+                         'de novo sequencing; beam-keep the best top number partial ladders of each composition, with '
+                         'the same top number results, for the large glycans; gap-the beam which also bridges the '
+                         'missing Y-ions by the maximum gap.',
+                    required=False, default='exhaustive')
+parser.add_argument('--MaxGap', '-MG',
+                    help='Maximum Gap parameter，not required, has default. The number of missing Y-ion levels which a '
+                         'de novo ladder could bridge, for the gap mode.', required=False, default='1')
 
 args = parser.parse_args()
 
@@ -723,13 +878,26 @@ args = parser.parse_args()
 if __name__ == "__main__":
     # Please run the script with the following input format in Linux/Unix/Mac such as:
     # python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-01-Human-285
+    # Use a process pool to parse the msp files in parallel:
+    # python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -WN=8
+    # Write the columnar folders of npy files instead of the csv files:
+    # python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -OF=columnar
+    # Write the shards of (X, X_meta, y) for train_model_cyno.py, instead of the csv and pkl files:
+    # python parse_msp_to_csv.py -IT=N -TN=1 -IP=/data/Training-01-Human-285 -OF=shard
+    # Parse all the msp files again, even if their outputs are current by the manifest:
+    # python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -RS=no
+    # Search the de novo candidates by a beam of the top number, for the large glycans:
+    # python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -DM=beam
+    # Bridge up to two missing Y-ions in the ladders of de novo sequencing:
+    # python parse_msp_to_csv.py -IT=N -TN=10 -IP=/data/Training-01-Human-285 -DM=gap -MG=2
     # Or Windows such as:
     # python parse_msp_data.py -IT=O -TN=10 -IP=D:\\data\\Training-01-Human-285
     # For huge files with several hours, should use "nohup" and "&" to run in the background. For example:
     # nohup python -u parse_msp_to_csv.py -IT=N -TOP=10 -IP=/data/Training-01-Human-285 > Training-01-Human-285_out.out 2>&1 &
 
     try:
-        user_interface(args.InputType, args.TopNumber, args.InputPath)
+        user_interface(args.InputType, args.TopNumber, args.InputPath, args.Workers, args.OutputFormat, args.Resume,
+                       args.DeNovoMode, args.MaxGap)
     except Exception as e:
         print(e)
 
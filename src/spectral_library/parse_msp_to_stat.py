@@ -6,6 +6,9 @@
 This script read MS/MS spectral library data from an MSP format file
 
 Created on 07 November 2022.
+Modified on 18 October 2026, read the spectra with the shared msp reader.
+Modified on 18 October 2026, read the compressed msp files, such as "sample.msp.gz".
+Modified on 18 October 2026, skip the msp files whose statistic files are current by the manifest, and resume the runs.
 
 ###################################################################################################################
 """
@@ -16,11 +19,19 @@ import csv
 import re
 from stack_queue import Stack
 from de_novo_sequencing import DeNovoSequencing
+from msp_reader import read_msp
+from compressed_io import split_compression
+from parallel_workers import iter_tasks
+from run_manifest import RunManifest, code_version, manifest_file
 import argparse
 from pathlib import Path
 import time
 
 
+# The source files for the version of the code in the manifest, the statistic files are written again if any is changed.
+source_files = ('parse_msp_to_stat.py', 'de_novo_sequencing.py', 'stack_queue.py', 'msp_reader.py', 'compressed_io.py')
+
+
 """
 The following is a sample spectrum for an msp file for five monosaccharides.
 
@@ -143,189 +154,98 @@ def msp_to_stat(top_number, msp_file, stat_txt, stat_csv):
     peptide_glycan_charges = set()
     glycan_intensity_ratio =[]
 
-    with open(msp_file) as spec_library_file, open(stat_txt, "w", newline='') as stat_output_file, \
-            open(stat_csv, "w", newline='') as csv_output_file:
+    # Initialization
+    denovor = DeNovoSequencing()
+    with open(stat_txt, "w", newline='') as stat_output_file, open(stat_csv, "w", newline='') as csv_output_file:
         writer_csv = csv.DictWriter(csv_output_file, fieldnames=csv_output_rows)
         writer_csv.writeheader()
 
-        while True:
-            current_chunk = []
-            read = False
-            for line in spec_library_file:
-                read = True
-                # Initialization
-                denovor = DeNovoSequencing()
-                # Use blank line to determine the start and end of each spectrum
-                if not line.strip():
-                    # End of chunk - start processing
-
-                    # Variables to write:
-                    # encoded_name
-                    # charge
-
-                    # Write the processed data into a csv file.
-                    precursor_mass_line = current_chunk[1]
-                    try:
-                        assert (precursor_mass_line.startswith("MW: "))
-                    except AssertionError:
-                        print("This chunk has some extra lines, or some deleted lines!")
-                        print(current_chunk)
-                        break
-
-                    num_spectra += 1
-                    # Check the 'MODIFICATIONS' in Comment, there are two modifications right now.
-                    # Example: MODIFICATIONS = 10, Carbamidomethyl[C];7, Oxidation[M];
-                    # Fixed modification: Carbamidomethyl[C]
-                    # Variable modification: Oxidation[M]
-                    # We ignore the variable modification and keep the fixed modification, or ignore all
-                    # spectra that have the variable modifications.
-                    comment, charge, retention_time, peptide, modifications, glycan, glycans = current_chunk[2].split()
-                    if modifications.find("Oxidation[M]") != -1:
-                        #print("Has variable modifications, ignore it!")
-                        #print(peptide)
-                        #print(modifications)
-                        break
-
-                    # Parse precursor charge, retention time, peptide backbone, glycan compositions
-                    # Only store the number of charge which is smaller than 10, ignore the '+'
-                    charge = charge.split("=")[1][:1]
-                    retention_time = retention_time.split("=")[1]
-                    peptide_name = peptide.split("=")[1]
-
-                    # Add filters to remove peptides with long sequences, whose lengths are
-                    # greater than the maximum thresholds.
-                    # For the lengths of peptides, 0.6% are greater than 32;
-                    if len(peptide_name) > MAX_PEPTIDE_LENGTH:
-                        #print("Peptide length is greater than 32, ignore it!")
-                        #print(peptide)
-                        break
-
-                    glycan_compositions = glycan.split("=")[1]
-                    # Parse monosaccharides from glycan compositions: GLYCAN(H,N,F,A,G)=5,4,1,1,1
-                    # Should consider double-digit monosaccharides.
-                    monosaccharide_numbers = []
-                    if glycan_compositions == "nan":
-                        monosaccharide_numbers = ['0', '0', '0', '0', '0']
+        for spectrum in read_msp(msp_file):
+            num_spectra += 1
+            # Check the 'MODIFICATIONS' in Comment, there are two modifications right now.
+            # Example: MODIFICATIONS = 10, Carbamidomethyl[C];7, Oxidation[M];
+            # Fixed modification: Carbamidomethyl[C]
+            # Variable modification: Oxidation[M]
+            # We ignore the variable modification and keep the fixed modification, or ignore all
+            # spectra that have the variable modifications.
+            if spectrum.modifications.find("Oxidation[M]") != -1:
+                continue
+
+            # Parse precursor charge, peptide backbone
+            charge = str(spectrum.charge)
+            peptide_name = spectrum.peptide
+
+            # Add filters to remove peptides with long sequences, whose lengths are
+            # greater than the maximum thresholds.
+            # For the lengths of peptides, 0.6% are greater than 32;
+            if len(peptide_name) > MAX_PEPTIDE_LENGTH:
+                continue
+
+            # Add filter to remove glycans with long sequences, whose lengths are
+            # greater than the maximum threshold.
+            # For the lengths of glycans, 0.2% are greater than 18.
+            if spectrum.glycan_length > MAX_GLYCAN_LENGTH:
+                continue
+
+            # Check the number of peaks, if is 0, ignore the following processing:
+            if len(spectrum) == 0:
+                print("This spectrum has no peaks!")
+                continue
+
+            glycan_intensity = {}
+            total_glcan_intensities = 0.0
+            # Read MS2 ions
+            for intensity, annotation in zip(spectrum.intensity.tolist(), spectrum.annotations):
+                # Only consider maximum charge of 4 now.
+                charge_search = re.search(charge_regex, annotation)
+                ion_charge = int(charge_search.group("charge"))
+                # ignore the ions with charge 5, 6
+                if ion_charge > 4:
+                    continue
+                # Only consider the Y ions: peptide backbone attached a fragmented glycan, ignore the b, y ions,
+                # Y0+2=1113.098, Y$+2=1154.617, and the M ions.
+                # Summarize ion intensities for each glycan composition
+                # For GLYCAN(H,N,F,A,G)=5,4,1,0,0 such as
+                # 1018.423	7877.0	Y-H(5)N(4)F(1)+3
+                if annotation[0] in glyco_ions and annotation[1] not in '0$':
+                    glycan_ion = annotation.split("-")[1].split("+")[0]
+                    glycan_ion_dic = parse_glycan(glycan_ion)
+                    glycan_str = glycan_to_str(glycan_ion_dic)
+                    if glycan_str in glycan_intensity:
+                        sum_intensity = round(glycan_intensity[glycan_str] + intensity, 1)
                     else:
-                        monosaccharide_numbers = glycan_compositions.split(",")
-                    # Transfer the number of monosaccharides to glycan compositions such as "5410"
-                    monosaccharides = ''
-                    glycan_length = 0
-                    for i in range(len(monosaccharide_numbers)):
-                        number = int(monosaccharide_numbers[i])
-                        for _ in range(number):
-                            monosaccharides += monosaccharide_list[i]
-                        glycan_length += number
-
-                    # Add filter to remove glycans with long sequences, whose lengths are
-                    # greater than the maximum threshold.
-                    # For the lengths of glycans, 0.2% are greater than 18.
-                    if glycan_length > MAX_GLYCAN_LENGTH:
-                        #print("Glycan length is greater than 18, ignore it!")
-                        #print(peptide)
-                        #print(glycan_compositions)
-                        break
-
-                    precursor_mass = float(precursor_mass_line.split()[1])
-
-                    # Check the line of "Num Peaks", if is 0, ignore the following processing:
-                    number_peaks_line = current_chunk[3]
-                    try:
-                        assert (number_peaks_line.split(":")[1].strip() != '0')
-                    except AssertionError:
-                        print("This spectrum has no peaks!")
-                        continue
-
-                    glycan_intensity = {}
-                    total_glcan_intensities = 0.0
-                    # Read MS2 ions
-                    for data in current_chunk[4:]:
-                        mz, intensity, annotation = data.split()
-                        # Only consider maximum charge of 4 now.
-                        charge_search = re.search(charge_regex, annotation)
-                        ion_charge = int(charge_search.group("charge"))
-                        # ignore the ions with charge 5, 6
-                        if ion_charge > 4:
-                            continue
-                        # For b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da, ignore it now
-                        # For Y0+2, Y means "peptide backbone charge 2", would ignore it now
-                        # For y12-N(1)+2, peptide fragment plus a glycan, also ignore it now.
-                        if annotation[0] in backbone_ions:
-                            continue
-                            # b, or y ions in the peptide backbone
-                            # b$2+1, $ means "cross ring fragment of a HexNAc", should be an 83Da
-                            # y12-N(1)+2, peptide fragment plus a glycan
-                            # For b ions: b3 is 0, b$3 is 1, b3-N(1) is 2,
-                            # For y ions: y3 is 3, y$3 is 4, y3-N(1) is 5.
-                        elif annotation[0] in glyco_ions:
-                            # intact charged peptide without glycan
-                            # Y0+2=1113.098
-                            if annotation[1] == '0':
-                                continue
-                            # intact charged peptide with cross ring fragment of a HexNAc
-                            # Y$+2=1154.617
-                            elif annotation[1] == '$':
-                                continue
-                            # Y ions: peptide backbone attached a fragmented glycan
-                            # Summarize ion intensities for each glycan composition
-                            # For GLYCAN(H,N,F,A,G)=5,4,1,0,0 such as
-                            # 1018.423	7877.0	Y-H(5)N(4)F(1)+3
-                            # annotation[1] == '-':
-                            else:
-                                glycan_ion = annotation.split("-")[1].split("+")[0]
-                                glycan_ion_dic = parse_glycan(glycan_ion)
-                                glycan_str = glycan_to_str(glycan_ion_dic)
-                                if glycan_str in glycan_intensity:
-                                    sum_intensity = round(float(glycan_intensity[glycan_str]) + float(intensity), 1)
-                                else:
-                                    sum_intensity = round(float(intensity), 1)
-                                glycan_intensity[glycan_str] = round(float(sum_intensity), 1)
-                                total_glcan_intensities += float(intensity)
-                        else:
-                            # Ignore the position, use 32 + 18 to replace it
-                            # ion_indicator_code = 3
-                            # positions.append(50)
-                            continue
-
-                    glycan_sequence = glycans.split("=")[1]
-                    glycan_dic = parse_glycan(glycan_sequence)
-                    glycan_str = glycan_to_str(glycan_dic)
-                    # Call de novo sequencing to generate linearized glycan string
-                    glycan_deno_lists = denovor.de_novo(glycan_str, glycan_intensity)
-
-                    # Assume the maximum length of glycan is max_glycan_length, pad the left locations with "Z"
-                    # The number of spectra for deep learning could have several denovo results for the samples
-                    num_dl_spectra += 1
-                    # Consider top 10 de novo sequence candidates if the total number greater than 10
-                    # top_ten_candidates = min(len(glycan_deno_lists), 10)
-                    top_one_candidate = min(len(glycan_deno_lists), top_number)
-                    for i in range(top_one_candidate):
-                        # glycan_deno_lists[i] is a tuple like ('NNHHNHHANHNHAA', 954586.3)
-                        glycan_de_novo_sequence = glycan_deno_lists[i][0]
-                        peptide_charge = peptide_name + "_" + charge
-                        peptide_glycan = peptide_name + "_" + glycan_de_novo_sequence
-                        peptide_glycan_charge = peptide_name + "_" + glycan_de_novo_sequence + "_" + charge
-                        glycan_de_novo_intensity = glycan_deno_lists[i][1]
-                        peptides.add(peptide_name)
-                        peptide_charges.add(peptide_charge)
-                        peptide_glycans.add(peptide_glycan)
-                        peptide_glycan_charges.add(peptide_glycan_charge)
-                        # ignore the zeros
-                        if glycan_de_novo_intensity != 0 and total_glcan_intensities != 0:
-                            glycan_de_novo_ratio = glycan_de_novo_intensity / total_glcan_intensities
-                            glycan_intensity_ratio.append(glycan_de_novo_ratio)
-                        else:
-                            print("glycan_de_novo_sequence:", glycan_de_novo_sequence)
-                            print("total_glcan_intensities:", total_glcan_intensities)
-                        num_samples += 1
-
-                    # Should use break here, to successfully end the process of one chunk, and start a new one.
-                    break
+                        sum_intensity = round(intensity, 1)
+                    glycan_intensity[glycan_str] = sum_intensity
+                    total_glcan_intensities += intensity
+
+            glycan_dic = parse_glycan(spectrum.glycans)
+            glycan_str = glycan_to_str(glycan_dic)
+            # Call de novo sequencing to generate linearized glycan string
+            glycan_deno_lists = denovor.de_novo(glycan_str, glycan_intensity)
+
+            # The number of spectra for deep learning could have several denovo results for the samples
+            num_dl_spectra += 1
+            # Consider top N de novo sequence candidates if the total number greater than N
+            top_one_candidate = min(len(glycan_deno_lists), top_number)
+            for i in range(top_one_candidate):
+                # glycan_deno_lists[i] is a tuple like ('NNHHNHHANHNHAA', 954586.3)
+                glycan_de_novo_sequence = glycan_deno_lists[i][0]
+                peptide_charge = peptide_name + "_" + charge
+                peptide_glycan = peptide_name + "_" + glycan_de_novo_sequence
+                peptide_glycan_charge = peptide_name + "_" + glycan_de_novo_sequence + "_" + charge
+                glycan_de_novo_intensity = glycan_deno_lists[i][1]
+                peptides.add(peptide_name)
+                peptide_charges.add(peptide_charge)
+                peptide_glycans.add(peptide_glycan)
+                peptide_glycan_charges.add(peptide_glycan_charge)
+                # ignore the zeros
+                if glycan_de_novo_intensity != 0 and total_glcan_intensities != 0:
+                    glycan_de_novo_ratio = glycan_de_novo_intensity / total_glcan_intensities
+                    glycan_intensity_ratio.append(glycan_de_novo_ratio)
                 else:
-                    current_chunk.append(line.strip())
-            # If there is no new data, end the reading process.
-            if not read:
-                break
+                    print("glycan_de_novo_sequence:", glycan_de_novo_sequence)
+                    print("total_glcan_intensities:", total_glcan_intensities)
+                num_samples += 1
 
         glycan_intensity_avg = sum(glycan_intensity_ratio) / len(glycan_intensity_ratio)
 
@@ -386,12 +306,15 @@ def msp_to_stat(top_number, msp_file, stat_txt, stat_csv):
 
 # Read the path for input folder (MSP) and the top number of de novo sequencing,
 # then calculate the total number of peptides, peptide_charges, and peptide_glycan_charges.
-def parse_msp_statistic(input_type, top_number, input_path):
+def parse_msp_statistic(input_type, top_number, input_path, workers=1, resume='yes'):
     """
     Write the statics file to the folder of "input_path"
     :param input_type: A type for the input folder, such as "N" or "O";
     :param top_number: A value for the top number of de novo sequencing, such as "10";
     :param input_path: A string for the input folder, such as "/data/Training-01-Human-285";
+    :param workers: A value for the number of worker processes to parse the msp files in parallel, such as "8";
+    :param resume: A string, "yes" to skip the msp files whose statistic files are current by the manifest, and merge
+                   their results from the manifest, "no" to parse all of them;
     :return: write a statics file contains the total number of unique peptides and unique peptide-glycansequences, and
     their corresponding sets.
     """
@@ -401,6 +324,9 @@ def parse_msp_statistic(input_type, top_number, input_path):
 
     top_number = int(top_number)
     assert top_number > 0 and top_number < 101, "Wrong Top Number!"
+    workers = int(workers)
+    assert workers > 0, "Wrong Number of Workers!"
+    assert resume in ('yes', 'no'), "Wrong Resume!"
 
     if input_type == 'N':
         msp_path = path_name / 'N-GP-MSP'
@@ -442,28 +368,49 @@ def parse_msp_statistic(input_type, top_number, input_path):
         print("The MSP folder does not exist!")
         return
 
-    # Iterate all the files in the MSP folder
-    for msp_file in msp_path.iterdir():
+    # The manifest of the statistic files, keyed by the names of the msp files.
+    manifest = RunManifest(manifest_file(path_name, stat_path.name),
+                           {'input_type': input_type, 'top_number': top_number},
+                           code_version(*source_files), resume == 'yes')
+
+    # Iterate all the files in the MSP folder, sorted by the names to merge the results in the same order.
+    tasks = []
+    results = []
+    for msp_file in sorted(msp_path.iterdir()):
         # Judge whether msp is a folder, only open it as a msp file
         # Example: 202110_Palleon_Cyno_In_vitro-20211027_Palleon_A_HILIC_HCDFT.msp
         if not msp_file.is_file():
             print("There is a folder in the MSP folder!")
             continue
-        if msp_file.suffix != '.msp':
-           print("There is a file whose type is not msp!")
-           continue
-        time_read_msp = time.time()
+        # A compressed msp file, such as "sample.msp.gz", is checked by its name without the compression.
+        msp_plain_file = split_compression(msp_file)[0]
+        if msp_plain_file.suffix != '.msp':
+            print("There is a file whose type is not msp!")
+            continue
         # Get the filename without the extension.
-        msp_stem = msp_file.stem
+        msp_stem = msp_plain_file.stem
         # Generate the name for a stat file, and the whole path/file for it.
         stat_txt = f'{msp_stem}.txt'
         stat_path_txt = stat_path / stat_txt
         stat_csv = f'{msp_stem}.csv'
         stat_path_csv = stat_path / stat_csv
+        if manifest.is_current(msp_file.name, [msp_file], [stat_path_txt, stat_path_csv]):
+            print(f"The statistic files of the msp file are current: {msp_file.name}")
+            # The sets are recorded as the sorted lists in the manifest.
+            result = manifest.result(msp_file.name)
+            results.append((tuple(result[:3]) + tuple(set(r) for r in result[3:7]) + (result[7],), 0))
+            continue
+        tasks.append((top_number, msp_file, stat_path_txt, stat_path_csv))
 
-        num_spectra_file, num_dl_spectra_file, num_samples_file, peptides, peptide_charges, peptide_glycans, \
-        peptide_glycan_charges, glycan_intensity_ratio = msp_to_stat(top_number, msp_file, stat_path_txt, stat_path_csv)
+    # Each file is processed by a worker, and each finished file is recorded into the manifest at once.
+    for task, (result, process_time) in zip(tasks, iter_tasks(msp_to_stat, tasks, workers)):
+        manifest.record(task[1].name, [task[1]], task[2:4],
+                        list(result[:3]) + [sorted(r) for r in result[3:7]] + [result[7]])
+        results.append((result, process_time))
 
+    # The results are merged for the current files and the parsed files.
+    for (num_spectra_file, num_dl_spectra_file, num_samples_file, peptides, peptide_charges, peptide_glycans,
+         peptide_glycan_charges, glycan_intensity_ratio), process_time in results:
         total_num_files += 1
         total_num_spectra += num_spectra_file
         total_num_dl_spectra += num_dl_spectra_file
@@ -474,9 +421,6 @@ def parse_msp_statistic(input_type, top_number, input_path):
         total_peptide_glycans = total_peptide_glycans | peptide_glycans
         total_peptide_glycan_charges = total_peptide_glycan_charges | peptide_glycan_charges
         total_glycan_intensity_ratio.extend(glycan_intensity_ratio)
-
-        time_write_stat = time.time()
-        process_time = time_write_stat - time_read_msp
         print(f"The time for reading the msp file, then write the statistic file: {process_time}")
 
     time_end_stat = time.asctime(time.localtime(time.time()))
@@ -511,16 +455,18 @@ def parse_msp_statistic(input_type, top_number, input_path):
 
 
 #  CLI (command line interface) for the input and output
-def user_interface(input_type, top_number, input_path):
+def user_interface(input_type, top_number, input_path, workers, resume):
     """
     Get the folder by the input type and input path for the CSV files
     :param input_type: A string for the folder of input type;
     :param top_number: A value for the top number of de novo sequencing, such as "10";
-    :param input_path: A string for the folder of input path.
+    :param input_path: A string for the folder of input path;
+    :param workers: A value for the number of worker processes;
+    :param resume: A string, "yes" to skip the msp files whose statistic files are current, "no" to parse all of them.
     :return: The output of CSV files.
     """
-    #  python parse_msp_data.py -IT=N -TN=10 -IP=/data/Training-2021-D-Va--Human
-    parse_msp_statistic(input_type, top_number, input_path)
+    #  python parse_msp_to_stat.py -IT=N -TN=10 -IP=/data/Training-2021-D-Va--Human -WN=8
+    parse_msp_statistic(input_type, top_number, input_path, workers, resume)
 
 
 """
@@ -528,6 +474,8 @@ Input parameters for the user interface:
     1   Input Glyco Peptide Type
     2   Input Top Number of De Novo Sequencing
     3   Input File Path Name
+    4   Input Number of Workers
+    5   Resume the run by the manifest
 """
 parser = argparse.ArgumentParser(description='Input parameters to run the script.')
 parser.add_argument('--InputType', '-IT',
@@ -538,6 +486,13 @@ parser.add_argument('--TopNumber', '-TN',
                          'sequencing.', required=False, default='1')
 parser.add_argument('--InputPath', '-IP', help='Input Path parameter，required，no default. Such as /data/Training-01-Human-285.',
                     required=False)
+parser.add_argument('--Workers', '-WN',
+                    help='Workers parameter，not required, has default. The number of worker processes to parse the msp '
+                         'files in parallel.', required=False, default='1')
+parser.add_argument('--Resume', '-RS',
+                    help='Resume parameter，not required, has default. yes-skip the msp files whose statistic files are '
+                         'current by the manifest in the MANIFEST folder; no-parse all the msp files again.',
+                    required=False, default='yes')
 
 args = parser.parse_args()
 
@@ -551,7 +506,7 @@ if __name__ == "__main__":
     # nohup python -u parse_msp_to_csv.py -IT=N -TOP=10 -IP=/data/Training-01-Human-285 > Training-01-Human-285_out.out 2>&1 &
 
     try:
-        user_interface(args.InputType, args.TopNumber, args.InputPath)
+        user_interface(args.InputType, args.TopNumber, args.InputPath, args.Workers, args.Resume)
     except Exception as e:
         print(e)
 
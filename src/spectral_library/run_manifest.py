@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script keeps a manifest for a stage of the pipeline, such as parse_msp_to_csv.py, so a run only processes the
+input files whose outputs are not current, and an interrupted run resumes from the files which are not finished.
+For each input file, the manifest records the sha256 of the contents of the inputs, the parameters of the stage
+(such as the input type and the top number), the version of the code (the sha256 of the source files of the stage),
+the outputs, and the result (such as the counters of the file) to merge the totals without reading the file again.
+The outputs are current when all of them are the same and the outputs exist.
+The hash of an input is reused while the size and the modified time of the file are not changed.
+
+The manifests are written as json files into the "MANIFEST" folder of the input path, one for the output folder of
+a stage, such as "/data/Training-01-Human-285/MANIFEST/N-GP-CSV-TOP-10.json".
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+# The folder of the source files for the versions of the code.
+source_path = Path(__file__).resolve().parent
+# The size of the chunks to hash a file.
+chunk_size = 1 << 20
+
+
+def file_hash(file):
+    """
+    :param file: a file, or a folder such as a columnar folder, whose files are hashed in the order of the names;
+    :return: the sha256 of the contents in hex.
+    """
+    file = Path(file)
+    sha256 = hashlib.sha256()
+    files = sorted(f for f in file.rglob('*') if f.is_file()) if file.is_dir() else [file]
+    for each_file in files:
+        if file.is_dir():
+            sha256.update(each_file.relative_to(file).as_posix().encode())
+        with open(each_file, 'rb') as reader:
+            for chunk in iter(lambda: reader.read(chunk_size), b''):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def file_state(file):
+    """
+    :param file: a file or a folder;
+    :return: a list of the size and the modified time in nanoseconds, the total for a folder.
+    """
+    file = Path(file)
+    files = [f for f in file.rglob('*') if f.is_file()] if file.is_dir() else [file]
+    states = [os.stat(f) for f in files]
+    return [sum(s.st_size for s in states), max((s.st_mtime_ns for s in states), default=0)]
+
+
+def code_version(*source_files):
+    """
+    :param source_files: the names of the source files of a stage in the folder of this script, such as
+                         "parse_msp_to_csv.py" and "de_novo_sequencing.py";
+    :return: the sha256 of the source files in hex, which is changed by any change of the code.
+    """
+    sha256 = hashlib.sha256()
+    for source_file in source_files:
+        sha256.update(Path(source_file).name.encode())
+        sha256.update((source_path / Path(source_file).name).read_bytes())
+    return sha256.hexdigest()
+
+
+def manifest_file(input_path, output_name):
+    """
+    :param input_path: the input folder, such as "/data/Training-01-Human-285";
+    :param output_name: the name of the output folder of a stage, such as "N-GP-CSV-TOP-10";
+    :return: the manifest file, such as "/data/Training-01-Human-285/MANIFEST/N-GP-CSV-TOP-10.json".
+    """
+    return Path(input_path) / 'MANIFEST' / f'{output_name}.json'
+
+
+class RunManifest:
+    """
+    The manifest of a stage, the entries are keyed by the names of the input files.
+    """
+    def __init__(self, manifest_file, parameters, version, resume=True):
+        """
+        :param manifest_file: the json file of the manifest;
+        :param parameters: a dictionary of the parameters of the stage, such as {'input_type': 'N', 'top_number': 10};
+        :param version: the version of the code from "code_version";
+        :param resume: if False, all the inputs are processed again, and the manifest is written again.
+        """
+        self.manifest_file = Path(manifest_file)
+        self.parameters = json.loads(json.dumps(parameters))
+        self.version = version
+        # The outputs are recorded relative to the input folder, the parent of the "MANIFEST" folder.
+        self.root_path = self.manifest_file.resolve().parent.parent
+        self.entries = {}
+        self.pending = {}
+        if resume and self.manifest_file.exists():
+            with open(self.manifest_file) as reader:
+                self.entries = json.load(reader)
+        self.num_skipped = 0
+
+    def _input_hashes(self, input_files, entry=None):
+        """
+        :param input_files: the input files of a key;
+        :param entry: the entry recorded (or the hashes computed before) for the key, whose hashes are reused for the
+                      unchanged files;
+        :return: a dictionary of the names of the input files to the lists of [size, modified time, sha256].
+        """
+        recorded = entry['inputs'] if entry else {}
+        hashes = {}
+        for input_file in input_files:
+            input_file = Path(input_file)
+            state = file_state(input_file)
+            recorded_state = recorded.get(input_file.name)
+            if recorded_state and recorded_state[:2] == state:
+                hashes[input_file.name] = recorded_state
+            else:
+                hashes[input_file.name] = state + [file_hash(input_file)]
+        return hashes
+
+    def is_current(self, key, input_files, output_files=None):
+        """
+        :param key: the name of the input, such as "sample.msp";
+        :param input_files: the input files, such as the mgf file and the gLabel file;
+        :param output_files: the output files or folders, such as the csv file and the denovo msp file, or None for
+                             the outputs which are known after writing them, such as the shards;
+        :return: True if the outputs were written from the same inputs, parameters and code, and all exist.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry['parameters'] != self.parameters or entry['version'] != self.version:
+            return False
+        if output_files is not None and entry['outputs'] != self._output_names(output_files):
+            return False
+        if not all((self.root_path / f).exists() for f in entry['outputs']):
+            return False
+        input_hashes = self._input_hashes(input_files, entry)
+        # Keep the hashes for the record after the input is processed again.
+        self.pending[key] = input_hashes
+        if {n: h[2] for n, h in input_hashes.items()} != {n: h[2] for n, h in entry['inputs'].items()}:
+            return False
+        # The inputs could be touched without any change, keep the new states to avoid hashing them again.
+        if input_hashes != entry['inputs']:
+            entry['inputs'] = input_hashes
+            self.save()
+        self.num_skipped += 1
+        return True
+
+    def _output_names(self, output_files):
+        """
+        :param output_files: the output files or folders;
+        :return: the sorted names of the outputs relative to the input folder, such as "N-GP-CSV-TOP-10/sample.csv".
+        """
+        return sorted(Path(f).resolve().relative_to(self.root_path).as_posix() for f in output_files)
+
+    def result(self, key):
+        """
+        :param key: the name of the input;
+        :return: the result recorded for the input, such as the counters of the file.
+        """
+        return self.entries[key]['result']
+
+    def record(self, key, input_files, output_files, result=None):
+        """
+        Record the outputs of an input after they are written, and save the manifest at once, so an interrupted run
+        resumes after the last finished file.
+        :param key: the name of the input;
+        :param input_files: the input files;
+        :param output_files: the output files or folders;
+        :param result: the result of the input which could be written into json, such as the counters of the file.
+        """
+        self.entries[key] = {
+            'inputs': self._input_hashes(input_files, {'inputs': self.pending.pop(key, {})}),
+            'parameters': self.parameters,
+            'version': self.version,
+            'outputs': self._output_names(output_files),
+            'result': result,
+        }
+        self.save()
+
+    def save(self):
+        """
+        Write the manifest into a temporary file, then replace the manifest, which is not broken by an interruption.
+        """
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file = self.manifest_file.with_name(self.manifest_file.name + '.tmp')
+        with open(temporary_file, 'w') as writer:
+            json.dump(self.entries, writer, indent=1, sort_keys=True)
+        os.replace(temporary_file, self.manifest_file)
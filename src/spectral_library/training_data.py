@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+###################################################################################################################
+This script writes and reads the training data in a columnar format, which replaces the lists in the csv cells.
+A columnar folder has one npy file for each column:
+    tokens.npy          uint8 (N, 50), the index of each letter of the glycopeptide in the codes;
+    charges.npy         uint8 (N,);
+    precursor_masses.npy, retention_times.npy   float64 (N,);
+    peak_offsets.npy    int64 (N + 1,), the peaks of the sample i are in [peak_offsets[i], peak_offsets[i + 1]);
+    mzs.npy, intensities.npy    float64 (total number of peaks,);
+    ions.npy, positions.npy, ion_charges.npy    uint8 (total number of peaks,).
+The npy files are loaded with memory mapping, so the samples are read as NumPy views without copying or "eval".
+
+The training data could also be written as shards of the dense tensors (X, X_meta, y) for the deep learning model,
+each shard is an npz file with X uint8 (n, 50) of the tokens, X_meta int64 (n, 1), and the sparse y of the samples:
+    y_shape (49, 36), y_offsets int64 (n + 1,), y_indices uint16 and y_values float32 for the non-zero cells.
+A sparse y of a sample is a tuple of (shape, flat indices, values), which is densified for each batch by the trainer.
+The tokens of X are looked up by the embedding of the model, the one hot encoding (50, 26) is never expanded.
+
+Created on 18 October 2026.
+###################################################################################################################
+"""
+__author__ = 'ZLiang'
+
+
+from array import array
+from functools import lru_cache
+from pathlib import Path
+import shutil
+import numpy as np
+
+
+# Assume the maximum length of peptide is 32, and maximum length of glycan is 18.
+# The maximum charge of glycopeptide is 4.
+# The maximum number of ions is 9 (b, b$, b-N(1), y, y$, y-N(1), Y, Y0, Y$).
+MAX_PEPTIDE_LENGTH = 32
+MAX_GLYCAN_LENGTH = 18
+MAX_NUM_CHARGES = 4
+MAX_NUM_IONS = 9
+
+# sequence length
+SEQ_LEN = MAX_PEPTIDE_LENGTH + MAX_GLYCAN_LENGTH
+
+# 20 amino acids, 5 monosaccharides and "Z" for the empty one, the same codes as the one hot encoding.
+amino_acid_monosaccharide_zero_codes = "ACDEFGHJKMNPQRSTVWXY!@#$%Z"
+
+
+@lru_cache(maxsize=None)
+def code_table(code):
+    """
+    :param code: A string contains all the letters, such as "ACDEFGHJKMNPQRSTVWXY!@#$%Z".
+    :return: A look-up table from a byte of the letter to its token, 255 for the letters which are not in the code.
+    """
+    table = np.full(256, 255, dtype=np.uint8)
+    table[np.frombuffer(code.encode(), dtype=np.uint8)] = np.arange(len(code), dtype=np.uint8)
+    table.flags.writeable = False
+    return table
+
+
+# Look-up table from a byte of the letter to its token, 255 for the letters which are not in the codes.
+token_table = code_table(amino_acid_monosaccharide_zero_codes)
+
+# The columns for each sample, and the columns for each peak.
+sample_columns = {
+    'tokens': np.uint8,
+    'charges': np.uint8,
+    'precursor_masses': np.float64,
+    'retention_times': np.float64,
+}
+peak_columns = {
+    'mzs': np.float64,
+    'intensities': np.float64,
+    'ions': np.uint8,
+    'positions': np.uint8,
+    'ion_charges': np.uint8,
+}
+# Consider nine different types of ions:
+# b ions: 0 - b3, 1 - b$3, 2 - b3-N(1);
+# y ions: 3 - y3, 4 - y$3, 5 - y3-N(1);
+# Y ions: 6 - Y0, 7 - Y$,  8 - Y-N(1).
+# The max position of the ion is limited to "seq_len".
+# For the length glycopeptide of 32+18 = 50, we have 30 for peptide, 19 for glycan (17 for Y, 2 for Y0 and Y$).
+# Use "b, b$, b-N(1), y, y$, y-N(1), Y, Y0, y$" to represent ions, and times the maximum charges,
+# then the space is 9*4 = 36.
+# The row of y is "base + sign * position", y ions use "max_peptide_length - position - 1",
+# b and Y ions keep "position - 1"; the column of y is "(ion_charge - 1) * MAX_NUM_IONS + offset".
+ion_position_base = np.array([-1, -1, -1, MAX_PEPTIDE_LENGTH - 1, MAX_PEPTIDE_LENGTH - 1, MAX_PEPTIDE_LENGTH - 1,
+                              -1, -1, -1], dtype=np.int64)
+ion_position_sign = np.array([1, 1, 1, -1, -1, -1, 1, 1, 1], dtype=np.int64)
+ion_offset = np.arange(MAX_NUM_IONS, dtype=np.int64)
+
+# The type codes of "array" for appending the values.
+array_types = {np.uint8: 'B', np.float64: 'd', np.int64: 'q'}
+
+
+def encode_tokens(glycopeptide_name):
+    """
+    :param glycopeptide_name: A string with the length of 50, such as "XSXHRPAXEDXXXGSEAJXTCTXTGXRZZZZZ@!@!!@!!@$ZZZZZZZZ".
+    :return: A NumPy uint8 array with the index of each letter in the codes.
+    """
+    tokens = code_tokens(glycopeptide_name, amino_acid_monosaccharide_zero_codes)
+    if len(tokens) != SEQ_LEN or np.any(tokens == 255):
+        print("Token encoding failed - unexpected letter in this name")
+        print(glycopeptide_name)
+        raise AssertionError
+    return tokens
+
+
+def code_tokens(values, code):
+    """
+    :param values: A string whose letter belongs to the code, such as "XSXHRPAXEDXXXGSEAJXTCTXTGXRZZZZZ@!@!!@!!@$ZZZZZZZZ".
+    :param code: A string contains all the letters for the values, such as "ACDEFGHJKMNPQRSTVWXY!@#$%Z".
+    :return: A NumPy uint8 array with the index of each letter in the code, 255 for the letters not in the code.
+    """
+    return code_table(code)[np.frombuffer(values.encode(), dtype=np.uint8)]
+
+
+def decode_tokens(tokens, code=amino_acid_monosaccharide_zero_codes):
+    """
+    :param tokens: A NumPy array or a list of tokens, such as (50,);
+    :param code: A string contains all the letters for the tokens, such as "ACDEFGHJKMNPQRSTVWXY!@#$%Z".
+    :return: The string of the tokens, such as "XSXHRPAXEDXXXGSEAJXTCTXTGXRZZZZZ@!@!!@!!@$ZZZZZZZZ".
+    """
+    return np.frombuffer(code.encode(), dtype=np.uint8)[np.asarray(tokens, dtype=np.intp)].tobytes().decode()
+
+
+def tokens_to_one_hot(tokens):
+    """
+    :param tokens: A NumPy array of tokens, such as (50,) or (N, 50);
+    :return: The one hot encoding, such as (50, 26) or (N, 50, 26), the same as np.array of the csv lists.
+    """
+    return np.eye(len(amino_acid_monosaccharide_zero_codes), dtype=np.int64)[tokens]
+
+
+class TrainingDataWriter(object):
+    """
+    Write the samples into a columnar folder, it has the same "writerow" as a csv writer.
+    """
+    def __init__(self, path):
+        """
+        :param path: the columnar folder to write.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.columns = {column: array(array_types[dtype]) for column, dtype in sample_columns.items()}
+        self.columns.update({column: array(array_types[dtype]) for column, dtype in peak_columns.items()})
+        self.peak_offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.peak_offsets) - 1
+
+    def writerow(self, row_dictionary):
+        """
+        :param row_dictionary: A dictionary of a sample, 'glycopeptide' is the name with the length of 50,
+                               the peak columns such as 'mzs' are lists with the same length.
+        """
+        self.columns['tokens'].frombytes(encode_tokens(row_dictionary['glycopeptide']).tobytes())
+        self.columns['charges'].append(row_dictionary['charge'])
+        self.columns['precursor_masses'].append(row_dictionary['precursor_mass'])
+        self.columns['retention_times'].append(float(row_dictionary['retention_time']))
+        for column in peak_columns:
+            self.columns[column].extend(row_dictionary[column])
+        self.peak_offsets.append(len(self.columns['mzs']))
+
+    def close(self):
+        """
+        Write the columns into npy files.
+        """
+        for column, dtype in list(sample_columns.items()) + list(peak_columns.items()):
+            values = np.frombuffer(self.columns[column], dtype=dtype) if len(self.columns[column]) \
+                else np.zeros(0, dtype=dtype)
+            if column == 'tokens':
+                values = values.reshape(-1, SEQ_LEN)
+            np.save(self.path / f'{column}.npy', values)
+        np.save(self.path / 'peak_offsets.npy', np.frombuffer(self.peak_offsets, dtype=np.int64))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TrainingData(object):
+    """
+    Read the samples from a columnar folder, the columns are memory mapped NumPy arrays.
+    """
+    def __init__(self, path, mmap_mode='r'):
+        """
+        :param path: the columnar folder to read;
+        :param mmap_mode: the memory mapping mode of np.load, None to load the columns into the memory.
+        """
+        self.path = Path(path)
+        for column in list(sample_columns) + list(peak_columns) + ['peak_offsets']:
+            setattr(self, column, np.load(self.path / f'{column}.npy', mmap_mode=mmap_mode))
+
+    def __len__(self):
+        return len(self.charges)
+
+    def peaks(self, i):
+        """
+        :param i: the index of a sample;
+        :return: A dictionary of the views of the peak columns for the sample, such as {'mzs': array([...]), ...}.
+        """
+        start, end = self.peak_offsets[i], self.peak_offsets[i + 1]
+        return {column: getattr(self, column)[start:end] for column in peak_columns}
+
+
+def is_training_data(path):
+    """
+    :param path: a path to check;
+    :return: True if the path is a columnar folder.
+    """
+    return Path(path).is_dir() and (Path(path) / 'peak_offsets.npy').exists()
+
+
+def merge_training_data(part_paths, path):
+    """
+    Join the columnar folders into one in the order of the parts, then remove the parts.
+    :param part_paths: a list of the columnar folders, such as the parts of the byte ranges of an msp file;
+    :param path: the columnar folder to write.
+    :return: the total number of samples.
+    """
+    parts = [TrainingData(part_path) for part_path in part_paths]
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for column in list(sample_columns) + list(peak_columns):
+        np.save(path / f'{column}.npy', np.concatenate([getattr(part, column) for part in parts]))
+    peak_offsets = [np.zeros(1, dtype=np.int64)]
+    total_peaks = 0
+    for part in parts:
+        peak_offsets.append(part.peak_offsets[1:] + total_peaks)
+        total_peaks += int(part.peak_offsets[-1])
+    np.save(path / 'peak_offsets.npy', np.concatenate(peak_offsets))
+    num_samples = sum(len(part) for part in parts)
+    del parts
+    for part_path in part_paths:
+        shutil.rmtree(part_path)
+    return num_samples
+
+
+class ShardWriter(object):
+    """
+    Write the samples into the shards of the dense tensors (X, X_meta, y), it has the same "writerow" as a csv writer.
+    The shards are named as "{prefix}-00000.npz", "{prefix}-00001.npz" and so on.
+    """
+    def __init__(self, prefix, shard_size=4096):
+        """
+        :param prefix: the path and the prefix of the shard files, such as "/data/N-GP-SHARD-TOP-1/sample";
+        :param shard_size: the maximum number of samples in a shard.
+        """
+        self.prefix = Path(prefix)
+        self.prefix.parent.mkdir(parents=True, exist_ok=True)
+        self.shard_size = int(shard_size)
+        assert self.shard_size > 0, "Wrong Shard Size!"
+        # Remove the old shards of the prefix, like a file opened with "w".
+        for shard_file in shard_files(self.prefix):
+            shard_file.unlink()
+        self.shard_files = []
+        self.num_samples = 0
+        self.Xs = []
+        self.X_metas = []
+        self.peaks = {column: [] for column in ['intensities', 'ions', 'positions', 'ion_charges']}
+        self.peak_offsets = [0]
+
+    def __len__(self):
+        return self.num_samples
+
+    def writerow(self, row_dictionary):
+        """
+        :param row_dictionary: A dictionary of a sample, 'glycopeptide' is the name with the length of 50,
+                               the peak columns such as 'intensities' are lists with the same length.
+        """
+        self.Xs.append(encode_tokens(row_dictionary['glycopeptide']))
+        self.X_metas.append(row_dictionary['charge'])
+        for column, values in self.peaks.items():
+            values.extend(row_dictionary[column])
+        self.peak_offsets.append(len(self.peaks['intensities']))
+        self.num_samples += 1
+        if len(self.Xs) == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the samples in the memory into a shard, y is constructed for all the samples in the shard at once.
+        """
+        if not self.Xs:
+            return
+        shard_file = self.prefix.with_name(f'{self.prefix.name}-{len(self.shard_files):05d}.npz')
+        ys = samples_to_y(self.peaks['intensities'], self.peaks['ions'], self.peaks['positions'],
+                          self.peaks['ion_charges'], self.peak_offsets)
+        y_offsets, y_indices, y_values = sparse_y_columns(ys)
+        np.savez(shard_file,
+                 X=np.stack(self.Xs),
+                 X_meta=np.array(self.X_metas, dtype=np.int64).reshape(-1, 1),
+                 y_shape=np.array(ys.shape[1:], dtype=np.int64),
+                 y_offsets=y_offsets,
+                 y_indices=y_indices,
+                 y_values=y_values.astype(np.float32))
+        self.shard_files.append(shard_file)
+        self.Xs = []
+        self.X_metas = []
+        self.peaks = {column: [] for column in self.peaks}
+        self.peak_offsets = [0]
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def shard_files(prefix):
+    """
+    :param prefix: the path and the prefix of the shard files;
+    :return: a sorted list of the shard files for the prefix.
+    """
+    prefix = Path(prefix)
+    return sorted(prefix.parent.glob(f'{prefix.name}-[0-9][0-9][0-9][0-9][0-9].npz'))
+
+
+def merge_shards(part_prefixes, prefix):
+    """
+    Rename the shards of the parts in order, as the shards of the prefix.
+    :param part_prefixes: a list of the prefixes of the parts, such as the parts of the byte ranges of an msp file;
+    :param prefix: the path and the prefix of the shard files.
+    :return: a list of the shard files.
+    """
+    prefix = Path(prefix)
+    for shard_file in shard_files(prefix):
+        shard_file.unlink()
+    merged_files = []
+    for part_prefix in part_prefixes:
+        for part_file in shard_files(part_prefix):
+            shard_file = prefix.with_name(f'{prefix.name}-{len(merged_files):05d}.npz')
+            part_file.rename(shard_file)
+            merged_files.append(shard_file)
+    return merged_files
+
+
+def load_shard(shard_file):
+    """
+    :param shard_file: a shard file;
+    :return: a list of (X, X_meta, y) for the samples, the same structure as the data in a pkl file,
+             y is a sparse y of (shape, flat indices, values).
+    """
+    with np.load(shard_file) as shard:
+        y_shape = tuple(shard['y_shape'].tolist())
+        y_offsets = shard['y_offsets']
+        ys = [(y_shape, shard['y_indices'][start:end], shard['y_values'][start:end])
+              for start, end in zip(y_offsets[:-1], y_offsets[1:])]
+        return list(zip(shard['X'], shard['X_meta'], ys))
+
+
+def samples_to_y(intensities, ions, positions, ion_charges, peak_offsets):
+    """
+    Arrange the ion intensities of a batch of samples to the corresponding places of y (n, 49, 36) at once.
+    The peaks of all the samples are concatenated, the peaks of the sample i are in
+    [peak_offsets[i], peak_offsets[i + 1]), the same as the columns of a columnar folder.
+    :param intensities: the intensities of the peaks;
+    :param ions: the ions of the peaks, such as 0 for b ions;
+    :param positions: the positions of the peaks;
+    :param ion_charges: the charges of the peaks;
+    :param peak_offsets: the offsets of the peaks for the samples, with the length of n + 1;
+    :return: y for each sample normalized by the summary of its total intensities.
+    """
+    # The uint8 columns should be converted, to avoid the overflow of "MAX_PEPTIDE_LENGTH - positions - 1".
+    ions = np.minimum(np.asarray(ions, dtype=np.int64), MAX_NUM_IONS - 1)
+    positions = np.asarray(positions, dtype=np.int64)
+    ion_charges = np.asarray(ion_charges, dtype=np.int64)
+    peak_offsets = np.asarray(peak_offsets, dtype=np.int64)
+    num_samples = len(peak_offsets) - 1
+    sample_indices = np.repeat(np.arange(num_samples), np.diff(peak_offsets))
+    # Look up the place of each peak from the tables, then add the intensities of the same places together.
+    rows = ion_position_base[ions] + ion_position_sign[ions] * positions
+    columns = (ion_charges - 1) * MAX_NUM_IONS + ion_offset[ions]
+    ys = np.zeros((num_samples, SEQ_LEN - 1, MAX_NUM_IONS * MAX_NUM_CHARGES))
+    np.add.at(ys, (sample_indices, rows, columns), np.asarray(intensities, dtype=np.float64))
+    # Normalization by the summary of the total intensities of each sample.
+    ys /= ys.reshape(num_samples, -1).sum(axis=1).reshape(-1, 1, 1)
+    return ys
+
+
+def spectrum_to_y(intensities, ions, positions, ion_charges):
+    """
+    Arrange the ion intensities of a sample to the corresponding places of y (49, 36).
+    :param intensities: the intensities of the peaks;
+    :param ions: the ions of the peaks, such as 0 for b ions;
+    :param positions: the positions of the peaks;
+    :param ion_charges: the charges of the peaks;
+    :return: y normalized by the summary of the total intensities.
+    """
+    return samples_to_y(intensities, ions, positions, ion_charges, [0, len(intensities)])[0]
+
+
+def sparse_y_columns(ys):
+    """
+    :param ys: the dense y of the samples, such as (n, 49, 36);
+    :return: the offsets (n + 1,), the flat indices and the values of the non-zero cells for the samples.
+    """
+    flat_ys = ys.reshape(len(ys), -1)
+    sample_indices, y_indices = np.nonzero(flat_ys)
+    y_offsets = np.zeros(len(ys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sample_indices, minlength=len(ys)), out=y_offsets[1:])
+    return y_offsets, y_indices.astype(np.uint16), flat_ys[sample_indices, y_indices]
+
+
+def sparse_y(ys):
+    """
+    Convert the dense y of the samples into the sparse y, which are about 40 non-zero cells of 1764.
+    :param ys: the dense y of the samples, such as (n, 49, 36);
+    :return: a list of (shape, flat indices, values) for the samples, the values keep the type of ys.
+    """
+    y_offsets, y_indices, y_values = sparse_y_columns(ys)
+    y_shape = tuple(ys.shape[1:])
+    return [(y_shape, y_indices[start:end], y_values[start:end]) for start, end in zip(y_offsets[:-1], y_offsets[1:])]
+
+
+def densify_y(y):
+    """
+    :param y: a sparse y of (shape, flat indices, values), or a dense y which is returned as it is;
+    :return: the dense y.
+    """
+    if isinstance(y, tuple):
+        shape, indices, values = y
+        dense_y = np.zeros(shape)
+        dense_y.flat[indices] = values
+        return dense_y
+    return y
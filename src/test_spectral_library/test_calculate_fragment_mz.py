@@ -13,6 +13,7 @@ Created on 24 February 2022 for the unit test using pytest.
 __author__ = 'ZLiang'
 
 import pytest
+import numpy as np
 from spectral_library.calculate_fragment_mz import CalculateFragmentMZ
 
 def test_reverse_one_hot_encode():
@@ -254,6 +255,15 @@ def test_reverse_one_hot_encode():
     # Use assert to check the result
     assert result_4 == "XSXHRPAXEDXXXGSEAJXTCTXTGXRZZZZZ@!@!!@!!@$ZZZZZZZZ"
 
+    # Test Case 5: the tokens of the one hot encoding
+    tokens_5 = np.array([vector.index(1) for vector in vectors_4], dtype=np.uint8)
+    assert calculator.reverse_token_encode(tokens_5, code_4) == result_4
+    assert calculator.reverse_one_hot_encode(np.eye(26, dtype=int)[tokens_5].tolist(), code_4) == result_4
+    with pytest.raises(ValueError):
+        calculator.reverse_token_encode("001", code_4)
+    with pytest.raises(ValueError):
+        calculator.reverse_one_hot_encode([[0, 0, 0]], code_4)
+
 
 def test_calculate_fragment_mz():
     # Initialization
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests reading and writing the compressed files by the suffix.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+from pathlib import Path
+from spectral_library.compressed_io import open_file, split_compression, find_file, is_compressed
+from spectral_library.msp_index import MSPIndex
+from spectral_library.msp_reader import read_msp, split_msp_ranges
+
+msp_text = (
+    "Name: run.3200.3200.5.0.dta\n"
+    "MW: 752.10299\n"
+    "Comment: CHARGE=5+\tRTINSECONDS=351.1281\tPEPTIDE=HPHJJSSDLHPHK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=5,4,0,0,2\tGLYCANS=H(5)N(4)G(2)\n"
+    "Num Peaks: 2\n"
+    "235.119\t9667.3\tb2+1\n"
+    "695.045\t1616.6\tY-H(4)N(3)+4\n"
+    "\n"
+    "Name: run.3300.3300.3.0.dta\n"
+    "MW: 1030.0249\n"
+    "Comment: CHARGE=3+\tRTINSECONDS=5680.6674\tPEPTIDE=SVQEIQATFFYFTPJK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=7,6,0,3,0\tGLYCANS=H(7)N(6)A(3)\n"
+    "Num Peaks: 1\n"
+    "1030.023\t1885.5\tY0+3\n"
+)
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".xz", ".bz2"])
+def test_compressed_io(tmp_path, suffix):
+    msp_file = tmp_path / f"sample.msp{suffix}"
+    with open_file(msp_file, 'w') as writer:
+        writer.write(msp_text)
+
+    # Test Case 1: the file is compressed on the disk, and the same text is read back
+    assert msp_file.read_bytes() != msp_text.encode()
+    with open_file(msp_file) as reader:
+        assert reader.read() == msp_text
+    assert is_compressed(msp_file)
+    assert split_compression(msp_file) == (tmp_path / "sample.msp", suffix)
+
+    # Test Case 2: the spectra are the same as those in the plain file
+    plain_file = tmp_path / "sample.msp"
+    plain_file.write_text(msp_text)
+    spectra = list(read_msp(msp_file))
+    plain_spectra = list(read_msp(plain_file))
+    assert [s.header_lines for s in spectra] == [s.header_lines for s in plain_spectra]
+    assert [s.annotations for s in spectra] == [s.annotations for s in plain_spectra]
+
+    # Test Case 3: a compressed file could not be split by the byte offsets
+    assert split_msp_ranges(msp_file, 4) == [(0, None)]
+
+    # Test Case 4: the index for the compressed file
+    with MSPIndex(msp_file) as msp_index:
+        assert len(msp_index) == 2
+        assert msp_index.get_spectrum(1).glycans == "H(7)N(6)A(3)"
+
+
+def test_plain_file(tmp_path):
+    plain_file = tmp_path / "sample.mgf-glabel.txt"
+    assert split_compression("sample.csv") == (Path("sample.csv"), '')
+    assert not is_compressed(plain_file)
+
+    # Test Case 1: neither the plain nor the compressed file exists
+    assert find_file(plain_file) == plain_file
+
+    # Test Case 2: only the compressed file exists
+    compressed_file = tmp_path / "sample.mgf-glabel.txt.xz"
+    with open_file(compressed_file, 'w') as writer:
+        writer.write("title\n")
+    assert find_file(plain_file) == compressed_file
+
+    # Test Case 3: the plain file is preferred
+    plain_file.write_text("title\n")
+    assert find_file(plain_file) == plain_file
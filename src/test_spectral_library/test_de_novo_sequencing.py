@@ -12,7 +12,8 @@ Created on 25 February 2022 for the unit test using pytest.
 __author__ = 'ZLiang'
 
 import pytest
-from spectral_library.de_novo_sequencing import DeNovoSequencing
+from spectral_library.de_novo_sequencing import DeNovoSequencing, glycan_str_to_vector, glycan_vector_to_str, \
+    pack_glycan, unpack_glycan, packed_contain, containment_parents, pack_spectra
 
 def test_count_total():
     # Initialization
@@ -219,6 +220,25 @@ def test_glycan_str_to_list():
     assert result_7 == "HHHHHHHHHHHNNNNNNNNNNNFAG"
 
 
+def test_packed_glycan():
+    # Test Case 1: the glycan strings are converted to the vectors and back
+    assert glycan_str_to_vector("1529111111") == (15, 29, 11, 11, 11)
+    assert glycan_vector_to_str((5, 4, 0, 0, 2)) == "0504000002"
+
+    # Test Case 2: the packed glycans are unpacked to the same vectors
+    assert unpack_glycan(pack_glycan((15, 29, 11, 11, 11))) == (15, 29, 11, 11, 11)
+    assert unpack_glycan(pack_glycan((1, 0, 2, 0, 3)) + pack_glycan((1, 1, 0, 0, 0))) == (2, 1, 2, 0, 3)
+
+    # Test Case 3: the containment is the same as glycan_contain()
+    denovor = DeNovoSequencing()
+    glycan_pairs = [("0902010000", "1003010000"), ("0912010000", "1509010000"), ("0000000000", "1529111111"),
+                    ("1529111111", "1529111111"), ("0000000010", "0101010100"), ("0100000000", "0099000000")]
+    for glycan_former, glycan_current in glycan_pairs:
+        assert packed_contain(pack_glycan(glycan_str_to_vector(glycan_former)),
+                              pack_glycan(glycan_str_to_vector(glycan_current))) == \
+            denovor.glycan_contain(glycan_former, glycan_current)
+
+
 def test_de_novo():
     # Initialization
     denovor = DeNovoSequencing()
@@ -371,3 +391,140 @@ def test_de_novo():
     # Use assert to check the result
     assert result_7 == [('NHNHHNHHNA', 94341.2)]
 
+
+
+def test_de_novo_beam():
+    # Initialization
+    denovor = DeNovoSequencing()
+    glycan_precursor = "1008000200"
+    glycan_intensity_dic = {'0001000000': 16685.6, '0002000000': 26543.0, '0202000000': 1137.5, '0103000000': 6672.6,
+                            '0203000000': 3837.2, '0204000000': 1080.6, '0304000000': 4370.1, '0404000000': 3547.2,
+                            '0907000100': 21704.1, '0405000000': 2264.8, '1008000000': 3106.1, '0908000100': 1285.3,
+                            '0505000000': 8320.1, '1008000100': 6415.6, '0605000000': 1467.8, '0506000000': 1652.4,
+                            '1008000200': 5649.7, '0407000000': 13622.1, '0505000100': 11062.8, '0706000000': 5844.5,
+                            '0806000000': 3359.1, '0707000000': 1889.9, '0807000000': 8296.6, '0806000100': 3876.6,
+                            '0907000000': 19080.1, '0807000100': 7476.3, '0907000200': 2312.4}
+    result = denovor.de_novo(glycan_precursor, glycan_intensity_dic)
+
+    # Input wrong beam width
+    with pytest.raises(AssertionError):
+        denovor.de_novo(glycan_precursor, glycan_intensity_dic, 0)
+
+    # Test Case 1: the top results of the beam are the same as the exhaustive search
+    for beam_width in [1, 3, 10]:
+        result_beam = denovor.de_novo(glycan_precursor, glycan_intensity_dic, beam_width)
+        assert len(result_beam) <= len(result)
+        assert result_beam[:beam_width] == result[:beam_width]
+
+    # Test Case 2: a wide beam keeps all the results
+    assert denovor.de_novo(glycan_precursor, glycan_intensity_dic, 100) == result
+
+
+def test_de_novo_cache():
+    # Initialization
+    denovor = DeNovoSequencing()
+    cached_denovor = DeNovoSequencing(2)
+    glycan_precursor = "0504000002"
+    glycan_intensity_dic = {'0001000000': 178721.8, '0002000000': 24745.4, '0102000000': 1714.1,
+                            '0404000000': 23748.3, '0202000000': 46100.9, '0504000000': 117434.6,
+                            '0404000001': 18476.5, '0302000000': 40545.4, '0203000000': 3935.4,
+                            '0504000001': 25856.8, '0303000000': 76999.1, '0403000000': 233672.0,
+                            '0303000001': 74035.4, '0403000001': 312205.2}
+    result = denovor.de_novo(glycan_precursor, glycan_intensity_dic)
+
+    # Test Case 1: the cached results are the same as the search
+    assert cached_denovor.de_novo(glycan_precursor, glycan_intensity_dic) == result
+    assert cached_denovor.de_novo(glycan_precursor, glycan_intensity_dic) == result
+    assert cached_denovor.result_cache.hits == 1
+
+    # Test Case 2: the ladders are reused for the different intensities
+    glycan_intensity_dic_2 = {key: round(value / 3 + 1000.0, 1) for key, value in glycan_intensity_dic.items()}
+    result_2 = cached_denovor.de_novo(glycan_precursor, glycan_intensity_dic_2)
+    assert cached_denovor.ladder_cache.hits == 1
+    assert result_2 == denovor.de_novo(glycan_precursor, glycan_intensity_dic_2)
+
+    # Test Case 3: the beam is not replayed from the exhaustive ladders
+    assert cached_denovor.de_novo(glycan_precursor, glycan_intensity_dic_2, 3) == result_2[:3]
+    assert cached_denovor.ladder_cache.hits == 1
+
+    # Test Case 4: the least recently used results are removed
+    assert len(cached_denovor.result_cache.entries) == 2
+    assert cached_denovor.result_cache.hit_rate == 1 / 4
+
+
+def test_containment_parents():
+    # Initialization, the levels of the compositions "0001000000", "0002000000", "0102000000" and "0202000000" etc.
+    n_1, n_2, h_1_n_2, h_2_n_2, h_2_n_3, h_3_n_2 = [pack_glycan(glycan_str_to_vector(key)) for key in
+                                                    ["0001000000", "0002000000", "0102000000", "0202000000",
+                                                     "0203000000", "0302000000"]]
+    level_compositions = [[0], [n_1], [n_2], [h_1_n_2], [h_2_n_2], [h_2_n_3, h_3_n_2]]
+    result = containment_parents(level_compositions)
+
+    # Test Case 1: the parents are in the nearest former level
+    assert result[0] == [[]]
+    assert result[1] == [[(0, [0])]]
+    assert result[4] == [[(3, [h_1_n_2])]]
+    assert result[5] == [[(4, [h_2_n_2])], [(4, [h_2_n_2])]]
+
+    # Test Case 2: the levels without a contained composition are skipped, back to the empty glycan
+    h_2 = pack_glycan(glycan_str_to_vector("0200000000"))
+    result = containment_parents([[0], [n_1], [], [h_1_n_2], [h_2]])
+    assert result[3] == [[(1, [n_1])]]
+    assert result[4] == [[(0, [0])]]
+
+
+def test_de_novo_max_gap():
+    # Initialization, the Y-ion "0201000000" is missing in the level 3
+    denovor = DeNovoSequencing()
+    glycan_precursor = "0202000000"
+    glycan_intensity_dic = {'0001000000': 1000.0, '0002000000': 300.0, '0101000000': 500.0, '0102000000': 100.0,
+                            '0202000000': 800.0}
+    result = denovor.de_novo(glycan_precursor, glycan_intensity_dic)
+
+    # Input wrong maximum gap
+    with pytest.raises(AssertionError):
+        denovor.de_novo(glycan_precursor, glycan_intensity_dic, None, -1)
+
+    # Test Case 1: no gap is the same as the exhaustive search
+    assert denovor.de_novo(glycan_precursor, glycan_intensity_dic, None, 0) == result
+
+    # Test Case 2: the gap bridges the missing levels, and keeps the candidates of the exhaustive search
+    result_gap = denovor.de_novo(glycan_precursor, glycan_intensity_dic, None, 1)
+    assert result == [('NHNH', 2400.0), ('NNHH', 2200.0)]
+    assert result_gap == [('NHNH', 2400.0), ('NHHN', 2300.0), ('NNHH', 2200.0), ('HNNH', 1400.0), ('HNHN', 1300.0)]
+
+    # Test Case 3: the top results of the beam are the same as the search with the gap
+    for beam_width in [1, 2, 5]:
+        assert denovor.de_novo(glycan_precursor, glycan_intensity_dic, beam_width, 1)[:beam_width] == \
+               result_gap[:beam_width]
+
+
+def test_de_novo_batch():
+    # Initialization
+    denovor = DeNovoSequencing()
+    glycan_precursors = ["0504000002", "0202000000", "0101000000"]
+    glycan_intensity_dics = [
+        {'0001000000': 178721.8, '0002000000': 24745.4, '0102000000': 1714.1, '0404000000': 23748.3,
+         '0202000000': 46100.9, '0504000000': 117434.6, '0404000001': 18476.5, '0302000000': 40545.4,
+         '0203000000': 3935.4, '0504000001': 25856.8, '0303000000': 76999.1, '0403000000': 233672.0,
+         '0303000001': 74035.4, '0403000001': 312205.2},
+        {'0001000000': 1000.0, '0002000000': 300.0, '0101000000': 500.0, '0102000000': 100.0, '0202000000': 800.0},
+        {}]
+    arrays = pack_spectra(glycan_precursors, glycan_intensity_dics)
+    precursors, compositions, intensities, offsets = arrays
+    assert precursors.shape == (3, 5) and compositions.shape == (19, 5)
+    assert offsets.tolist() == [0, 14, 19, 19]
+
+    # Input wrong ions beyond the precursor
+    with pytest.raises(IndexError):
+        denovor.de_novo_batch(*pack_spectra(["0101000000"], [{'0201000000': 10.0}]), 1)
+
+    # Test Case 1: the batch is the same as the top results of each spectrum
+    for beam_width, max_gap in [(None, 0), (3, 0), (None, 1), (3, 1)]:
+        result = [denovor.de_novo(glycan_precursor, glycan_intensity_dic, beam_width, max_gap)[:3]
+                  for glycan_precursor, glycan_intensity_dic in zip(glycan_precursors, glycan_intensity_dics)]
+        assert denovor.de_novo_batch(*arrays, 3, beam_width, max_gap, batch_size=2) == result
+
+    # Test Case 2: the spectrum without Y-ions ends at the precursor, and the worker processes keep the order
+    assert denovor.de_novo_batch(*arrays, 3)[2] == [('HN', 0.0)]
+    assert denovor.de_novo_batch(*arrays, 3, workers=2) == denovor.de_novo_batch(*arrays, 3)
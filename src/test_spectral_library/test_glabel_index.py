@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the index from the titles of spectra to the rows of a gLabel file.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+import numpy as np
+from spectral_library.glabel_index import GLabelIndex, match_peaks
+
+glabel_text = (
+    "spec\tpeptide\tmodinfo\tglycan(H,N,F,A,G)\tformula\tmatched_ion\n"
+    "run.3300.3300.3.0.dta\tSVQEIQATFFYFTPJK\tnan\t7,6,0,3,0\tH(7)N(6)A(3)\tY0+3=1030.023,1885.5\n"
+    "run.3200.3200.5.0.dta\tHPHJJSSDLHPHK\tnan\t5,4,0,0,2\tH(5)N(4)G(2)\t"
+    "Y-H(3)N(3)+1=1996.916,4248.5;b2+1=235.119,9667.3\n"
+    "run.3200.3200.5.0.dta\tHPHJJSSDLHPHK\tnan\t5,4,1,0,0\tH(5)N(4)F(1)\ty2+1=284.172,834.2\n"
+)
+
+
+def test_glabel_index(tmp_path):
+    glabel_file = tmp_path / "sample-glabel.txt"
+    glabel_file.write_text(glabel_text)
+    glabel_index = GLabelIndex(glabel_file)
+    assert len(glabel_index) == 3
+
+    # Test Case 1: duplicated IDs keep the order in the gLabel file
+    rows = glabel_index.rows("run.3200.3200.5.0.dta")
+    assert len(rows) == 2
+    assert [glabel_index.glycan(row) for row in rows] == ["5,4,0,0,2", "5,4,1,0,0"]
+    assert glabel_index.value('formula', rows[1]) == "H(5)N(4)F(1)"
+
+    # Test Case 2: the matched ions of a row
+    ion_mz, ion_annotations = glabel_index.matched_ion_arrays(rows[0])
+    assert ion_mz.tolist() == [1996.916, 235.119]
+    assert ion_annotations == ['Y-H(3)N(3)+1', 'b2+1']
+
+    # Test Case 3: a title without identifications
+    assert len(glabel_index.rows("missing")) == 0
+    row = glabel_index.rows("run.3300.3300.3.0.dta")[0]
+    assert glabel_index.value('peptide', row) == "SVQEIQATFFYFTPJK"
+
+
+def test_match_peaks():
+    peak_mz = np.array([235.11900329, 284.172, 695.0451, 1996.916])
+    ion_mz = np.array([1996.916, 235.119, 695.045, 500.0])
+
+    # Test Case 1: the float formatting differences are matched within the tolerance
+    peak_indices, ion_indices = match_peaks(peak_mz, ion_mz)
+    assert peak_indices.tolist() == [0, 2, 3]
+    assert ion_indices.tolist() == [1, 2, 0]
+
+    # Test Case 2: a tighter tolerance in ppm
+    peak_indices, ion_indices = match_peaks(peak_mz, ion_mz, tolerance=0.1, unit='ppm')
+    assert peak_indices.tolist() == [0, 3]
+
+    # Test Case 3: the last ion is kept for the same peak, and each ion is matched to the nearest peak
+    peak_indices, ion_indices = match_peaks(np.array([100.0, 100.0008]), np.array([100.0007, 100.0009]))
+    assert peak_indices.tolist() == [1]
+    assert ion_indices.tolist() == [1]
+
+    # Test Case 4: empty peaks
+    peak_indices, ion_indices = match_peaks(np.array([]), ion_mz)
+    assert len(peak_indices) == 0 and len(ion_indices) == 0
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the streaming reader for the spectra in an mgf file.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+import numpy as np
+from spectral_library.compressed_io import open_file
+from spectral_library.mgf_reader import read_mgf, read_mgf_parallel, iter_mgf_spectra, split_mgf_ranges, \
+    index_mgf_titles, read_mgf_spectrum, parse_charges
+
+mgf_text = (
+    "BEGIN IONS\n"
+    "TITLE=20211027_Palleon_A_HILIC.3200.3200.5.0.dta\n"
+    "PEPMASS=752.10299\n"
+    "CHARGE=5+\n"
+    "RTINSECONDS=351.1281\n"
+    "235.119 9667.3\n"
+    "284.172 834.2\n"
+    "695.045 1616.6\n"
+    "END IONS\n"
+    "\n"
+    "BEGIN IONS\n"
+    "TITLE=20211027_Palleon_A_HILIC.3300.3300.3.0.dta\n"
+    "PEPMASS=1030.0249 18234.5\n"
+    "CHARGE=2+ and 3+\n"
+    "RTINSECONDS=5680.6674\n"
+    "END IONS\n"
+    "BEGIN IONS\n"
+    "TITLE=20211027_Palleon_A_HILIC.3400.3400.2.0.dta\n"
+    "PEPMASS=1113.098\n"
+    "CHARGE=2+\n"
+    "RTINSECONDS=5690.1\n"
+    "1113.098 1885.5 2+\n"
+    "\n"
+    "1200.5 10.0\n"
+    "END IONS\n"
+)
+
+
+def test_read_mgf(tmp_path):
+    mgf_file = tmp_path / "sample.mgf"
+    mgf_file.write_text(mgf_text)
+    spectra = list(read_mgf(mgf_file))
+    assert len(spectra) == 3
+
+    # Test Case 1
+    spectrum = spectra[0]
+    assert spectrum.title == "20211027_Palleon_A_HILIC.3200.3200.5.0.dta"
+    assert spectrum.precursor_mz == 752.10299
+    assert spectrum.precursor_intensity is None
+    assert spectrum.charges == (5,)
+    assert spectrum.charge == "5+"
+    assert spectrum.retention_time == 351.1281
+    assert spectrum.mz.dtype == np.float64 and spectrum.mz.flags.c_contiguous
+    assert spectrum.mz.tolist() == [235.119, 284.172, 695.045]
+    assert spectrum.intensity.tolist() == [9667.3, 834.2, 1616.6]
+
+    # Test Case 2: no peaks, the intensity of the precursor, and several charges
+    spectrum = spectra[1]
+    assert len(spectrum) == 0
+    assert spectrum.precursor_intensity == 18234.5
+    assert spectrum.charge == "2+ and 3+"
+
+    # Test Case 3: the peaks with the charges, and a blank line
+    spectrum = spectra[2]
+    assert spectrum.mz.tolist() == [1113.098, 1200.5]
+    assert spectrum.intensity.tolist() == [1885.5, 10.0]
+
+    # Test Case 4: the lines are the same as the blocks of text
+    lines_spectra = list(iter_mgf_spectra(mgf_text.splitlines(keepends=True)))
+    assert [s.title for s in lines_spectra] == [s.title for s in spectra]
+
+    # Test Case 5: a compressed mgf file
+    compressed_file = tmp_path / "sample.mgf.gz"
+    with open_file(compressed_file, 'w') as writer:
+        writer.write(mgf_text)
+    assert [s.params for s in read_mgf(compressed_file)] == [s.params for s in spectra]
+
+
+def test_mgf_ranges_and_index(tmp_path):
+    mgf_file = tmp_path / "sample.mgf"
+    mgf_file.write_text(mgf_text)
+    spectra = list(read_mgf(mgf_file))
+
+    # Test Case 1: the ranges start at "BEGIN IONS", and cover all the spectra
+    ranges = split_mgf_ranges(mgf_file, 3)
+    assert len(ranges) == 3
+    assert ranges[0][0] == 0 and ranges[-1][1] == mgf_file.stat().st_size
+    range_titles = [s.title for start, end in ranges for s in read_mgf(mgf_file, start, end)]
+    assert range_titles == [s.title for s in spectra]
+
+    # Test Case 2: the spectra parsed in parallel are the same as the serial ones
+    parallel_spectra = read_mgf_parallel(mgf_file, 2)
+    assert [s.title for s in parallel_spectra] == [s.title for s in spectra]
+    for parallel_spectrum, spectrum in zip(parallel_spectra, spectra):
+        assert np.array_equal(parallel_spectrum.mz, spectrum.mz)
+        assert np.array_equal(parallel_spectrum.intensity, spectrum.intensity)
+
+    # Test Case 3: fetch a spectrum by the offset of its title
+    title_offsets = index_mgf_titles(mgf_file)
+    assert list(title_offsets) == [s.title for s in spectra]
+    spectrum = read_mgf_spectrum(mgf_file, title_offsets["20211027_Palleon_A_HILIC.3400.3400.2.0.dta"])
+    assert spectrum.mz.tolist() == [1113.098, 1200.5]
+
+
+def test_parse_charges():
+    assert parse_charges("5+") == (5,)
+    assert parse_charges("5") == (5,)
+    assert parse_charges("2+ and 3+") == (2, 3)
+    assert parse_charges("2-") == (-2,)
+    assert parse_charges("") == ()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the byte-offset index for the spectra in an msp file.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+from spectral_library.msp_index import MSPIndex, build_msp_index, index_file_name
+from spectral_library.msp_reader import read_msp
+
+msp_text = (
+    "Name: run.3200.3200.5.0.dta\n"
+    "MW: 752.10299\n"
+    "Comment: CHARGE=5+\tRTINSECONDS=351.1281\tPEPTIDE=HPHJJSSDLHPHK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=5,4,0,0,2\tGLYCANS=H(5)N(4)G(2)\n"
+    "Num Peaks: 2\n"
+    "235.119\t9667.3\tb2+1\n"
+    "695.045\t1616.6\tY-H(4)N(3)+4\n"
+    "\n"
+    "Name: run.3300.3300.3.0.dta\n"
+    "MW: 1030.0249\n"
+    "Comment: CHARGE=3+\tRTINSECONDS=5680.6674\tPEPTIDE=SVQEIQATFFYFTPJK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=7,6,0,3,0\tGLYCANS=H(7)N(6)A(3)\n"
+    "Num Peaks: 1\n"
+    "1030.023\t1885.5\tY0+3\n"
+    "\n"
+    "Name: run.3200.3200.5.0.dta\n"
+    "MW: 752.10299\n"
+    "Comment: CHARGE=5+\tRTINSECONDS=351.1281\tPEPTIDE=HPHJJSSDLHPHK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=5,4,1,0,0\tGLYCANS=H(5)N(4)F(1)\n"
+    "Num Peaks: 1\n"
+    "284.172\t834.2\ty2+1\n"
+)
+
+
+def test_msp_index(tmp_path):
+    msp_file = tmp_path / "sample.msp"
+    msp_file.write_text(msp_text)
+    index_file = build_msp_index(msp_file)
+    assert index_file == index_file_name(msp_file)
+    assert index_file.exists()
+
+    with MSPIndex(msp_file) as msp_index:
+        assert len(msp_index) == 3
+
+        # Test Case 1: the same name is annotated twice
+        positions = msp_index.find_by_name("run.3200.3200.5.0.dta")
+        assert positions == [0, 2]
+        assert msp_index.get_spectrum(2).glycans == "H(5)N(4)F(1)"
+        assert msp_index.find_by_name("missing") == []
+
+        # Test Case 2: fetch by the peptide and glycan
+        assert msp_index.find_by_peptide_glycan("HPHJJSSDLHPHK", "H(5)N(4)G(2)") == [0]
+        assert msp_index.find_by_peptide_glycan("HPHJJSSDLHPHK") == [0, 2]
+        assert msp_index.find_by_peptide_glycan("missing") == []
+
+        # Test Case 3: fetch by the range of precursor mass
+        assert msp_index.find_by_mass(1000, 1100) == [1]
+        assert msp_index.find_by_mass(700, 1100) == [0, 2, 1]
+
+        # Test Case 4: the fetched spectrum is the same as the one read from the whole file
+        spectra = list(read_msp(msp_file))
+        spectrum = msp_index.get_spectrum(1)
+        assert spectrum.header_lines == spectra[1].header_lines
+        assert spectrum.annotations == spectra[1].annotations
+
+        # Test Case 5: re-export a subset
+        subset_file = tmp_path / "subset.msp"
+        msp_index.write_subset([2, 1], subset_file)
+        subset = list(read_msp(subset_file))
+        assert [s.glycans for s in subset] == ["H(5)N(4)F(1)", "H(7)N(6)A(3)"]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the streaming reader for the spectra in an msp file.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+import numpy as np
+from spectral_library.msp_reader import read_msp, iter_msp_spectra, parse_msp_chunk, split_msp_ranges
+
+msp_text = (
+    "Name: 20211027_Palleon_A_HILIC.3200.3200.5.0.dta\n"
+    "MW: 752.10299\n"
+    "Comment: CHARGE=5+\tRTINSECONDS=351.1281\tPEPTIDE=HPHJJSSDLHPHK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=5,4,0,0,2\tGLYCANS=H(5)N(4)G(2)\n"
+    "Num Peaks: 3\n"
+    "235.119\t9667.3\tb2+1\n"
+    "284.172\t834.2\ty2+1\n"
+    "695.045\t1616.6\tY-H(4)N(3)+4\n"
+    "\n"
+    "Name: 20211027_Palleon_A_HILIC.3300.3300.3.0.dta\n"
+    "MW: 1030.0249\n"
+    "Comment: CHARGE=3+\tRTINSECONDS=5680.6674\tPEPTIDE=SVQEIQATFFYFTPJK\tMODIFICATIONS=nan\t"
+    "GLYCAN(H,N,F,A,G)=nan\tGLYCANS=nan\n"
+    "Num Peaks: 0\n"
+    "\n"
+    "\n"
+    "Name: 20211027_Palleon_A_HILIC.3400.3400.2.0.dta\n"
+    "MW: 1113.098\n"
+    "Comment: CHARGE=2+\tRTINSECONDS=5690.1\tPEPTIDE=AAJXTK\tMODIFICATIONS=3,Oxidation[M];\t"
+    "GLYCAN(H,N,F,A,G)=10,2,1,0,0\tGLYCANS=H(10)N(2)F(1)\n"
+    "Num Peaks: 1\n"
+    "1113.098\t1885.5\tY0+2\n"
+)
+
+
+def test_read_msp(tmp_path):
+    msp_file = tmp_path / "sample.msp"
+    msp_file.write_text(msp_text)
+    spectra = list(read_msp(msp_file))
+
+    # The last spectrum without a blank line should also be read
+    assert len(spectra) == 3
+
+    # Test Case 1
+    spectrum = spectra[0]
+    assert spectrum.name == "20211027_Palleon_A_HILIC.3200.3200.5.0.dta"
+    assert spectrum.precursor_mass == 752.10299
+    assert spectrum.charge == 5
+    assert spectrum.retention_time == 351.1281
+    assert spectrum.peptide == "HPHJJSSDLHPHK"
+    assert spectrum.modifications == "nan"
+    assert spectrum.glycan_composition == (5, 4, 0, 0, 2)
+    assert spectrum.glycan_length == 11
+    assert spectrum.monosaccharides == "HHHHHNNNNGG"
+    assert spectrum.glycans == "H(5)N(4)G(2)"
+    assert len(spectrum) == 3
+    assert spectrum.mz.dtype == np.float64
+    assert np.array_equal(spectrum.mz, np.array([235.119, 284.172, 695.045]))
+    assert np.array_equal(spectrum.intensity, np.array([9667.3, 834.2, 1616.6]))
+    assert spectrum.annotations == ["b2+1", "y2+1", "Y-H(4)N(3)+4"]
+    assert spectrum.peak_lines() == ["235.119\t9667.3\tb2+1", "284.172\t834.2\ty2+1",
+                                     "695.045\t1616.6\tY-H(4)N(3)+4"]
+
+    # Test Case 2: a spectrum without peaks and glycans
+    spectrum = spectra[1]
+    assert spectrum.glycan_composition == (0, 0, 0, 0, 0)
+    assert len(spectrum) == 0
+    assert spectrum.mz.shape == (0,)
+
+    # Test Case 3: double-digit monosaccharides
+    spectrum = spectra[2]
+    assert spectrum.modifications == "3,Oxidation[M];"
+    assert spectrum.glycan_composition == (10, 2, 1, 0, 0)
+    assert spectrum.header_lines[3] == "Num Peaks: 1"
+
+
+def test_parse_msp_chunk():
+    # A chunk with some deleted lines should be ignored
+    assert parse_msp_chunk(["Name: test", "Comment: CHARGE=2+", "Num Peaks: 0"]) is None
+
+    # A denovo msp file has the field of "DENOVO" whose value contains spaces
+    chunk = ["Name: test", "MW: 100.5",
+             "Comment: CHARGE=2+\tPEPTIDE=AAJXTK\tDENOVO=[('NNHH', 954586.3), ('NHNH', 1.0)]",
+             "Num Peaks: 1", "100.5 10.0 Y0+2"]
+    spectrum = parse_msp_chunk(chunk)
+    assert spectrum.comments["DENOVO"] == "[('NNHH', 954586.3), ('NHNH', 1.0)]"
+    assert spectrum.annotations == ["Y0+2"]
+
+    # Lines are iterated from any iterable of lines
+    spectra = list(iter_msp_spectra(line + "\n" for line in chunk))
+    assert len(spectra) == 1
+
+    # The original text of the retention time and the peaks is kept for writing out
+    chunk = ["Name: test", "MW: 1699.642", "Comment: CHARGE=2+\tRTINSECONDS=495.110\tPEPTIDE=AAJXTK",
+             "Num Peaks: 1", "1699.6420\t10.0\tY0+1"]
+    spectrum = parse_msp_chunk(chunk)
+    assert spectrum.retention_time == 495.11
+    assert spectrum.retention_time_text == "495.110"
+    assert spectrum.mz.tolist() == [1699.642]
+    assert spectrum.peak_lines() == ["1699.6420\t10.0\tY0+1"]
+
+
+def test_split_msp_ranges(tmp_path):
+    msp_file = tmp_path / "sample.msp"
+    msp_file.write_text("\n".join([msp_text] * 5))
+    names = [spectrum.name for spectrum in read_msp(msp_file)]
+    assert len(names) == 15
+
+    for number_ranges in [1, 2, 4, 7, 100]:
+        ranges = split_msp_ranges(msp_file, number_ranges)
+        # The ranges should cover the whole file without any gap
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == msp_file.stat().st_size
+        assert all(ranges[i][1] == ranges[i + 1][0] for i in range(len(ranges) - 1))
+        assert len(ranges) <= number_ranges
+        # No spectrum is split or lost
+        range_names = [spectrum.name for start, end in ranges for spectrum in read_msp(msp_file, start, end)]
+        assert range_names == names
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the process pool which runs the same function over many tasks.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+from spectral_library.parallel_workers import run_tasks
+
+
+def test_run_tasks():
+    tasks = [(2, i) for i in range(10)]
+
+    # Input wrong number of workers
+    with pytest.raises(AssertionError):
+        run_tasks(pow, tasks, 0)
+
+    # Test Case 1: the serial run
+    serial_results = [result for result, _ in run_tasks(pow, tasks, 1)]
+    assert serial_results == [2 ** i for i in range(10)]
+
+    # Test Case 2: the results of a process pool are in the same order as the tasks
+    parallel_results = [result for result, _ in run_tasks(pow, tasks, 4)]
+    assert parallel_results == serial_results
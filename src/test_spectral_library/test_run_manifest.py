@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the manifest which skips the input files whose outputs are current.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+from spectral_library.run_manifest import RunManifest, code_version, file_hash, manifest_file
+
+
+def test_run_manifest(tmp_path):
+    msp_file = tmp_path / "N-GP-MSP" / "sample.msp"
+    msp_file.parent.mkdir()
+    msp_file.write_text("Name: run.3200.3200.5.0.dta\n")
+    csv_file = tmp_path / "N-GP-CSV-TOP-1" / "sample.csv"
+    csv_file.parent.mkdir()
+    csv_file.write_text("glycopeptide\n")
+    parameters = {'input_type': 'N', 'top_number': 1}
+    version = code_version('run_manifest.py')
+    json_file = manifest_file(tmp_path, "N-GP-CSV-TOP-1")
+    assert json_file == tmp_path / "MANIFEST" / "N-GP-CSV-TOP-1.json"
+
+    # Test Case 1: the outputs are not current before recording them
+    manifest = RunManifest(json_file, parameters, version)
+    assert not manifest.is_current("sample.msp", [msp_file], [csv_file])
+    manifest.record("sample.msp", [msp_file], [csv_file], [60, 51, 84])
+    assert json_file.exists()
+
+    # Test Case 2: the outputs are current for a new run, with the recorded result
+    manifest = RunManifest(json_file, parameters, version)
+    assert manifest.is_current("sample.msp", [msp_file], [csv_file])
+    assert manifest.result("sample.msp") == [60, 51, 84]
+    assert manifest.num_skipped == 1
+
+    # Test Case 3: the parameters, the code, or the outputs are changed
+    assert not RunManifest(json_file, {'input_type': 'N', 'top_number': 2}, version).is_current(
+        "sample.msp", [msp_file], [csv_file])
+    assert not RunManifest(json_file, parameters, "0" * 64).is_current("sample.msp", [msp_file], [csv_file])
+    assert not manifest.is_current("sample.msp", [msp_file], [csv_file.with_name("other.csv")])
+    assert not RunManifest(json_file, parameters, version, resume=False).is_current(
+        "sample.msp", [msp_file], [csv_file])
+
+    # Test Case 4: the input is touched without any change, or the contents are changed
+    msp_file.write_text("Name: run.3200.3200.5.0.dta\n")
+    assert manifest.is_current("sample.msp", [msp_file], [csv_file])
+    msp_file.write_text("Name: run.3300.3300.3.0.dta\n")
+    assert not manifest.is_current("sample.msp", [msp_file], [csv_file])
+
+    # Test Case 5: an output is removed
+    manifest.record("sample.msp", [msp_file], [csv_file], [60, 51, 84])
+    assert manifest.is_current("sample.msp", [msp_file])
+    csv_file.unlink()
+    assert not manifest.is_current("sample.msp", [msp_file])
+
+
+def test_file_hash(tmp_path):
+    (tmp_path / "a.npy").write_bytes(b"1234")
+    (tmp_path / "b.npy").write_bytes(b"5678")
+
+    # Test Case 1: a folder is hashed by the names and the contents of the files
+    folder_hash = file_hash(tmp_path)
+    (tmp_path / "b.npy").write_bytes(b"5679")
+    assert file_hash(tmp_path) != folder_hash
+    assert file_hash(tmp_path / "a.npy") == file_hash(tmp_path / "a.npy")
+
+    # Test Case 2: the version is changed by the source files
+    assert code_version('run_manifest.py') != code_version('run_manifest.py', 'msp_reader.py')
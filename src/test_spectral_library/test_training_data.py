@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+#####################################################################################################
+This script tests the columnar format and the shards of the training data.
+
+Created on 18 October 2026 for the unit test using pytest.
+#####################################################################################################
+"""
+__author__ = 'ZLiang'
+
+import pytest
+import numpy as np
+from spectral_library.training_data import TrainingDataWriter, TrainingData, merge_training_data, \
+    encode_tokens, decode_tokens, code_tokens, tokens_to_one_hot, spectrum_to_y, samples_to_y, \
+    amino_acid_monosaccharide_zero_codes, ShardWriter, shard_files, merge_shards, load_shard, sparse_y, densify_y
+
+glycopeptide_names = [
+    "XSXHRPAXEDXXXGSEAJXTCTXTGXRZZZZZ@!@!!@!!@$ZZZZZZZZ",
+    "HPHJJSSDXHPHKZZZZZZZZZZZZZZZZZZZ@@!!@!@!!%%ZZZZZZZ",
+]
+
+
+def sample_row(i):
+    return {
+        'glycopeptide': glycopeptide_names[i % 2],
+        'charge': 2 + i,
+        'precursor_mass': 752.10299 + i,
+        'retention_time': 351.1281,
+        'mzs': [235.119, 284.172, 695.045][:i + 1],
+        'intensities': [9667.3, 834.2, 1616.6][:i + 1],
+        'ions': [0, 3, 8][:i + 1],
+        'positions': [2, 28, 40][:i + 1],
+        'ion_charges': [1, 1, 4][:i + 1],
+    }
+
+
+def test_encode_tokens():
+    tokens = encode_tokens(glycopeptide_names[0])
+    assert tokens.dtype == np.uint8
+    assert "".join(amino_acid_monosaccharide_zero_codes[token] for token in tokens) == glycopeptide_names[0]
+    assert tokens_to_one_hot(tokens).shape == (50, 26)
+    assert tokens_to_one_hot(tokens)[0].tolist() == \
+        [1 if code == 'X' else 0 for code in amino_acid_monosaccharide_zero_codes]
+    assert decode_tokens(tokens) == glycopeptide_names[0]
+    assert decode_tokens([2, 0, 1], "ABC") == "CAB"
+    assert code_tokens("CAZ", "ABC").tolist() == [2, 0, 255]
+
+    # Test Case: unexpected letter, or a wrong length
+    with pytest.raises(AssertionError):
+        encode_tokens(glycopeptide_names[0].replace('X', 'I'))
+    with pytest.raises(AssertionError):
+        encode_tokens(glycopeptide_names[0][:49])
+
+
+def test_training_data(tmp_path):
+    with TrainingDataWriter(tmp_path / "sample") as writer:
+        for i in range(3):
+            writer.writerow(sample_row(i))
+        assert len(writer) == 3
+
+    training_data = TrainingData(tmp_path / "sample")
+    assert len(training_data) == 3
+    # The columns are memory mapped, and the peaks are views
+    assert isinstance(training_data.tokens, np.memmap)
+    assert training_data.tokens.shape == (3, 50)
+    assert training_data.charges.tolist() == [2, 3, 4]
+    assert training_data.peak_offsets.tolist() == [0, 1, 3, 6]
+    peaks = training_data.peaks(2)
+    assert peaks['mzs'].tolist() == [235.119, 284.172, 695.045]
+    assert peaks['ion_charges'].tolist() == [1, 1, 4]
+    assert np.shares_memory(peaks['mzs'], training_data.mzs)
+
+    # Test Case: join the parts in order
+    with TrainingDataWriter(tmp_path / "part-0") as writer:
+        writer.writerow(sample_row(0))
+    with TrainingDataWriter(tmp_path / "part-1") as writer:
+        pass
+    with TrainingDataWriter(tmp_path / "part-2") as writer:
+        writer.writerow(sample_row(1))
+        writer.writerow(sample_row(2))
+    num_samples = merge_training_data([tmp_path / f"part-{i}" for i in range(3)], tmp_path / "merged")
+    assert num_samples == 3
+    assert not (tmp_path / "part-0").exists()
+    merged = TrainingData(tmp_path / "merged")
+    for column in ['tokens', 'charges', 'precursor_masses', 'peak_offsets', 'mzs', 'positions']:
+        assert np.array_equal(getattr(merged, column), getattr(training_data, column))
+
+
+def test_spectrum_to_y():
+    # b2+1, y28+1 with the padded length, Y ion at the position 40 with charge 4
+    y = spectrum_to_y(np.array([1.0, 2.0, 5.0]), np.array([0, 3, 8], dtype=np.uint8),
+                      np.array([2, 28, 40], dtype=np.uint8), np.array([1, 1, 4], dtype=np.uint8))
+    assert y.shape == (49, 36)
+    assert y[1, 0] == 0.125
+    assert y[3, 3] == 0.25
+    assert y[39, 35] == 0.625
+    assert np.isclose(np.sum(y), 1.0)
+
+
+
+def test_samples_to_y():
+    # All the nine ions with the charges from 1 to 4, and the same places are added together
+    ions = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 8, 0])
+    positions = np.array([1, 2, 3, 4, 5, 6, 32, 32, 40, 40, 1])
+    ion_charges = np.array([1, 2, 3, 4, 1, 2, 3, 4, 1, 1, 1])
+    intensities = np.arange(1.0, 12.0)
+    ys = samples_to_y(intensities, ions, positions, ion_charges, [0, 4, 11])
+    assert ys.shape == (2, 49, 36)
+
+    # Each sample is the same as the one constructed alone
+    assert np.array_equal(ys[0], spectrum_to_y(intensities[:4], ions[:4], positions[:4], ion_charges[:4]))
+    assert np.array_equal(ys[1], spectrum_to_y(intensities[4:], ions[4:], positions[4:], ion_charges[4:]))
+    assert ys[0, 27, 3 * 9 + 3] == 4.0 / 10.0
+    assert ys[1, 39, 8] == (9.0 + 10.0) / 56.0
+    assert ys[1, 0, 0] == 11.0 / 56.0
+    assert ys[1, 31, 2 * 9 + 6] == 7.0 / 56.0
+    assert np.allclose(ys.sum(axis=(1, 2)), 1.0)
+
+
+def test_shard_writer(tmp_path):
+    prefix = tmp_path / "shards" / "sample"
+    with ShardWriter(prefix, shard_size=2) as writer:
+        for i in range(3):
+            writer.writerow(sample_row(i))
+    assert len(writer) == 3
+    assert [shard_file.name for shard_file in shard_files(prefix)] == ["sample-00000.npz", "sample-00001.npz"]
+
+    # The samples have the same structure (X, X_meta, y) as the data in a pkl file
+    samples = [sample for shard_file in shard_files(prefix) for sample in load_shard(shard_file)]
+    assert len(samples) == 3
+    X, X_meta, y = samples[2]
+    # X is kept as the tokens (50,), which are looked up by the embedding of the model
+    assert X.dtype == np.uint8
+    assert np.array_equal(X, encode_tokens(glycopeptide_names[0]))
+    assert X_meta.tolist() == [4]
+    row = sample_row(2)
+    # y is stored as the sparse y of (shape, flat indices, values)
+    assert y[0] == (49, 36)
+    assert len(y[1]) == 3
+    assert np.array_equal(densify_y(y), spectrum_to_y(row['intensities'], row['ions'], row['positions'],
+                                                      row['ion_charges']).astype(np.float32))
+
+    # Test Case: rename the shards of the parts in order, and overwrite the old shards
+    with ShardWriter(tmp_path / "shards" / "sample.part-0", shard_size=2) as writer:
+        writer.writerow(sample_row(1))
+    merged_files = merge_shards([tmp_path / "shards" / "sample.part-0"], prefix)
+    assert [shard_file.name for shard_file in merged_files] == ["sample-00000.npz"]
+    assert shard_files(prefix) == merged_files
+    assert load_shard(merged_files[0])[0][1].tolist() == [3]
+
+
+def test_sparse_y():
+    ys = samples_to_y(np.array([1.0, 2.0, 5.0, 4.0]), np.array([0, 3, 8, 0]), np.array([2, 28, 40, 1]),
+                      np.array([1, 1, 4, 2]), [0, 3, 4])
+    sparse_ys = sparse_y(ys)
+    assert len(sparse_ys) == 2
+
+    # Test Case 1: the non-zero cells with the flat indices
+    shape, indices, values = sparse_ys[0]
+    assert shape == (49, 36)
+    assert indices.tolist() == [1 * 36 + 0, 3 * 36 + 3, 39 * 36 + 35]
+    assert values.tolist() == [0.125, 0.25, 0.625]
+
+    # Test Case 2: only one cell for the second sample
+    assert sparse_ys[1][1].tolist() == [9]
+
+    # Test Case 3: densify back to the same y, and a dense y is returned as it is
+    for y, sparse in zip(ys, sparse_ys):
+        assert np.array_equal(densify_y(sparse), y)
+    y = ys[1]
+    assert densify_y(y) is y